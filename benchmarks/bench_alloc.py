@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Memory blocks allocated per request for request context objects.
+
+Counts blocks and bytes that are allocated for context, response and
+response renderer of a single request, with and without pooling.
+
+Usage: python benchmarks/bench_alloc.py [number]
+"""
+import sys
+import tracemalloc
+
+from mdl.web.context import WebContext
+from mdl.web.pool import Pool
+
+try:
+    from mdl._aiohttp.response import ResponseRenderer
+except ImportError:  # pragma: no cover
+    ResponseRenderer = None
+
+
+class Op(object):
+    produces = ['application/json']
+
+
+OP = Op()
+
+
+def request(new_context, new_renderer, pools):
+    ctx = new_context(OP, 'request', None, keep_alive=True)
+    ctx.response.headers['X-Request'] = 'value'
+    if new_renderer is None:
+        return ctx, None
+    return ctx, new_renderer(ctx, b'{}', pools)
+
+
+def measure(new_context, new_renderer, pools, number):
+    # warm up pools and caches
+    for i in range(10):
+        release(request(new_context, new_renderer, pools), pools)
+
+    blocks = size = 0
+    for i in range(number):
+        before = tracemalloc.take_snapshot()
+        objects = request(new_context, new_renderer, pools)
+        after = tracemalloc.take_snapshot()
+        release(objects, pools)
+        del objects
+
+        for stat in after.compare_to(before, 'filename'):
+            blocks += stat.count_diff
+            size += stat.size_diff
+
+    return blocks / number, size / number
+
+
+def release(objects, pools):
+    if pools is not None:
+        ctx, renderer = objects
+        pools[0].release(ctx)
+        if renderer is not None:
+            pools[1].release(renderer)
+
+
+def main(number):
+    tracemalloc.start()
+
+    pools = (Pool(WebContext, 10), Pool(ResponseRenderer, 10))
+    results = [
+        ('default',) + measure(WebContext, ResponseRenderer, None, number),
+        ('pooled',) + measure(
+            pools[0].acquire,
+            pools[1].acquire if ResponseRenderer is not None else None,
+            pools, number),
+    ]
+
+    if ResponseRenderer is None:
+        print('aiohttp is not available, renderer is not measured')
+    print('%-10s %15s %15s' % ('', 'blocks/request', 'bytes/request'))
+    for name, blocks, size in results:
+        print('%-10s %15.1f %15.1f' % (name, blocks, size))
+
+    tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Per-request response header building vs precomputed header template.
+
+Usage: python benchmarks/bench_headers.py [number]
+"""
+import sys
+import time
+from email.utils import formatdate
+
+from mdl.web import hdrs
+from mdl.web.response import HeaderTemplate, Response
+
+SERVER = 'Python/3.5 aiohttp/1.3'
+BODY = '{"id": 1}'
+
+
+def per_request(number):
+    for i in range(number):
+        response = Response()
+        if response.content_type is None:
+            response.content_type = 'application/json'
+        if response.charset is None:
+            response.charset = 'utf-8'
+        body = BODY.encode('utf-8')
+
+        headers = response.headers
+        response.content_length = len(body)
+        headers.setdefault(hdrs.DATE, formatdate(usegmt=True))
+        headers.setdefault(hdrs.SERVER, SERVER)
+
+
+def precomputed(number):
+    template = HeaderTemplate(
+        'application/json', [(hdrs.SERVER, SERVER), ('X-Static', '1')])
+    date = formatdate(usegmt=True)
+
+    for i in range(number):
+        response = Response(template)
+        headers = response._headers = template.text.copy()
+        body = BODY.encode(template.charset)
+
+        headers[hdrs.CONTENT_LENGTH] = str(len(body))
+        if hdrs.DATE not in headers:
+            headers[hdrs.DATE] = date
+
+
+def run(func, number):
+    t = time.perf_counter()
+    func(number)
+    return time.perf_counter() - t
+
+
+def main(number):
+    t1 = run(per_request, number)
+    t2 = run(precomputed, number)
+    print('%-12s %12.2f us' % ('per request', t1 / number * 1e6))
+    print('%-12s %12.2f us' % ('precomputed', t2 / number * 1e6))
+    print('%-12s %12.1fx' % ('speedup', t1 / t2))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Per-request middleware composition vs middleware chain composed on
+application startup, route is resolved by WebApplication.
+
+Usage: python benchmarks/bench_middlewares.py [number]
+"""
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from mdl._aiohttp.web import WebApplication
+
+
+async def factory(app, handler):
+    async def middleware(ctx):
+        return await handler(ctx)
+    return middleware
+
+
+async def handler(ctx):
+    return ctx
+
+
+REQUEST = SimpleNamespace(
+    method='GET', rel_url=SimpleNamespace(raw_path='/items/1'))
+
+
+async def per_request(app, number):
+    for i in range(number):
+        match_info = await app._resolve(REQUEST)
+        match_info.add_app(app)
+        chain = await app._compose(match_info.apps, match_info.handler)
+        await chain(i)
+
+
+async def on_startup(app, number):
+    for i in range(number):
+        match_info = await app._resolve(REQUEST)
+        match_info.add_app(app)
+        await match_info.chain(i)
+
+
+def run(loop, coro):
+    t = time.perf_counter()
+    loop.run_until_complete(coro)
+    return time.perf_counter() - t
+
+
+def main(number):
+    loop = asyncio.new_event_loop()
+
+    print('%-12s %15s %15s %8s' % ('middlewares', 'per request',
+                                   'on startup', ''))
+    for count in (0, 3, 10):
+        app = WebApplication(loop=loop, middlewares=[factory] * count)
+        app.add_mdl_route('GET', '/items/{id}', handler)
+        loop.run_until_complete(app.startup())
+
+        t1 = run(loop, per_request(app, number))
+        t2 = run(loop, on_startup(app, number))
+        print('%-12d %12.2f us %12.2f us %7.1fx' % (
+            count, t1 / number * 1e6, t2 / number * 1e6, t1 / t2))
+        loop.run_until_complete(app.cleanup())
+
+    loop.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Linear regex route scan vs mdl route table.
+
+Synthetic spec: 2,000 operations across a dozen base paths, half of
+paths are templated. Linear scan resolves routes the way aiohttp
+url dispatcher does, one compiled regex per route.
+
+Usage: python benchmarks/bench_router.py [number]
+"""
+import random
+import re
+import sys
+import time
+
+from mdl.web.router import Router, segment_matcher
+
+BASE_PATHS = ['/api/v1/%s' % name for name in (
+    'users', 'orders', 'items', 'billing', 'search', 'reports',
+    'admin', 'files', 'events', 'teams', 'projects', 'audit')]
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+OPERATIONS = 2000
+
+
+def generate():
+    """ list of (method, path template, request path) """
+    ops = []
+    idx = 0
+    while len(ops) < OPERATIONS:
+        base = BASE_PATHS[idx % len(BASE_PATHS)]
+        kind = idx % 4
+        res = 'res%d' % (idx // len(BASE_PATHS))
+        if kind == 0:
+            path, url = '%s/%s' % (base, res), '%s/%s' % (base, res)
+        elif kind == 1:
+            path = '%s/%s/{id}' % (base, res)
+            url = '%s/%s/%d' % (base, res, idx)
+        elif kind == 2:
+            path = '%s/%s/{id}/items/{name}' % (base, res)
+            url = '%s/%s/%d/items/item%d' % (base, res, idx, idx)
+        else:
+            path = '%s/%s/stats' % (base, res)
+            url = path
+        for method in METHODS[:2]:
+            ops.append((method, path, url))
+        idx += 1
+    return ops[:OPERATIONS]
+
+
+def build_linear(ops):
+    routes = []
+    for method, path, url in ops:
+        pattern = re.sub(r'\{(\w+)\}', r'(?P<\1>[^{}/]+)', path)
+        routes.append((method, re.compile('^%s$' % pattern).match, path))
+
+    def resolve(method, path):
+        for meth, match, route in routes:
+            m = match(path)
+            if m is not None and meth == method:
+                return route, m.groupdict()
+
+    return resolve
+
+
+def build_table(ops):
+    router = Router()
+    matchers = {'id': segment_matcher({'type': 'integer'})}
+    for method, path, url in ops:
+        router.add(method, path, path, matchers)
+    return router.resolve
+
+
+def run(resolve, requests):
+    t = time.perf_counter()
+    for method, url in requests:
+        resolve(method, url)
+    return time.perf_counter() - t
+
+
+def main(number):
+    ops = generate()
+    rnd = random.Random(0)
+    requests = [rnd.choice(ops)[::2] for i in range(number)]
+
+    linear = build_linear(ops)
+    table = build_table(ops)
+    for method, url in requests[:100]:
+        assert linear(method, url)[0] == table(method, url)[0]
+
+    t1 = run(linear, requests)
+    t2 = run(table, requests)
+    print('%d operations, %d requests' % (len(ops), number))
+    print('%-12s %12.2f us' % ('linear', t1 / number * 1e6))
+    print('%-12s %12.2f us' % ('route table', t2 / number * 1e6))
+    print('%-12s %12.1fx' % ('speedup', t1 / t2))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
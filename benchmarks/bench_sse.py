@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Server-sent events fan-out to simulated subscribers.
+
+Each subscriber is an event stream task writing to stream writer of
+fake connection. Part of subscribers are slow, their connection does
+not accept data, so they are handled by slow consumer policy.
+
+Usage: python benchmarks/bench_sse.py [subscribers] [events] [policy]
+"""
+import asyncio
+import sys
+import time
+import types
+
+from mdl._aiohttp.stream import EventStream, StreamWriter
+from mdl.web.sse import EventHub
+
+SLOW_RATIO = 100
+
+
+class Connection(object):
+    """ Response impl and transport of fake connection, transport
+    buffer of slow connection is always full """
+
+    def __init__(self, slow=False):
+        self.transport = self
+        self.slow = slow
+        self.size = 0
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+    def get_write_buffer_size(self):
+        return 1 << 30 if self.slow else 0
+
+    def get_write_buffer_limits(self):
+        return (16 * 1024, 64 * 1024)
+
+    def write(self, data):
+        self.size += len(data)
+        return ()
+
+    @types.coroutine
+    def drain(self):
+        if self.slow:
+            yield from asyncio.Future()
+
+
+def subscriber(hub, slow):
+    conn = Connection(slow)
+    writer = StreamWriter(None, None, conn)
+    stream = EventStream(hub.channel())
+    return conn, asyncio.ensure_future(types.coroutine(stream)(writer))
+
+
+async def run(subscribers, events, policy):
+    hub = EventHub(max_queue=16, policy=policy)
+    conns = []
+    tasks = []
+    for idx in range(subscribers):
+        conn, task = subscriber(hub, not idx % SLOW_RATIO)
+        conns.append(conn)
+        tasks.append(task)
+    await asyncio.sleep(0)
+
+    t = time.perf_counter()
+    publish = 0.0
+    for idx in range(events):
+        p = time.perf_counter()
+        hub.publish({'seq': idx, 'price': 100.5})
+        publish += time.perf_counter() - p
+        # let subscribers write
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+    total = time.perf_counter() - t
+
+    delivered = sum(conn.size for conn in conns if not conn.slow)
+    frames = events * sum(1 for conn in conns if not conn.slow)
+
+    hub.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print('subscribers     %d (%d slow)' % (
+        subscribers, subscribers // SLOW_RATIO))
+    print('events          %d' % events)
+    print('publish         %.2f ms per event' % (publish / events * 1e3))
+    print('fan-out         %.0f frames/s' % (frames / total))
+    print('delivered       %.1f MiB' % (delivered / 1024 ** 2))
+    print('dropped         %d' % hub.dropped)
+    print('disconnected    %d' % hub.disconnected)
+
+
+def main(subscribers, events, policy):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(run(subscribers, events, policy))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+         sys.argv[3] if len(sys.argv) > 3 else 'drop')
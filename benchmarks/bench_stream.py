@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Transport writes for stream of small records, unbuffered vs buffered
+stream writer.
+
+Usage: python benchmarks/bench_stream.py [number]
+"""
+import asyncio
+import sys
+import time
+
+from mdl._aiohttp.stream import StreamSettings, StreamWriter
+
+RECORD = b'data: ' + b'x' * 92 + b'\n\n'
+
+
+class Transport(object):
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def get_write_buffer_limits(self):
+        return (16 * 1024, 64 * 1024)
+
+
+class ResponseImpl(object):
+    """ Counts transport writes """
+
+    def __init__(self):
+        self.transport = Transport()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return ()
+
+
+def run(loop, buffer_size, number):
+    resp = ResponseImpl()
+    writer = StreamWriter(
+        None, None, resp, loop=loop,
+        settings=StreamSettings(buffer_size=buffer_size))
+
+    t = time.perf_counter()
+    for i in range(number):
+        for _ in writer.write(RECORD):
+            pass
+    writer.flush()
+    return time.perf_counter() - t, resp.writes
+
+
+def main(number):
+    loop = asyncio.new_event_loop()
+    t1, w1 = run(loop, 1, number)
+    t2, w2 = run(loop, 16 * 1024, number)
+    loop.close()
+
+    print('%-12s %10s %12s' % ('', 'writes', 'time'))
+    print('%-12s %10d %10.2f us' % ('unbuffered', w1, t1 / number * 1e6))
+    print('%-12s %10d %10.2f us' % ('buffered', w2, t2 / number * 1e6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compare jsonschema validation of request bodies with compiled validators.
+
+Usage: python benchmarks/bench_validators.py [number]
+"""
+import sys
+import timeit
+
+from bravado_core.spec import Spec
+from bravado_core.validate import validate_schema_object
+
+from mdl.schema.validator import get_validator
+
+
+SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'bench', 'version': '1'},
+    'paths': {},
+    'definitions': {
+        'Tag': {
+            'type': 'object',
+            'required': ['name'],
+            'properties': {
+                'name': {'type': 'string', 'maxLength': 32},
+                'weight': {'type': 'number', 'minimum': 0},
+            },
+        },
+        'Item': {
+            'type': 'object',
+            'required': ['id', 'title', 'kind'],
+            'properties': {
+                'id': {'type': 'integer', 'format': 'int64', 'minimum': 1},
+                'title': {'type': 'string', 'minLength': 1,
+                          'maxLength': 200},
+                'kind': {'type': 'string', 'enum': ['a', 'b', 'c']},
+                'code': {'type': 'string', 'pattern': '^[A-Z]{3}-[0-9]+$'},
+                'price': {'type': 'number', 'format': 'double',
+                          'minimum': 0},
+                'active': {'type': 'boolean'},
+                'tags': {'type': 'array', 'maxItems': 10,
+                         'items': {'$ref': '#/definitions/Tag'}},
+            },
+        },
+    },
+}
+
+VALUE = {
+    'id': 10,
+    'title': 'Some title',
+    'kind': 'b',
+    'code': 'ABC-123',
+    'price': 10.5,
+    'active': True,
+    'tags': [{'name': 'one', 'weight': 1}, {'name': 'two'}],
+}
+
+SCHEMAS = {
+    'primitive': {'type': 'integer', 'minimum': 0, 'maximum': 100},
+    'flat object': {
+        'type': 'object',
+        'required': ['a', 'b'],
+        'properties': {'a': {'type': 'string'}, 'b': {'type': 'integer'}},
+    },
+    'nested object': {'$ref': '#/definitions/Item'},
+}
+
+VALUES = {
+    'primitive': 50,
+    'flat object': {'a': 'test', 'b': 1},
+    'nested object': VALUE,
+}
+
+
+def main(number):
+    spec = Spec.from_dict(
+        SPEC, config={'use_models': False, 'validate_responses': False})
+
+    print('%-15s %15s %15s %8s' % ('schema', 'jsonschema', 'compiled', ''))
+    for name, schema in SCHEMAS.items():
+        value = VALUES[name]
+        validate = get_validator(spec, schema)
+
+        t1 = timeit.timeit(
+            lambda: validate_schema_object(spec, schema, value),
+            number=number)
+        t2 = timeit.timeit(lambda: validate(value), number=number)
+
+        print('%-15s %12.2f us %12.2f us %7.1fx' % (
+            name, t1 / number * 1e6, t2 / number * 1e6, t1 / t2))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
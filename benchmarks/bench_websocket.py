@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Inbound websocket messages per second on single core, message is
+decoded, validated and unmarshalled, handler reply is encoded and sent.
+
+Usage: python benchmarks/bench_websocket.py [number]
+"""
+import asyncio
+import collections
+import json
+import sys
+import time
+import types
+
+from aiohttp import WSMsgType
+from bravado_core.spec import Spec
+
+from mdl._aiohttp.websocket import Connection, WebSocketSettings
+
+SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'bench', 'version': '1'},
+    'paths': {
+        '/ws': {
+            'get': {
+                'operationId': 'ws',
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+    },
+    'definitions': {
+        'Message': {
+            'type': 'object',
+            'required': ['op', 'id'],
+            'properties': {
+                'op': {'type': 'string', 'enum': ['quote', 'trade']},
+                'id': {'type': 'integer', 'minimum': 1},
+                'symbol': {'type': 'string', 'maxLength': 12},
+                'price': {'type': 'number', 'minimum': 0},
+                'size': {'type': 'integer', 'minimum': 0},
+            },
+        },
+    },
+}
+
+MESSAGE = json.dumps(
+    {'op': 'trade', 'id': 1, 'symbol': 'ABC', 'price': 10.5, 'size': 100})
+
+Message = collections.namedtuple('Message', 'type data extra')
+
+
+class WebSocket(object):
+    """ Replays same text message `number` times """
+
+    def __init__(self, number):
+        self.remaining = number
+        self.sent = 0
+        self.closed = False
+
+    async def receive(self):
+        if not self.remaining:
+            return Message(WSMsgType.CLOSED, None, None)
+        self.remaining -= 1
+        return Message(WSMsgType.TEXT, MESSAGE, None)
+
+    def send_str(self, data):
+        self.sent += 1
+
+
+async def handler(ctx):
+    message = ctx.message
+    return {'id': message['id'], 'status': 'ok'}
+
+
+async def run(settings, number):
+    ws = WebSocket(number)
+    conn = Connection(ws, settings)
+    ctx = types.SimpleNamespace()
+
+    t = time.perf_counter()
+    await conn.serve(ctx, handler)
+    total = time.perf_counter() - t
+    assert ws.sent == number
+    return total
+
+
+def main(number):
+    spec = Spec.from_dict(SPEC, config={'use_models': False})
+    op = spec.resources['ws'].ws
+
+    loop = asyncio.new_event_loop()
+    print('%-12s %12s %10s' % ('', 'msgs/s', 'per msg'))
+    for name, ws_spec in (
+            ('plain', True),
+            ('validated', {'message': {'$ref': '#/definitions/Message'}})):
+        settings = WebSocketSettings.from_spec(ws_spec, op)
+        total = loop.run_until_complete(run(settings, number))
+        print('%-12s %12.0f %7.2f us' % (
+            name, number / total, total / number * 1e6))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -1,8 +1,12 @@
 """ aiohttp plugin """
 
+from .body import *  # noqa
 from .directives import *  # noqa
 from .stream import *  # noqa
+from .websocket import *  # noqa
 
-__all__ = (directives.__all__ +  # noqa
-           stream.__all__  # noqa
+__all__ = (body.__all__ +  # noqa
+           directives.__all__ +  # noqa
+           stream.__all__ +  # noqa
+           websocket.__all__  # noqa
 )
@@ -0,0 +1,126 @@
+""" Streaming request body """
+import collections
+import mmap
+import tempfile
+
+from aiohttp import web
+
+from ..web.jsonstream import JSONArrayParser
+
+__all__ = ('BodyStream', 'BodyItems')
+
+
+class BodyStream(object):
+    """ Request body as async iterator of chunks
+
+    Data is read from connection only when consumer asks for next
+    chunk, so slow consumer pauses reading from socket.
+    """
+
+    __slots__ = ('content_type', 'charset', '_content', '_max_size', '_size')
+
+    def __init__(self, content, max_size, content_type=None, charset=None):
+        self.content_type = content_type
+        self.charset = charset
+        self._content = content
+        self._max_size = max_size
+        self._size = 0
+
+    @property
+    def size(self):
+        """ Number of bytes read so far """
+        return self._size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await self.readchunk()
+        if not chunk:
+            raise StopAsyncIteration
+        return chunk
+
+    async def readchunk(self):
+        """ Read next chunk, empty bytes at the end of body """
+        chunk = await self._content.readany()
+        if chunk:
+            self._size += len(chunk)
+            if self._size > self._max_size:
+                raise web.HTTPRequestEntityTooLarge(
+                    text='Maximum request body size is {0}'.format(
+                        self._max_size))
+        return chunk
+
+    async def read(self):
+        """ Read rest of the body """
+        chunks = []
+        while True:
+            chunk = await self.readchunk()
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    async def spool(self):
+        """ Write rest of the body to temporary file
+
+        :return: read only mmap of body content or empty bytes
+        """
+        with tempfile.TemporaryFile() as f:
+            while True:
+                chunk = await self.readchunk()
+                if not chunk:
+                    break
+                f.write(chunk)
+
+            f.flush()
+            if not f.tell():
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BodyItems(object):
+    """ Items of JSON array request body as async iterator
+
+    Array is parsed while it is received, each item is validated
+    and unmarshalled before it is returned.
+    """
+
+    __slots__ = ('_stream', '_parser', '_finalize', '_items')
+
+    def __init__(self, stream, finalize):
+        self._stream = stream
+        self._parser = JSONArrayParser(stream.charset or 'utf-8')
+        self._finalize = finalize
+        self._items = collections.deque()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        items = self._items
+        while not items:
+            if self._parser.done:
+                raise StopAsyncIteration
+
+            chunk = await self._stream.readchunk()
+            try:
+                if chunk:
+                    items.extend(self._parser.feed(chunk))
+                else:
+                    items.extend(self._parser.close())
+                    if not items:
+                        raise StopAsyncIteration
+            except ValueError as exc:
+                raise web.HTTPBadRequest(
+                    text='Error reading request body: {0}'.format(exc))
+
+        return self._finalize(items.popleft())
+
+    async def read(self):
+        """ Read rest of the items """
+        result = []
+        while True:
+            try:
+                result.append(await self.__anext__())
+            except StopAsyncIteration:
+                return result
@@ -8,32 +8,48 @@ except ImportError:  # pragma: no cover
     has_aiohttp = False
 
 from .. import interfaces
+from ..web.cache import ResponseCache, SingleFlight, params_key
+from ..web.compression import Compression
 from ..web.context import Params
+from ..web.helpers import not_modified
+from ..web.interfaces import IEventHub, IResponseCache
+from ..web.pipeline import compile_pipeline, is_coroutine
+from ..web.router import segment_matcher
+from ..web.sse import Channel, EventHub
 from ..declarations import implements
 from ..exceptions import ConfigurationError
 from ..loader import Loader
 
 from .interfaces import IRoute
+from .params import DEFAULT_MAX_BODY_SIZE, compile_plan
+from .response import ErrorResponse, PrecompressedCache, header_template
+from .response import item_validator
+from .stream import StreamSettings
 from .web import WebApplication
+from .websocket import Connection, WebSocketSettings
 
 __all__ = ('Loader', 'Application', 'init_applications')
 
+DEFAULT_PRECOMPRESSED_SIZE = 64 * 1024 ** 2
 
-def init_applications(registry, root=None, loop=None):
+
+def init_applications(registry, root=None, loop=None, **kwargs):
+    """ Create root web application for registered applications,
+    `kwargs` are passed to :class:`WebApplication` """
     if loop is None:
         loop = asyncio.get_event_loop()
 
     if root is None:
         for name, app in registry.getUtilitiesFor(interfaces.IApplication):
             if not app.base_path:
-                root = app.init_runtime(loop=loop)
+                root = app.init_runtime(loop=loop, **kwargs)
                 break
         else:
-            root = WebApplication(loop=loop)
+            root = WebApplication(loop=loop, **kwargs)
 
     for name, app in registry.getUtilitiesFor(interfaces.IApplication):
         if app.base_path:
-            app.init_runtime(root)
+            app.init_runtime(root, loop=loop)
 
     return root
 
@@ -59,7 +75,8 @@ class Loader(Loader):
     def create_operation(self, op, app_info, op_info, config):
         route = RouteConfig(
             op, app_info.name, op_info.id, op_info.path,
-            op_info.transform, op_info.errors, op_info.method)
+            op_info.transform, op_info.errors, op_info.method,
+            **op_info.options)
 
         def register():
             route.register(config)
@@ -68,26 +85,68 @@ class Loader(Loader):
 
 
 class Error(object):
+    """ Exception handler
+
+    `handler` is function that accepts context and exception and
+    returns response body, or definition of pre-rendered response:
+    status code or dict with `status`, `body` and `content-type` keys.
+    """
 
     def __init__(self, exc, handler):
         self.exc = exc
-        self.handler = handler
+        if callable(handler):
+            self.handler = handler
+            self.is_coroutine = is_coroutine(handler)
+            self.response = None
+        else:
+            self.handler = None
+            self.is_coroutine = False
+            self.response = ErrorResponse.from_spec(handler)
 
 
 class Errors(object):
-    # very simple exception handling code;
-    # we can use zope.interface adaptation or code generation to make it faster
+    """ Exception handlers, looked up by exception type
 
-    def __init__(self, errors):
+    Handler for most specific class in exception type MRO is used,
+    parent handlers are used if there is no matching handler.
+    Results of lookup are cached by exception type.
+    """
+
+    def __init__(self, errors, parent=None):
         self.errors = errors
+        self.parent = parent
         self.exceptions = tuple(err.exc for err in errors)
+        self._handlers = {err.exc: err for err in errors}
+        self._cache = {}
+
+    def lookup(self, exc_type):
+        """ Find handler for exception type
+
+        :rtype: :class:`Error` or None
+        """
+        try:
+            return self._cache[exc_type]
+        except KeyError:
+            pass
+
+        handlers = self._handlers
+        for tp in exc_type.__mro__:
+            err = handlers.get(tp)
+            if err is not None:
+                break
+        else:
+            if self.parent is not None:
+                err = self.parent.lookup(exc_type)
+
+        self._cache[exc_type] = err
+        return err
 
     def process(self, ctx, exc):
-        for err in self.errors:
-            if isinstance(exc, err.exc):
-                return err.handler(ctx, exc)
+        err = self.lookup(type(exc))
+        if err is None or err.handler is None:
+            raise RuntimeError('Can not find exception handler')
 
-        raise RuntimeError('Can not find exception handler')
+        return err.handler(ctx, exc)
 
 
 class Route(object):
@@ -95,21 +154,158 @@ class Route(object):
 
     _is_coroutine = True
 
-    def __init__(self, registry, name, path, transform, markers=(), **options):
+    def __init__(self, registry, name, path, transforms,
+                 errors=None, markers=(), **options):
         self.registry = registry
         self.name = name
         self.path = path
-        self.transform = transform
+        self.transforms = transforms
+        self.errors = errors if errors is not None else Errors(())
+        self.pipeline = compile_pipeline((), transforms, ())
         self.options = options
         self.markers = markers
         self.op = self.options.pop('op')
-        self.params_cls = Params.generate_class(self.op)
+        self.compression = Compression.from_spec(
+            self.get_option('compression'))
+        self.precompressed = None
+        self.precompressed_max_size = None
+        self.cache = None
+        self.etag = bool(self.get_option('etag'))
+        self.version = None
+        self.version_is_coroutine = False
+        self.stream = StreamSettings.from_spec(self.get_option('stream'))
+        self.validate_items = None
+        if self.stream is not None and self.stream.validate:
+            self.validate_items = item_validator(self.op)
+        self.events = 'text/event-stream' in (self.op.produces or ())
+        self.event_hub = None
+        self.heartbeat = None
+        self.websocket = WebSocketSettings.from_spec(
+            self.get_option('websocket'), self.op, registry)
+        self.coalesce = SingleFlight() if self.get_option('coalesce') else None
+        self.header_template = header_template(
+            self.op, self.get_option('headers'),
+            self.compression is not None or
+            bool(self.get_option('precompressed')))
+        self.params_cls = Params.generate_class(
+            self.op, lazy=self.get_option('lazy_params', False))
+        compile_plan(
+            self.params_cls, registry,
+            self.get_option('max_body_size', DEFAULT_MAX_BODY_SIZE),
+            self.get_option('spool_body', False))
 
     def get_option(self, name, default=None):
         return self.options.get(name, default)
 
-    async def __call__(self, request):
-        return (await self.transform(request))
+    def matchers(self):
+        """ Path segment matchers for path parameters """
+        return {param.name: segment_matcher(param.param_spec)
+                for param in self.op.params.values()
+                if param.location == 'path'}
+
+    def init_pipeline(self, itransform=(), otransform=()):
+        """ Compile application and route transforms, resource version
+        is checked, stored responses are looked up and calls are
+        coalesced after in transforms, so they can reject request """
+        prepare = None
+        if self.websocket is None and (
+                self.version is not None or
+                self.precompressed is not None or self.cache is not None or
+                self.coalesce is not None):
+            prepare = self._prepare
+        if self.coalesce is not None:
+            # shared call of route transforms, handler and out transforms
+            self._process = compile_pipeline(
+                (), self.transforms, otransform)
+
+        self.pipeline = compile_pipeline(
+            itransform, self.transforms, otransform, prepare)
+
+    def cache_key(self, ctx):
+        return (self.name, params_key(ctx.params))
+
+    async def __call__(self, ctx):
+        if self.websocket is not None:
+            conn = await Connection.accept(ctx.request, self.websocket)
+            return (await conn.serve(ctx, self.pipeline, self.errors))
+        if self.events:
+            return (await self._events_call(ctx))
+
+        return (await self.pipeline(ctx))
+
+    async def _prepare(self, ctx):
+        if self.version is not None:
+            # resource version is checked before handler call
+            etag = self.version(ctx)
+            if self.version_is_coroutine:
+                etag = await etag
+            if etag is not None:
+                response = ctx.response
+                response.etag = etag
+                if not_modified(ctx.request.method, ctx.request.headers,
+                                response.etag, None):
+                    response.set_status(304)
+                    return b''
+
+        # stored responses skip route transforms and handler
+        if self.precompressed is not None:
+            body = self.precompressed.get(self.cache_key(ctx))
+            if body is not None:
+                return body
+        if self.cache is not None:
+            body = self.cache.get(self.cache.key(ctx))
+            if body is not None:
+                return body
+
+        if self.coalesce is not None:
+            # concurrent requests with same parameters share handler call
+            status, reason, headers, body = await self.coalesce.do(
+                self.cache_key(ctx), self._shared_call, ctx)
+            response = ctx.response
+            response.set_status(status, reason)
+            if headers is not None:
+                response._headers = headers.copy()
+            return body
+
+    async def _events_call(self, ctx):
+        # handler gets channel of subscriber, channel is
+        # response body if handler does not return other body
+        if self.event_hub is not None:
+            channel = ctx.channel = self.event_hub.channel()
+        else:
+            channel = ctx.channel = Channel()
+
+        try:
+            body = await self.pipeline(ctx)
+        except BaseException:
+            channel.close()
+            raise
+
+        if body is None:
+            return channel
+        if body is not channel:
+            channel.close()
+        return body
+
+    async def _shared_call(self, ctx):
+        body = await self._process(ctx)
+
+        # iterator is consumed by single renderer, items are
+        # collected so every request renders same items
+        if hasattr(body, '__aiter__'):
+            items = []
+            async for item in body:
+                items.append(item)
+            body = tuple(items)
+        elif hasattr(body, '__next__'):
+            body = tuple(body)
+
+        # response of first request is rendered after this call
+        # completes, other requests get copy of status and headers
+        response = ctx.response
+        headers = response._headers
+        return (response.status, response.reason,
+                headers.copy() if headers is not None else None, body)
 
 
 class RuntimeApplication(object):
@@ -124,6 +320,7 @@ class RuntimeApplication(object):
         self.in_transform = itransform
         self.out_transform = otransform
         self.errors = errors
+        self.precompressed = PrecompressedCache(DEFAULT_PRECOMPRESSED_SIZE)
         self._routes = {}
 
     def keys(self):
@@ -141,15 +338,51 @@ class RuntimeApplication(object):
     def register_route(self, route):
         self._routes[route.name] = route
 
-    def init_runtime(self, root=None, loop=None):
-        app = WebApplication(loop=loop)
+        # precompressed bodies of all routes share application cache,
+        # `max-size` limits size of body of this route
+        spec = route.get_option('precompressed')
+        if spec:
+            if isinstance(spec, dict) and 'max-size' in spec:
+                route.precompressed_max_size = int(spec['max-size'])
+            route.precompressed = self.precompressed
+
+    def invalidate(self, name=None):
+        """ Drop precompressed responses of route `name`,
+        or of all routes if name is not specified """
+        self.precompressed.invalidate(name)
+
+    def init_runtime(self, root=None, loop=None, **kwargs):
+        """ Create web application
+
+        Routes are registered in route table of `root` application
+        with full path, `base_path` is used as path prefix. Application
+        is mounted to `root` as sub application, so it gets signals of
+        root application and its aiohttp routes are resolved. If `root`
+        has no mdl route table, routes are resolved by aiohttp router
+        of application.
+        """
+        app = WebApplication(loop=loop, **kwargs)
+        if root is None:
+            table, owner = app, None
+        elif hasattr(root, 'add_mdl_route'):
+            table, owner = root, app
+        else:
+            table, owner = None, None
 
+        base_path = (self.base_path or '').rstrip('/')
         for route in self.routes():
+            route.init_pipeline(self.in_transform, self.out_transform)
+
             method = route.get_option('method', hdrs.METH_ANY)
-            app.router.add_route(method, route.path, route)
+            if table is not None:
+                table.add_mdl_route(
+                    method, base_path + route.path, route, owner,
+                    route.matchers())
+            else:
+                app.router.add_route(method, route.path, route)
 
         if root is not None:
-            root.add_subapp(app.base_path, app)
+            root.add_subapp(base_path, app)
 
         return app
 
@@ -227,5 +460,35 @@ class RouteConfig(object):
         # route registration
         route = Route(
             config.registry, self.name, self.path,
-            transforms[0], op=self.op, **self.options)
+            tuple(transforms), Errors(errors, app.errors),
+            op=self.op, **self.options)
+
+        # resource version for conditional requests
+        version = route.get_option('version')
+        if version:
+            route.version = config.maybe_dotted(version)
+            route.version_is_coroutine = is_coroutine(route.version)
+
+        # server-sent events hub
+        spec = route.get_option('event_hub')
+        if spec:
+            if not isinstance(spec, dict):
+                spec = {'name': spec}
+            hub = config.registry.queryUtility(IEventHub, name=spec['name'])
+            if hub is None:
+                hub = EventHub.from_spec(spec)
+                config.registry.registerUtility(
+                    hub, IEventHub, name=spec['name'])
+            route.event_hub = hub
+            heartbeat = spec.get('heartbeat')
+            route.heartbeat = float(heartbeat) if heartbeat else None
+
+        # response cache
+        cache = ResponseCache.from_spec(
+            route.get_option('cache'), route.params_cls)
+        if cache is not None:
+            route.cache = cache
+            config.registry.registerUtility(
+                cache, IResponseCache, name='%s.%s' % (self.app, self.name))
+
         app.register_route(route)
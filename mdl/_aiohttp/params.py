@@ -1,85 +1,414 @@
 """Unmarshall swagger request parameters."""
 from functools import partial
-from six import iteritems
 
+from aiohttp import hdrs, web
 from bravado_core import schema
 from bravado_core.exception import SwaggerMappingError
+from bravado_core.param import CAST_TYPE_TO_FUNC
 from bravado_core.param import cast_request_param, get_param_type_spec
 from bravado_core.param import unmarshal_collection_format
 from bravado_core.unmarshal import unmarshal_schema_object
-from bravado_core.validate import validate_schema_object
 from bravado_core.validate import validate_security_object
+from jsonschema import ValidationError
 
+from ..schema.validator import get_validator
 from ..swagger import Location
+from ..web.codecs import get_decoder
+from ..web.context import LazyParams
+
+from .body import BodyItems, BodyStream
+
+DEFAULT_MAX_BODY_SIZE = 1024 ** 2
+
+
+class RequestValidationError(ValidationError):
+    """Request parameter is invalid, raised by parameters that are
+    validated after handler is called."""
+
+
+class UnmarshalPlan(object):
+    """Unmarshalling steps for a swagger operation, resolved once.
+
+    `params` is a tuple of `(name, step)` pairs, where `step(request)`
+    returns the unmarshalled value of a non-body parameter, `body` is
+    `(name, read, finalize)` or None, coroutine `read(request)` returns
+    raw body and `finalize(raw)` returns unmarshalled value.
+    `security` contains names of parameters used by security
+    requirements if requests are validated.
+    """
+
+    __slots__ = ('op', 'params', 'body', 'security', 'lazy')
+
+    def __init__(self, op, params, body, security, lazy):
+        self.op = op
+        self.params = params
+        self.body = body
+        self.security = security
+        self.lazy = lazy
+
+
+def compile_plan(cls, registry=None,
+                 max_body_size=DEFAULT_MAX_BODY_SIZE, spool_body=False):
+    """Build unmarshal plan for generated params class.
+
+    :type cls: :class:`mdl.web.context.Params`
+    :param max_body_size: maximum size of request body in bytes
+    :param spool_body: spool streaming body to temporary file
+    :rtype: :class:`UnmarshalPlan`
+    """
+    op = cls.__oper__
+
+    params = []
+    body = None
+    for name, param in op.params.items():
+        if param.location == Location.body:
+            body = (name,) + compile_body(
+                param, registry, max_body_size, spool_body)
+        else:
+            params.append((name, compile_param(param)))
+
+    security = ()
+    if op.swagger_spec.config['validate_requests']:
+        security = tuple(sorted(
+            {param.name
+             for requirement in op.security_requirements
+             for param in requirement}))
+
+    lazy = issubclass(cls, LazyParams)
+    if lazy:
+        mapping = cls.__mapping__
+        cls.__resolvers__ = resolvers = {
+            mapping[name]: _lazy_step(step) for name, step in params}
+        if body is not None:
+            resolvers[mapping[body[0]]] = _lazy_body(body[2])
+
+    plan = cls.__plan__ = UnmarshalPlan(
+        op, tuple(params), body, security, lazy)
+    return plan
+
+
+def _lazy_step(step):
+    def resolve(params):
+        try:
+            return step(params.__request__)
+        except ValidationError as exc:
+            raise RequestValidationError.create_from(exc)
+    return resolve
+
+
+def _lazy_body(finalize):
+    def resolve(params):
+        try:
+            return finalize(params.__body__)
+        except ValidationError as exc:
+            raise RequestValidationError.create_from(exc)
+    return resolve
 
 
 async def unmarshal_request(cls, request):
     """Unmarshal Swagger request parameters from the passed in request like
     object.
 
+    Parameters of lazy params class are unmarshalled on first access,
+    only body is read from request.
+
+    :type cls: :class:`mdl.web.context.Params`
     :type request: :class: `aiohttp.web.Request`.
-    :type op: :class:`bravado_core.operation.Operation`
-    :returns: dict where (key, value) = (param_name, param_value)
+    :returns: instance of `cls`
     """
-    request_data = {}
-    for param_name, param in iteritems(cls.__oper__.params):
-        param_value = await unmarshal_param(param, request)
-        request_data[param.attr_name] = param_value
+    plan = cls.__plan__
 
-    if cls.__oper__.swagger_spec.config['validate_requests']:
-        validate_security_object(cls.__oper__, request_data)
+    if plan.lazy:
+        body = None
+        if plan.body is not None:
+            body = await plan.body[1](request)
 
-    return cls(**request_data)
+        params = cls(request, body)
+        if plan.security:
+            mapping = cls.__mapping__
+            validate_security_object(
+                plan.op, {name: getattr(params, mapping[name], None)
+                          for name in plan.security if name in mapping})
+        return params
 
+    values = [step(request) for name, step in plan.params]
+    if plan.body is not None:
+        name, read, finalize = plan.body
+        values.append(finalize(await read(request)))
 
-async def unmarshal_param(param, request):
-    """Unmarshal the given parameter from the passed in request like object.
+    if plan.security:
+        request_data = {name: value for (name, _), value
+                        in zip(plan.params, values)}
+        validate_security_object(plan.op, request_data)
 
-    :type param: :class:`bravado_core.param.Param`
-    :type request: :class:`bravado_core.request.IncomingRequest`
-    :return: value of parameter
-    """
+    return cls(*values)
+
+
+def _param_spec(param):
     swagger_spec = param.swagger_spec
     deref = swagger_spec.deref
     param_spec = deref(get_param_type_spec(param))
+    return param_spec, deref(param_spec.get('type'))
+
+
+def _finalize(param, param_spec, param_type):
+    """Build function that validates and unmarshals raw value."""
+    swagger_spec = param.swagger_spec
+    required = schema.is_required(swagger_spec, param_spec)
+    collection = (param_type == 'array' and
+                  param.location != Location.body)
+    if swagger_spec.config['validate_requests']:
+        validate = get_validator(swagger_spec, param_spec)
+    else:
+        validate = None
+
+    def finalize(raw_value):
+        if raw_value is None and not required:
+            return None
+
+        if collection:
+            raw_value = unmarshal_collection_format(
+                swagger_spec, param_spec, raw_value)
+
+        if validate is not None:
+            validate(raw_value)
+
+        return unmarshal_schema_object(swagger_spec, param_spec, raw_value)
+
+    return finalize
+
+
+def _extractor(param, param_spec, param_type):
+    """Build function that extracts raw value from request."""
+    name = param.name
     location = param.location
-    param_type = deref(param_spec.get('type'))
-    cast_param = partial(cast_request_param, param_type, param.name)
+    default = schema.get_default(param.swagger_spec, param_spec)
 
-    default_value = schema.get_default(swagger_spec, param_spec)
+    if param_type in CAST_TYPE_TO_FUNC:
+        cast = partial(cast_request_param, param_type, name)
+    else:
+        cast = None
 
     if location == Location.path:
-        raw_value = cast_param(request.match_info.get(param.name, None))
+        def get(request):
+            return request.match_info.get(name, None)
     elif location == Location.query:
-        raw_value = cast_param(request.query.get(param.name, default_value))
+        def get(request):
+            return request.query.get(name, default)
     elif location == Location.header:
-        raw_value = cast_param(request.headers.get(param.name, default_value))
+        def get(request):
+            return request.headers.get(name, default)
+    elif location == Location.form_data and param_type == 'file':
+        def get(request):
+            return request.files.get(name, None)
     elif location == Location.form_data:
-        if param_type == 'file':
-            raw_value = request.files.get(param.name, None)
-        else:
-            raw_value = cast_param(request.form.get(param.name, default_value))
-    elif location == Location.body:
-        # TODO: verify content-type header
-        try:
-            raw_value = request.json()
-        except ValueError as json_error:
-            raise SwaggerMappingError("Error reading request body JSON: {0}".
-                                      format(str(json_error)))
+        def get(request):
+            return request.form.get(name, default)
     else:
         raise SwaggerMappingError(
             "Don't know how to unmarshal_param with location {0}".
             format(location))
 
-    if raw_value is None and not schema.is_required(swagger_spec, param_spec):
-        return None
+    if cast is None:
+        return get
+
+    def extract(request):
+        return cast(get(request))
+
+    return extract
+
+
+def compile_param(param):
+    """Compile unmarshal step for non-body parameter.
+
+    :type param: :class:`bravado_core.param.Param`
+    :return: function that accepts request and returns value of parameter
+    """
+    param_spec, param_type = _param_spec(param)
+    extract = _extractor(param, param_spec, param_type)
+    finalize = _finalize(param, param_spec, param_type)
+
+    def step(request):
+        return finalize(extract(request))
 
-    if param_type == 'array' and location != Location.body:
-        raw_value = unmarshal_collection_format(
-            swagger_spec, param_spec, raw_value)
+    return step
+
+
+async def read_body(request, max_size):
+    """Read request body, body size is limited by `max_size`.
+
+    :type request: :class: `aiohttp.web.Request`.
+    :rtype: bytes | bytearray
+    """
+    content = request.content
+    length = request.content_length
+
+    if length is not None:
+        if length > max_size:
+            raise web.HTTPRequestEntityTooLarge(
+                text='Maximum request body size is {0}'.format(max_size))
+
+        buf = bytearray(length)
+        view = memoryview(buf)
+        pos = 0
+        while pos < length:
+            chunk = await content.readany()
+            if not chunk:
+                raise web.HTTPBadRequest(text='Incomplete request body')
+
+            end = pos + len(chunk)
+            if end > length:
+                raise web.HTTPBadRequest(
+                    text='Request body is larger than Content-Length')
+
+            view[pos:end] = chunk
+            pos = end
+
+        return buf
+
+    size = 0
+    chunks = []
+    while True:
+        chunk = await content.readany()
+        if not chunk:
+            break
+
+        size += len(chunk)
+        if size > max_size:
+            raise web.HTTPRequestEntityTooLarge(
+                text='Maximum request body size is {0}'.format(max_size))
+        chunks.append(chunk)
+
+    return b''.join(chunks)
+
+
+def _content_type(param, registry):
+    """Build function that returns media type and decoder of request."""
+    consumes = tuple(param.op.consumes or ('application/json',))
+    default_type = consumes[0]
+    any_type = '*/*' in consumes
+    decoders = {media_type: get_decoder(registry, media_type)
+                for media_type in consumes}
+
+    def content_type(request, CONTENT_TYPE=hdrs.CONTENT_TYPE):
+        if CONTENT_TYPE in request.headers:
+            media_type = request.content_type
+        else:
+            media_type = default_type
+
+        try:
+            return media_type, decoders[media_type]
+        except KeyError:
+            if not any_type:
+                raise web.HTTPUnsupportedMediaType(
+                    text='Unsupported media type: {0}'.format(media_type))
+            return media_type, get_decoder(registry, media_type)
+
+    return content_type
+
+
+def compile_body(param, registry=None,
+                 max_body_size=DEFAULT_MAX_BODY_SIZE, spool_body=False):
+    """Compile unmarshal steps for body parameter.
+
+    Body is decoded with decoder registered for request content type,
+    content type has to be listed in operation `consumes`.
+    Body with `format: stream` is not read, value of parameter is
+    :class:`BodyStream` or mmap of spooled body if `spool_body` is set.
+    Array body with `format: stream` is :class:`BodyItems`.
+
+    :type param: :class:`bravado_core.param.Param`
+    :return: tuple of coroutine function that accepts request and
+             returns raw body and function that accepts raw body and
+             returns value of parameter
+    """
+    param_spec, param_type = _param_spec(param)
+    content_type = _content_type(param, registry)
+
+    if param_spec.get('format') == 'stream':
+        if param_type == 'array':
+            return _compile_items(param, param_spec, content_type,
+                                  max_body_size)
+        return _compile_stream(content_type, max_body_size, spool_body)
+
+    finalize = _finalize(param, param_spec, param_type)
+
+    async def read(request):
+        media_type, decode = content_type(request)
+
+        data = await read_body(request, max_body_size)
+        if not data:
+            return None
+
+        return data, decode, request.charset
+
+    def decode(raw):
+        if raw is None:
+            return finalize(None)
+
+        data, decode, charset = raw
+        if decode is None:
+            return finalize(bytes(data))
+
+        try:
+            raw_value = decode(data, charset)
+        except ValueError as exc:
+            raise web.HTTPBadRequest(
+                text='Error reading request body: {0}'.format(exc))
+
+        return finalize(raw_value)
+
+    return read, decode
+
+
+def _open_stream(request, content_type, max_body_size):
+    media_type, _ = content_type(request)
+
+    length = request.content_length
+    if length is not None and length > max_body_size:
+        raise web.HTTPRequestEntityTooLarge(
+            text='Maximum request body size is {0}'.format(max_body_size))
+
+    return BodyStream(
+        request.content, max_body_size, media_type, request.charset)
+
+
+def _compile_stream(content_type, max_body_size, spool_body):
+    async def read(request):
+        stream = _open_stream(request, content_type, max_body_size)
+        if spool_body:
+            return await stream.spool()
+        return stream
+
+    def decode(raw):
+        return raw
+
+    return read, decode
+
+
+def _compile_items(param, param_spec, content_type, max_body_size):
+    swagger_spec = param.swagger_spec
+    items_spec = swagger_spec.deref(param_spec.get('items', {}))
 
     if swagger_spec.config['validate_requests']:
-        validate_schema_object(swagger_spec, param_spec, raw_value)
+        validate = get_validator(swagger_spec, items_spec)
+    else:
+        validate = None
+
+    def finalize(item):
+        if validate is not None:
+            try:
+                validate(item)
+            except ValidationError as exc:
+                # items are validated while handler reads them
+                raise RequestValidationError.create_from(exc)
+        return unmarshal_schema_object(swagger_spec, items_spec, item)
+
+    async def read(request):
+        return BodyItems(
+            _open_stream(request, content_type, max_body_size), finalize)
+
+    def decode(raw):
+        return raw
 
-    value = unmarshal_schema_object(swagger_spec, param_spec, raw_value)
-    return value
+    return read, decode
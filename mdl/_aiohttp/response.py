@@ -1,27 +1,196 @@
 """ Response renderer """
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from email.utils import formatdate
+
+from aiohttp import web
 from aiohttp.protocol import HttpVersion10, HttpVersion11
 from aiohttp.protocol import WebResponse as ResponseImpl
+from multidict import CIMultiDictProxy
 
+from ..schema.validator import get_validator
 from ..web import hdrs
-from ..web.interfaces import IStream
-from ..web.response import ContentCoding
+from ..web.cache import CachedResponse, LRUCache
+from ..web.codecs import get_encoder
+from ..web.compression import Compression
+from ..web.helpers import if_range_match, not_modified, parse_range
+from ..web.interfaces import ISeekableStream, IStream
+from ..web.jsonstream import get_serializer
+from ..web.response import ContentCoding, HeaderTemplate, Response
+from ..web.sse import Channel
+
+from .stream import DEFAULT_STREAM_SETTINGS, EventStream, FileBody
+from .stream import ItemStream, RangeStream, StreamWriter
+
+DEFAULT_COMPRESSION = Compression()
+
+
+def header_template(op, headers=None, vary=False):
+    """ Precompute response headers for operation, `headers` are static
+    headers declared with `x-mdl-headers`, `vary` adds Vary header for
+    Accept-Encoding """
+    items = [(hdrs.SERVER, ResponseImpl.SERVER_SOFTWARE)]
+    if vary:
+        items.append((hdrs.VARY, 'Accept-Encoding'))
+    if headers:
+        items.extend((name, str(value)) for name, value in headers.items())
+
+    produces = op.produces
+    return HeaderTemplate(produces[0] if produces else None, items)
+
+
+def multipart_byteranges(ranges, size, content_type, boundary):
+    """ Delimiters of multipart/byteranges body
+
+    :return: tuple of list of part heads and trailer
+    """
+    heads = []
+    for start, end in ranges:
+        head = '--{0}\r\n'.format(boundary)
+        if content_type:
+            head += 'Content-Type: {0}\r\n'.format(content_type)
+        head += 'Content-Range: bytes {0}-{1}/{2}\r\n\r\n'.format(
+            start, end - 1, size)
+        heads.append(('\r\n' + head if heads else head).encode('latin-1'))
+
+    return heads, '\r\n--{0}--\r\n'.format(boundary).encode('latin-1')
+
+
+def item_validator(op):
+    """ Validator of items of array response schema of operation,
+    None if response is not array """
+    deref = op.swagger_spec.deref
+    responses = op.op_spec.get('responses', {})
+    response = deref(responses.get('200') or responses.get('default'))
+    if not response:
+        return None
+
+    schema = deref(response.get('schema'))
+    if not schema or schema.get('type') != 'array':
+        return None
+    return get_validator(op.swagger_spec, deref(schema.get('items', {})))
+
+
+class PrecompressedBody(object):
+    """ Response body encoded with all content codings
+
+    Compressed variant is kept only if it is smaller than body.
+    Each variant has strong ETag.
+    """
+
+    __slots__ = ('content_type', 'variants', 'etags', 'size')
+
+    def __init__(self, body, content_type, compression):
+        body = bytes(body)
+        self.content_type = content_type
+        self.variants = {ContentCoding.identity: body}
+        for coding in compression.codings:
+            data = compression.compress(coding, body)
+            if len(data) < len(body):
+                self.variants[coding] = data
+
+        digest = hashlib.sha1(body).hexdigest()
+        self.etags = {
+            coding: ('"{0}"'.format(digest)
+                     if coding is ContentCoding.identity else
+                     '"{0}-{1}"'.format(digest, coding.value))
+            for coding in self.variants}
+        self.size = sum(len(data) for data in self.variants.values())
+
+    def __len__(self):
+        return self.size
+
+    def render(self, headers, accept_encoding, compression):
+        """ Select variant for Accept-Encoding and set headers """
+        coding = compression.negotiate(accept_encoding)
+        body = self.variants.get(coding)
+        if body is None:
+            coding = ContentCoding.identity
+            body = self.variants[coding]
+        else:
+            headers[hdrs.CONTENT_ENCODING] = coding.value
 
-from .stream import StreamWriter
+        headers[hdrs.ETAG] = self.etags[coding]
+        if self.content_type is not None:
+            headers[hdrs.CONTENT_TYPE] = self.content_type
+        return body
+
+
+class PrecompressedCache(LRUCache):
+    """ Cache of precompressed response bodies, limited by total size
+    of all variants. Keys are tuples of route name and parameters. """
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.clear()
+        else:
+            self.discard(lambda key: key[0] == name)
+
+
+class DateHeader(object):
+    """ Value for Date header, refreshed once per second by loop timer
+
+    Timer is started on first call.
+    """
+
+    __slots__ = ('loop', '_value', '_handle')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self._value = None
+        self._handle = None
+
+    def __call__(self):
+        if self._handle is None:
+            self._update()
+        return self._value
+
+    def _update(self):
+        now = time.time()
+        self._value = formatdate(now, usegmt=True)
+        # schedule next update at beginning of next second
+        self._handle = self.loop.call_later(1.0 - now % 1.0, self._update)
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
 
 
 class ResponseRenderer(object):
 
-    def __init__(self, ctx, body):
+    __slots__ = ('ctx', 'op', 'request', 'response', 'body', 'app',
+                 'route', 'writer', 'eof_sent', 'resp_impl', 'keep_alive',
+                 '_lengths')
+
+    def __init__(self, ctx, body, app=None, route=None):
         self.ctx = ctx
         self.op = ctx.op
         self.request = None
         self.response = ctx.response
         self.body = body
+        self.app = app
+        self.route = route
 
         self.writer = None
         self.eof_sent = False
         self.resp_impl = None
         self.keep_alive = None
+        self._lengths = (0, 0)
+
+    def reset(self):
+        """ Drop request data before reuse, `status`, `keep_alive`,
+        `body_length` and `output_length` are still available for
+        server access log """
+        resp_impl = self.resp_impl
+        if resp_impl is not None:
+            self._lengths = (resp_impl.body_length, resp_impl.output_length)
+
+        self.ctx = self.op = self.request = self.body = None
+        self.writer = self.resp_impl = self.app = self.route = None
 
     @property
     def status(self):
@@ -29,37 +198,147 @@ class ResponseRenderer(object):
 
     @property
     def body_length(self):
-        return self.resp_impl.body_length
+        resp_impl = self.resp_impl
+        if resp_impl is None:
+            return self._lengths[0]
+        return resp_impl.body_length
 
     @property
     def output_length(self):
-        return self.resp_impl.output_length
+        resp_impl = self.resp_impl
+        if resp_impl is None:
+            return self._lengths[1]
+        return resp_impl.output_length
 
     def prepare(self, request,
                 HttpVersion10=HttpVersion10,
                 HttpVersion11=HttpVersion11,
                 CONNECTION=hdrs.CONNECTION,
+                CONTENT_ENCODING=hdrs.CONTENT_ENCODING,
+                CONTENT_LENGTH=hdrs.CONTENT_LENGTH,
                 DATE=hdrs.DATE,
+                ETAG=hdrs.ETAG,
+                LAST_MODIFIED=hdrs.LAST_MODIFIED,
+                RANGE=hdrs.RANGE,
                 SERVER=hdrs.SERVER,
                 SET_COOKIE=hdrs.SET_COOKIE,
                 TRANSFER_ENCODING=hdrs.TRANSFER_ENCODING):
 
         yield from request._prepare_hook(self.response)
 
-        # set content type
-        if self.response.content_type is None:
-            self.response.content_type = self.op.produces[0]
+        response = self.response
+        body = self.body
+        route = self.route
+        template = route.header_template if route is not None else None
+        from_cache = body.__class__ is CachedResponse
+        if from_cache:
+            response.set_status(body.status, body.reason)
+            response._headers = body.headers.copy()
+            body = body.body
+        elif template is not None and response._headers is None:
+            # headers are not modified, copy precomputed headers
+            if isinstance(body, str):
+                response._headers = template.text.copy()
+                body = body.encode(template.charset)
+            else:
+                response._headers = template.binary.copy()
+        else:
+            # set content type
+            if response.content_type is None:
+                response.content_type = self.op.produces[0]
+
+            # respone body
+            if isinstance(body, str):
+                charset = response.charset
+                if charset is None:
+                    charset = 'utf-8'
+                    response.charset = charset
+
+                body = body.encode(charset)
+
+        headers = response.headers
+        if response._cookies:
+            for cookie in response._cookies.values():
+                value = cookie.output(header='')[1:]
+                headers.add(SET_COOKIE, value)
+
+        if body.__class__ is Channel:
+            body = self._event_stream(request, headers, body)
+        elif (body.__class__ is list or body.__class__ is tuple or
+                hasattr(body, '__next__') or hasattr(body, '__aiter__')):
+            body = self._item_stream(request, body)
 
-        # respone body
-        if isinstance(self.body, str):
-            charset = self.response.charset
-            if charset is None:
-                charset = 'utf-8'
-                self.response.charset = charset
+        is_stream = IStream.providedBy(body)
+        if body.__class__ is FileBody:
+            body.set_headers(headers)
 
-            body = self.body.encode(charset)
+        if (route is not None and route.etag and ETAG not in headers and
+                self._cacheable(headers, body, is_stream)):
+            headers[ETAG] = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+
+        # cached response is not stored again, so it expires
+        if (route is not None and route.cache is not None and
+                not from_cache and self._cacheable(headers, body, is_stream)):
+            cached = headers.copy()
+            if SET_COOKIE in cached:
+                del cached[SET_COOKIE]
+            route.cache.set(
+                route.cache.key(self.ctx), CachedResponse(
+                    response.status, response.reason,
+                    CIMultiDictProxy(cached), bytes(body)))
+
+        coding = compression = None
+        if body.__class__ is PrecompressedBody:
+            body = body.render(
+                headers, request.headers.get(hdrs.ACCEPT_ENCODING),
+                route.compression or DEFAULT_COMPRESSION)
+        elif (route is not None and route.precompressed is not None and
+                self._cacheable(headers, body, is_stream) and
+                (route.precompressed_max_size is None or
+                 len(body) <= route.precompressed_max_size)):
+            compression = route.compression or DEFAULT_COMPRESSION
+            if len(body) >= compression.offload_size:
+                # large body, do not block event loop
+                loop, executor = self._executor()
+                entry = yield from loop.run_in_executor(
+                    executor, PrecompressedBody,
+                    body, headers.get(hdrs.CONTENT_TYPE), compression)
+            else:
+                entry = PrecompressedBody(
+                    body, headers.get(hdrs.CONTENT_TYPE), compression)
+            route.precompressed.set(route.cache_key(self.ctx), entry)
+            body = entry.render(
+                headers, request.headers.get(hdrs.ACCEPT_ENCODING),
+                compression)
         else:
-            body = self.body
+            coding, compression = self._select_coding(request, headers, body)
+            if coding is not None and ETAG in headers:
+                # compressed representation is not byte-identical
+                etag = headers[ETAG]
+                if not etag.startswith('W/'):
+                    headers[ETAG] = 'W/' + etag
+
+        # conditional request
+        if response.status == 304 or (
+                response.status == 200 and not_modified(
+                    request.method, request.headers,
+                    headers.get(ETAG), headers.get(LAST_MODIFIED))):
+            response.set_status(304)
+            coding = None
+            body = b''
+            for name in (CONTENT_ENCODING, CONTENT_LENGTH,
+                         hdrs.CONTENT_TYPE, TRANSFER_ENCODING):
+                if name in headers:
+                    del headers[name]
+
+        # byte ranges, not supported for compressed responses
+        if (coding is None and response.status == 200 and
+                not response.chunked and CONTENT_ENCODING not in headers):
+            if ISeekableStream.providedBy(body):
+                body = self._ranges(request, headers, body, body.size)
+            elif isinstance(body, (bytes, bytearray, memoryview)):
+                if RANGE in request.headers:
+                    body = self._ranges(request, headers, body, len(body))
 
         # keep-alive
         keep_alive = self.ctx.keep_alive
@@ -71,37 +350,52 @@ class ResponseRenderer(object):
 
         resp_impl = self.resp_impl = ResponseImpl(
             request._writer,
-            self.response.status,
+            response.status,
             version,
             not keep_alive,
-            self.response.reason)
-
-        headers = self.response.headers
-        # for cookie in self.ctx.response.cookies.values():
-        #    value = cookie.output(header='')[1:]
-        #    headers.add(SET_COOKIE, value)
+            response.reason)
 
-        if self.response.content_coding is not None:
-            self._start_compression(request)
+        if coding is not None:
+            headers[CONTENT_ENCODING] = coding.value
+            if is_stream or response.chunked:
+                headers.pop(CONTENT_LENGTH, None)
+                resp_impl.add_compression_filter(coding.value)
+            else:
+                if len(body) >= compression.offload_size:
+                    # large body, do not block event loop
+                    loop, executor = self._executor()
+                    body = yield from loop.run_in_executor(
+                        executor, compression.compress, coding, body)
+                else:
+                    body = compression.compress(coding, body)
+                headers[CONTENT_LENGTH] = str(len(body))
 
-        if self.response.chunked:
+        if response.status == 304:
+            resp_impl.length = 0
+        elif response.chunked:
             if request.version != HttpVersion11:
                 raise RuntimeError(
                     "Using chunked encoding is forbidden "
                     "for HTTP/{0.major}.{0.minor}".format(request.version))
             resp_impl.chunked = True
-            if self.response.chunk_size:
-                resp_impl.add_chunking_filter(self.response.chunk_size)
+            if response.chunk_size:
+                resp_impl.add_chunking_filter(response.chunk_size)
             headers[TRANSFER_ENCODING] = 'chunked'
         else:
-            content_length = self.response.content_length
-            if content_length is None:
-                self.response.content_length = len(body)
+            content_length = response.content_length
+            if content_length is None and not is_stream:
+                content_length = len(body)
+                headers[CONTENT_LENGTH] = str(content_length)
 
-            resp_impl.length = self.response.content_length
+            resp_impl.length = content_length
 
-        headers.setdefault(DATE, request.time_service.strtime())
-        headers.setdefault(SERVER, resp_impl.SERVER_SOFTWARE)
+        if DATE not in headers:
+            if self.app is not None:
+                headers[DATE] = self.app.date_header()
+            else:
+                headers[DATE] = request.time_service.strtime()
+        if SERVER not in headers:
+            headers[SERVER] = resp_impl.SERVER_SOFTWARE
         if CONNECTION not in headers:
             if keep_alive:
                 if version == HttpVersion10:
@@ -113,29 +407,207 @@ class ResponseRenderer(object):
         resp_impl.headers = headers
         resp_impl.send_headers()
 
-        self.writer = StreamWriter(self.ctx.params, request, resp_impl)
+        # sendfile bypasses compression and chunking filters
+        self.writer = StreamWriter(
+            self.ctx.params, request, resp_impl,
+            coding is None and not response.chunked,
+            self.app.loop if self.app is not None else None,
+            route.stream if route is not None else None)
 
         if IStream.providedBy(body):
             yield from body(self.writer)
-        else:
-            yield from self.writer.write(body)
+        elif body:
+            # complete body, nothing to coalesce
+            yield from self.writer._send(body)
+
+    def _executor(self):
+        """ Event loop and executor for compression of large bodies """
+        if self.app is not None:
+            return self.app.loop, self.app.executor
+        return asyncio.get_event_loop(), None
+
+    def _event_stream(self, request, headers, channel):
+        """ Stream server-sent events of channel """
+        if request.version == HttpVersion11:
+            self.response.enable_chunked_encoding()
+        # connection is not reused after event stream ends,
+        # so closed channel disconnects client
+        self.ctx.force_close()
 
-    def _do_start_compression(self, coding):
-        if coding != ContentCoding.identity:
-            self.response.headers[hdrs.CONTENT_ENCODING] = coding.value
-            self.response.content_length = None
-            self.resp_impl.add_compression_filter(coding.value)
+        headers[hdrs.CONTENT_TYPE] = 'text/event-stream'
+        headers[hdrs.CACHE_CONTROL] = 'no-cache'
+        return EventStream(
+            channel, self.route.heartbeat if self.route is not None else None)
 
-    def _start_compression(self, request):
-        if self.response.content_coding is not None:
-            self._do_start_compression(self.response.content_coding)
+    def _item_stream(self, request, body):
+        """ Stream items of iterable with chunked encoding """
+        response = self.response
+        if request.version == HttpVersion11:
+            response.enable_chunked_encoding()
         else:
-            accept_encoding = request.headers.get(
-                hdrs.ACCEPT_ENCODING, '').lower()
-            for coding in ContentCoding:
-                if coding.value in accept_encoding:
-                    self._do_start_compression(coding)
-                    return
+            # end of body is marked by closing connection
+            self.ctx.force_close()
+
+        route = self.route
+        registry = route.registry if route is not None else None
+        settings = route.stream if route is not None else None
+        if settings is None:
+            settings = DEFAULT_STREAM_SETTINGS
+
+        media_type = response.content_type
+        encoder = get_encoder(
+            registry, 'application/json'
+            if media_type == 'application/x-ndjson' else media_type)
+        serializer = get_serializer(
+            media_type, encoder, response.charset or 'utf-8')
+
+        validate = route.validate_items if route is not None else None
+        return ItemStream(
+            body, serializer, settings.buffer_size, validate,
+            settings.validate)
+
+    def _ranges(self, request, headers, body, size):
+        """ Select byte ranges of body for Range header
+
+        :return: body or ranges of body
+        """
+        is_stream = not isinstance(body, (bytes, bytearray, memoryview))
+        if is_stream:
+            headers[hdrs.ACCEPT_RANGES] = 'bytes'
+            headers[hdrs.CONTENT_LENGTH] = str(size)
+
+        header = request.headers.get(hdrs.RANGE)
+        if header is None or request.method != hdrs.METH_GET:
+            return body
+
+        if_range = request.headers.get(hdrs.IF_RANGE)
+        if if_range is not None and not if_range_match(
+                if_range, headers.get(hdrs.ETAG),
+                headers.get(hdrs.LAST_MODIFIED)):
+            return body
+
+        ranges = parse_range(header, size)
+        if ranges is None:
+            return body
+
+        response = self.response
+        if not ranges:
+            response.set_status(416)
+            headers.pop(hdrs.CONTENT_TYPE, None)
+            headers[hdrs.CONTENT_RANGE] = 'bytes */{0}'.format(size)
+            headers[hdrs.CONTENT_LENGTH] = '0'
+            return b''
+
+        response.set_status(206)
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers[hdrs.CONTENT_RANGE] = 'bytes {0}-{1}/{2}'.format(
+                start, end - 1, size)
+            headers[hdrs.CONTENT_LENGTH] = str(end - start)
+            if is_stream:
+                return RangeStream(body, ranges)
+            return memoryview(body)[start:end]
+
+        boundary = uuid.uuid4().hex
+        heads, trailer = multipart_byteranges(
+            ranges, size, headers.get(hdrs.CONTENT_TYPE), boundary)
+        headers[hdrs.CONTENT_TYPE] = (
+            'multipart/byteranges; boundary=' + boundary)
+        headers[hdrs.CONTENT_LENGTH] = str(
+            sum(len(head) for head in heads) + len(trailer) +
+            sum(end - start for start, end in ranges))
+        if is_stream:
+            return RangeStream(body, ranges, heads, trailer)
+
+        view = memoryview(body)
+        parts = []
+        for head, (start, end) in zip(heads, ranges):
+            parts.append(head)
+            parts.append(view[start:end])
+        parts.append(trailer)
+        return b''.join(parts)
+
+    def _cacheable(self, headers, body, is_stream):
+        response = self.response
+        return (response.status == 200 and
+                not is_stream and
+                isinstance(body, (bytes, bytearray)) and
+                not response.chunked and
+                not response._cookies and
+                response.content_coding is None and
+                hdrs.CONTENT_ENCODING not in headers)
+
+    def _select_coding(self, request, headers, body):
+        """ Select content coding for response
+
+        :return: tuple of :class:`ContentCoding` and compression settings
+                 or None, None if body is not compressed
+        """
+        if hdrs.CONTENT_ENCODING in headers:
+            return None, None
+
+        compression = None
+        if self.route is not None:
+            compression = self.route.compression
+
+        coding = self.response.content_coding
+        if coding is not None:
+            # explicitly set by handler
+            if coding is ContentCoding.identity:
+                return None, None
+            return coding, compression or DEFAULT_COMPRESSION
+
+        if compression is None:
+            return None, None
+        if (isinstance(body, (bytes, bytearray, memoryview)) and
+                len(body) < compression.min_size):
+            return None, None
+
+        return (compression.negotiate(
+            request.headers.get(hdrs.ACCEPT_ENCODING)), compression)
 
     def write_eof(self):
         yield from self.writer.write_eof()
+
+        if self.app is not None:
+            self.app.release(self)
+
+
+class ErrorResponse(object):
+    """ Pre-rendered error response """
+
+    __slots__ = ('status', 'body', 'headers')
+
+    def __init__(self, status, body, content_type):
+        self.status = status
+        self.body = body
+        self.headers = {hdrs.CONTENT_TYPE: content_type}
+
+    @classmethod
+    def from_spec(cls, spec):
+        """ Create response from status code or dict with `status`,
+        `body` and `content-type` keys """
+        if not isinstance(spec, dict):
+            spec = {'status': spec}
+
+        status = int(spec.get('status', 500))
+        body = spec.get('body')
+        content_type = spec.get('content-type')
+
+        if body is None:
+            body = '{0}: {1}'.format(status, Response.calc_reason(status))
+        elif not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+            content_type = content_type or 'application/json'
+
+        if isinstance(body, str):
+            content_type = content_type or 'text/plain'
+            body = body.encode('utf-8')
+            content_type = '{0}; charset=utf-8'.format(content_type)
+
+        return cls(
+            status, body, content_type or 'application/octet-stream')
+
+    def render(self):
+        return web.Response(
+            status=self.status, body=self.body, headers=self.headers)
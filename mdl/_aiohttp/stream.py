@@ -1,8 +1,22 @@
 """ Response stream """
+import asyncio
+import mimetypes
+import mmap
+import os
+from email.utils import formatdate
+
 from ..declarations import implements
-from ..web.interfaces import IStream, IStreamWriter
+from ..path import AssetResolver
+from ..web import hdrs
+from ..web.interfaces import IStream, ISeekableStream, IStreamWriter
+
+__all__ = ('Stream', 'ItemStream', 'EventStream', 'SeekableStream',
+           'RangeStream', 'FileBody', 'StreamSettings', 'StreamWriter')
 
-__all__ = ('Stream',)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_BUFFER_SIZE = 16 * 1024
+DEFAULT_HIGH_WATER = 64 * 1024
+HEARTBEAT = b':\n\n'
 
 
 class Stream(object):
@@ -15,14 +29,339 @@ class Stream(object):
         return (yield from self.coro(stream))
 
 
+class ItemStream(object):
+    """ Stream of items of iterable or async iterable
+
+    Items are encoded with serializer and collected into chunks of
+    `chunk_size` bytes, so memory use does not depend on number of
+    items. Items of async iterable are written as they arrive, stream
+    writer coalesces them until next event loop iteration. Every
+    `sample`-th item is checked with `validate`. Generator is closed
+    if stream is interrupted, for example by client disconnect.
+    """
+    implements(IStream)
+
+    def __init__(self, items, serializer, chunk_size=DEFAULT_BUFFER_SIZE,
+                 validate=None, sample=1):
+        self.items = items
+        self.serializer = serializer
+        self.chunk_size = chunk_size
+        self.validate = validate
+        self.sample = sample
+        self.count = 0
+
+    def __call__(self, stream):
+        items = self.items
+        serializer = self.serializer
+        write = serializer.write
+        chunk_size = self.chunk_size
+        validate = self.validate
+        sample = self.sample
+
+        is_async = hasattr(items, '__aiter__')
+        if is_async:
+            items = items.__aiter__()
+        else:
+            items = iter(items)
+
+        buf = [serializer.head]
+        size = len(serializer.head)
+        index = 0
+        try:
+            while True:
+                if is_async:
+                    try:
+                        item = yield from items.__anext__().__await__()
+                    except StopAsyncIteration:
+                        break
+                else:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+
+                if validate is not None and not index % sample:
+                    validate(item)
+
+                size += write(buf, item, index)
+                index += 1
+                if size >= chunk_size or is_async:
+                    data = b''.join(buf)
+                    buf = []
+                    size = 0
+                    yield from stream.write(data)
+        except GeneratorExit:
+            # closed outside of event loop, async generator
+            # is finalized by loop
+            raise
+        except BaseException:
+            if is_async:
+                aclose = getattr(items, 'aclose', None)
+                if aclose is not None:
+                    yield from aclose().__await__()
+            else:
+                close = getattr(items, 'close', None)
+                if close is not None:
+                    close()
+            raise
+        finally:
+            self.count = index
+
+        buf.append(serializer.tail)
+        yield from stream.write(b''.join(buf))
+
+
+class EventStream(object):
+    """ Stream of server-sent event frames of channel
+
+    While stream waits for events, frames are written by publisher
+    directly to stream writer. Frames are queued in channel while
+    stream waits for transport to drain. Comment is sent every
+    `heartbeat` seconds while channel is idle. Channel is closed
+    when stream ends.
+    """
+    implements(IStream)
+
+    def __init__(self, channel, heartbeat=None):
+        self.channel = channel
+        self.heartbeat = heartbeat
+
+    def __call__(self, stream):
+        channel = self.channel
+
+        def sink(frame):
+            stream.write(frame, True)
+            return not stream.paused
+
+        try:
+            while True:
+                channel.sink = sink
+                frames = yield from channel.get(self.heartbeat).__await__()
+                channel.sink = None
+                if frames is None:
+                    break
+
+                if frames:
+                    last = len(frames) - 1
+                    for idx, frame in enumerate(frames):
+                        yield from stream.write(frame, idx == last)
+                elif not stream.paused:
+                    stream.write(HEARTBEAT, True)
+
+                if stream.paused:
+                    yield from stream.drain()
+        finally:
+            channel.close()
+
+
+class SeekableStream(object):
+    """ Stream of seekable binary file object, supports byte ranges """
+    implements(ISeekableStream)
+
+    def __init__(self, fileobj, size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        if size is None:
+            pos = fileobj.tell()
+            size = fileobj.seek(0, 2) - pos
+            fileobj.seek(pos)
+
+        self.fileobj = fileobj
+        self.offset = fileobj.tell()
+        self.size = size
+        self.chunk_size = chunk_size
+
+    def __call__(self, stream):
+        return (yield from self.write_range(stream, 0, self.size))
+
+    def write_range(self, stream, start, end):
+        fileobj = self.fileobj
+        fileobj.seek(self.offset + start)
+
+        remaining = end - start
+        while remaining > 0:
+            data = fileobj.read(min(self.chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield from stream.write(data)
+
+
+class FileBody(object):
+    """ File response body
+
+    `path` is file name, asset specification or asset descriptor.
+    File is sent with sendfile system call if response is not
+    compressed and event loop supports it, otherwise memory mapped
+    file is written in chunks.
+    """
+    implements(ISeekableStream)
+
+    def __init__(self, path, content_type=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        if not hasattr(path, 'abspath'):
+            path = AssetResolver(None).resolve(path)
+        self.path = path.abspath()
+
+        st = os.stat(self.path)
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        self.etag = '"{0:x}-{1:x}"'.format(int(st.st_mtime), st.st_size)
+
+        if content_type is None:
+            content_type, encoding = mimetypes.guess_type(self.path)
+        self.content_type = content_type
+        self.chunk_size = chunk_size
+
+    def set_headers(self, headers):
+        """ Set Content-Type, Last-Modified and ETag headers """
+        if self.content_type is not None:
+            headers[hdrs.CONTENT_TYPE] = self.content_type
+        headers.setdefault(
+            hdrs.LAST_MODIFIED, formatdate(self.mtime, usegmt=True))
+        headers.setdefault(hdrs.ETAG, self.etag)
+
+    def __call__(self, stream):
+        return (yield from self.write_range(stream, 0, self.size))
+
+    def write_range(self, stream, start, end):
+        if start >= end:
+            return
+
+        with open(self.path, 'rb') as fileobj:
+            sent = yield from stream.sendfile(fileobj, start, end - start)
+            if not sent:
+                yield from self._write_mmap(stream, fileobj, start, end)
+
+    def _write_mmap(self, stream, fileobj, start, end):
+        data = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(data)
+        try:
+            for pos in range(start, end, self.chunk_size):
+                yield from stream.write(
+                    view[pos:min(pos + self.chunk_size, end)])
+        finally:
+            view.release()
+            try:
+                data.close()
+            except BufferError:
+                # chunk is still referenced by transport buffer,
+                # mapping is released with it
+                pass
+
+
+class RangeStream(object):
+    """ Byte ranges of seekable stream, `heads` and `trailer` are
+    multipart/byteranges delimiters for multiple ranges """
+    implements(IStream)
+
+    def __init__(self, body, ranges, heads=None, trailer=b''):
+        self.body = body
+        self.ranges = ranges
+        self.heads = heads
+        self.trailer = trailer
+
+    def __call__(self, stream):
+        if self.heads is None:
+            start, end = self.ranges[0]
+            yield from self.body.write_range(stream, start, end)
+            return
+
+        for head, (start, end) in zip(self.heads, self.ranges):
+            yield from stream.write(head)
+            yield from self.body.write_range(stream, start, end)
+        yield from stream.write(self.trailer)
+
+
+class StreamSettings(object):
+    """ Stream writer settings of operation
+
+    Defined with `x-mdl-stream` extension, mapping accepts keys:
+
+    * `buffer-size` - small writes are collected until buffer reaches
+      this size, or until next event loop iteration
+    * `high-water` - writer waits for transport to flush its buffer
+      when buffer is larger than this
+    * `low-water` - writing resumes when transport buffer is smaller
+      than this
+    * `validate` - every n-th item of streamed result is validated
+      with item schema of response, 0 disables validation
+    """
+
+    __slots__ = ('buffer_size', 'high_water', 'low_water', 'validate')
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE,
+                 high_water=None, low_water=None, validate=0):
+        self.buffer_size = buffer_size
+        self.high_water = high_water
+        self.low_water = low_water
+        self.validate = validate
+
+    @classmethod
+    def from_spec(cls, spec):
+        """ Create settings from `x-mdl-stream` value
+
+        :return: :class:`StreamSettings` or None for default settings
+        """
+        if not spec or spec is True:
+            return None
+
+        high_water = spec.get('high-water')
+        low_water = spec.get('low-water')
+        return cls(
+            int(spec.get('buffer-size', DEFAULT_BUFFER_SIZE)),
+            int(high_water) if high_water is not None else None,
+            int(low_water) if low_water is not None else None,
+            int(spec.get('validate', 0)))
+
+
+DEFAULT_STREAM_SETTINGS = StreamSettings()
+
+
 class StreamWriter(object):
+    """ Buffered response writer
+
+    Writes smaller than buffer size are coalesced into single transport
+    write, buffer is flushed when it is full, on next event loop
+    iteration, on `drain()` and on `write_eof()`. `write()` returns
+    drain coroutine when transport buffer is over high watermark.
+    """
     implements(IStreamWriter)
 
-    def __init__(self, params, request, response):
+    def __init__(self, params, request, response, sendfile=False,
+                 loop=None, settings=None):
         self._params = params
         self._request = request
         self._resp = response
         self._eof_sent = False
+        self._sendfile = sendfile
+        self._loop = loop if loop is not None else asyncio.get_event_loop()
+
+        if settings is None:
+            settings = DEFAULT_STREAM_SETTINGS
+        self._buffer_size = settings.buffer_size
+        self._buffer = []
+        self._buffered = 0
+        self._flush_handle = None
+
+        # aiohttp stream writer wraps transport
+        self._transport = None
+        if response is not None:
+            writer = response.transport
+            self._transport = getattr(writer, 'transport', writer)
+            if settings.high_water is not None:
+                self._transport.set_write_buffer_limits(
+                    settings.high_water, settings.low_water)
+        self._high_water = self._get_high_water()
+
+        self.bytes_written = 0
+        self.writes = 0
+        self.flushes = 0
+        self.drains = 0
+
+    def _get_high_water(self):
+        try:
+            return self._transport.get_write_buffer_limits()[1]
+        except (AttributeError, NotImplementedError):
+            return DEFAULT_HIGH_WATER
 
     @property
     def params(self):
@@ -32,7 +371,17 @@ class StreamWriter(object):
     def request(self):
         return self._request
 
-    def write(self, data):
+    @property
+    def paused(self):
+        """ Transport buffer is over high watermark """
+        return self._transport.get_write_buffer_size() > self._high_water
+
+    @property
+    def buffered(self):
+        """ Size of data in writer buffer """
+        return self._buffered
+
+    def write(self, data, flush=False):
         assert isinstance(data, (bytes, bytearray, memoryview)), \
             "data argument must be byte-ish (%r)" % type(data)
 
@@ -41,14 +390,77 @@ class StreamWriter(object):
         if self._resp is None:
             raise RuntimeError("Cannot call write() before start()")
 
-        if data:
-            return self._resp.write(data)
-        else:
+        if not data:
             return ()
 
+        size = len(data)
+        self.writes += 1
+        if size >= self._buffer_size:
+            if self._buffer:
+                self.flush()
+            self._send(data)
+        else:
+            # data can be changed by caller after write
+            self._buffer.append(
+                data if data.__class__ is bytes else bytes(data))
+            self._buffered += size
+            if flush or self._buffered >= self._buffer_size:
+                self.flush()
+            elif self._flush_handle is None:
+                self._flush_handle = self._loop.call_soon(self.flush)
+
+        if self._transport.get_write_buffer_size() > self._high_water:
+            return self.drain()
+        return ()
+
+    def _send(self, data):
+        self.bytes_written += len(data)
+        self.flushes += 1
+        return self._resp.write(data)
+
+    def flush(self):
+        """ Write buffered data to transport """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        buffer = self._buffer
+        if buffer:
+            data = buffer[0] if len(buffer) == 1 else b''.join(buffer)
+            self._buffer = []
+            self._buffered = 0
+            self._send(data)
+
+    def sendfile(self, fileobj, offset, count):
+        """ Send part of file with `loop.sendfile()`, False is returned
+        if file has to be written by caller, event loop of python < 3.7
+        does not support sendfile on transport socket """
+        if not self._sendfile or self._eof_sent or self._resp is None:
+            return False
+
+        loop = self._loop
+        sendfile = getattr(loop, 'sendfile', None)
+        if sendfile is None:
+            return False
+
+        transport = self._transport
+        if (transport.get_extra_info('socket') is None or
+                transport.get_extra_info('sslcontext')):
+            return False
+
+        self.flush()
+        yield from asyncio.ensure_future(
+            sendfile(transport, fileobj, offset, count), loop=loop)
+
+        self.bytes_written += count
+        return True
+
     def drain(self):
         if self._resp is None:
             raise RuntimeError("Response has not been started")
+
+        self.flush()
+        self.drains += 1
         yield from self._resp.transport.drain()
 
     def write_eof(self):
@@ -57,5 +469,6 @@ class StreamWriter(object):
         if self._resp is None:
             raise RuntimeError("Response has not been started")
 
+        self.flush()
         yield from self._resp.write_eof()
-        self.eof_sent = True
+        self._eof_sent = True
@@ -1,18 +1,171 @@
 """ Custom application object """
 from aiohttp import hdrs, web
+from aiohttp.protocol import HttpVersion11
 from jsonschema import ValidationError
 
 from ..web.context import WebContext
+from ..web.pool import Pool
+from ..web.router import Router
 
 from .interfaces import IRoute
-from .params import unmarshal_request
-from .response import ResponseRenderer
+from .params import RequestValidationError, unmarshal_request
+from .response import DateHeader, ResponseRenderer
+
+
+class RouteEntry(object):
+    """ Route of mdl route table, `apps` is stack of sub applications
+    that own route, `handler` is route wrapped with middlewares of
+    applications, it is composed on application startup """
+
+    __slots__ = ('route', 'apps', 'handler')
+
+    def __init__(self, route, apps):
+        self.route = route
+        self.apps = apps
+        self.handler = None
+
+
+async def _method_not_allowed(ctx):
+    raise ctx.request.match_info.http_exception
+
+
+class MatchInfo(dict, web.AbstractMatchInfo):
+    """ Match info of route resolved by mdl route table """
+
+    def __init__(self, handler, match, apps=(),
+                 http_exception=None, mdl_route=None, chain=None):
+        super(MatchInfo, self).__init__(match)
+        self.mdl_route = mdl_route
+        self.chain = chain
+        self._handler = handler
+        self._apps = list(apps)
+        self._http_exception = http_exception
+        self._frozen = False
+
+    @property
+    def handler(self):
+        return self._handler
+
+    @property
+    def route(self):
+        return None
+
+    @property
+    def http_exception(self):
+        return self._http_exception
+
+    @property
+    def apps(self):
+        return tuple(self._apps)
+
+    def add_app(self, app):
+        if self._frozen:
+            raise RuntimeError(
+                "Cannot change apps stack after .freeze() call")
+        self._apps.append(app)
+
+    def freeze(self):
+        self._frozen = True
+
+    def get_info(self):
+        return {'path': getattr(self._handler, 'path', None)}
+
+    async def expect_handler(self, request):
+        expect = request.headers.get(hdrs.EXPECT)
+        if request.version == HttpVersion11:
+            if expect.lower() == "100-continue":
+                request.transport.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            else:
+                raise web.HTTPExpectationFailed(
+                    text="Unknown Expect: %s" % expect)
+
+    def __repr__(self):
+        return "<MatchInfo {}: {}>".format(
+            super(MatchInfo, self).__repr__(), self._handler)
 
 
 class WebApplication(web.Application):
+    """ Application with mdl route table
+
+    `context_pool` enables reuse of contexts and response renderers,
+    up to `context_pool` objects of each type are kept. Pooled context
+    is reset after response is sent, so it must not be referenced
+    after that.
+
+    `executor` is used for compression of large response bodies,
+    default executor of event loop is used if it is not set.
+    """
+
+    def __init__(self, *args, context_pool=0, executor=None, **kwargs):
+        super(WebApplication, self).__init__(*args, **kwargs)
+
+        self.executor = executor
+
+        self._mdl_routes = Router()
+        self._pools = None
+        if context_pool:
+            self._pools = (Pool(WebContext, context_pool),
+                           Pool(ResponseRenderer, context_pool))
+
+        self.date_header = DateHeader(self.loop)
+        self.on_startup.append(self._compose_chains)
+        self.on_cleanup.append(self._stop_date_header)
+
+    async def _compose_chains(self, app):
+        """ Wrap mdl routes with middlewares, middlewares can not be
+        changed after application is frozen """
+        for method, path, entry in self._mdl_routes:
+            if entry.handler is None:
+                entry.handler = await self._compose(
+                    entry.apps + (self,), entry.route)
+
+    async def _stop_date_header(self, app):
+        self.date_header.stop()
+
+    def release(self, renderer):
+        """ Return context and renderer to pool after response is sent """
+        pools = self._pools
+        if pools is not None:
+            pools[0].release(renderer.ctx)
+            pools[1].release(renderer)
+
+    def add_mdl_route(self, method, path, route, app=None, matchers=None):
+        """ Register mdl route in application route table
+
+        :param path: full path template, including base path
+        :param app: sub application that owns route, its middlewares
+                    are applied after middlewares of this application
+        :param matchers: dict of path parameter name -> segment matcher
+        """
+        self._mdl_routes.add(
+            method, path,
+            RouteEntry(route, (app,) if app is not None else ()), matchers)
+
+    async def _resolve(self, request):
+        """ Resolve mdl route, fallback to aiohttp router """
+        entry, match, allowed = self._mdl_routes.resolve(
+            request.method, request.rel_url.raw_path)
+        if entry is not None:
+            return MatchInfo(
+                entry.route, match, entry.apps,
+                mdl_route=entry.route, chain=entry.handler)
+        elif allowed is not None:
+            return MatchInfo(
+                _method_not_allowed, {},
+                http_exception=web.HTTPMethodNotAllowed(
+                    request.method, allowed))
+
+        return (await self._router.resolve(request))
+
+    async def _compose(self, apps, handler):
+        """ Wrap handler with middlewares of applications """
+        for app in apps:
+            for factory in reversed(app.middlewares):
+                handler = await factory(app, handler)
+        return handler
 
     async def _handle(self, request):
-        match_info = await self._router.resolve(request)
+        match_info = await self._resolve(request)
         assert isinstance(match_info, web.AbstractMatchInfo), match_info
         match_info.add_app(self)
         match_info.freeze()
@@ -27,31 +180,68 @@ class WebApplication(web.Application):
             handler = match_info.handler
 
             # init context
-            if IRoute.providedBy(handler):
+            pools = self._pools
+            if match_info.__class__ is MatchInfo:
+                route, chain = match_info.mdl_route, match_info.chain
+            elif IRoute.providedBy(handler):
+                # mdl route resolved by aiohttp router
+                route, chain = handler, None
+            else:
+                route, chain = None, None
+
+            if route is not None:
                 try:
-                    params = await unmarshal_request(handler.params_cls, request)
+                    params = await unmarshal_request(route.params_cls, request)
                 except ValidationError as exc:
                     return web.HTTPBadRequest(text=exc.message)
 
-                ctx = WebContext(
-                    handler.op, request,
-                    params, keep_alive=request.keep_alive)
+                ctx = (WebContext if pools is None else pools[0].acquire)(
+                    route.op, request, params, keep_alive=request.keep_alive,
+                    template=route.header_template)
             else:
                 ctx = WebContext(
                     None, request, None,
                     keep_alive=request.keep_alive)
 
-            for app in match_info.apps:
-                for factory in reversed(app.middlewares):
-                    handler = await factory(app, handler)
+            # middlewares of mdl routes are composed on startup
+            if chain is not None:
+                handler = chain
+            else:
+                handler = await self._compose(match_info.apps, handler)
+
+            try:
+                body = await handler(ctx)
+            except RequestValidationError as exc:
+                # lazy parameters and body items are validated on access
+                return web.HTTPBadRequest(text=exc.message)
+            except Exception as exc:
+                err = None
+                if route is not None:
+                    err = route.errors.lookup(type(exc))
+                if err is None:
+                    raise
+
+                if err.response is not None:
+                    return err.response.render()
+
+                body = err.handler(ctx, exc)
+                if err.is_coroutine:
+                    body = await body
+                if isinstance(body, web.StreamResponse):
+                    return body
+
+            if isinstance(body, web.StreamResponse):
+                # websocket or response prepared by handler
+                return body
 
-            body = await handler(ctx)
-            return ResponseRenderer(ctx, body)
+            if pools is None:
+                return ResponseRenderer(ctx, body, self, route)
+            return pools[1].acquire(ctx, body, self, route)
 
         assert isinstance(resp, web.StreamResponse), (
             "Handler {!r} should return response instance, "
             "got {!r} [middlewares {!r}]").format(
                 match_info.handler, type(resp),
-                [mw for mw in app.middlewares for app in match_info.apps])
+                [mw for app in match_info.apps for mw in app.middlewares])
 
         return resp
@@ -0,0 +1,273 @@
+""" WebSocket operations """
+import asyncio
+import inspect
+import json
+from functools import partial
+
+from aiohttp import WSCloseCode, WSMsgType, web
+from bravado_core.unmarshal import unmarshal_schema_object
+from jsonschema import ValidationError
+
+from ..schema.validator import get_validator
+from ..web.codecs import decode_json, encode_json, get_decoder, get_encoder
+
+from .params import DEFAULT_MAX_BODY_SIZE
+from .stream import DEFAULT_HIGH_WATER
+
+__all__ = ('WebSocketSettings', 'Connection')
+
+DEFAULT_MEDIA_TYPE = 'application/json'
+
+# close reason must fit into control frame
+MAX_REASON_SIZE = 123
+
+# aiohttp>=2.1 limits size of message before it is buffered
+HAS_MAX_MSG_SIZE = 'max_msg_size' in inspect.signature(
+    web.WebSocketResponse).parameters
+
+
+class WebSocketSettings(object):
+    """ Message plan of websocket operation
+
+    Defined with `x-mdl-websocket` extension, value is `true` or
+    mapping with keys:
+
+    * `message` - schema of inbound messages
+    * `max-size` - maximum size of inbound message
+    * `protocols` - list of supported subprotocols
+
+    Messages are decoded with decoder of media type consumed by
+    operation and encoded with encoder of media type produced by
+    operation, JSON is used by default.
+    """
+
+    __slots__ = ('decode_text', 'decode_binary', 'finalize', 'encode',
+                 'binary', 'max_size', 'protocols')
+
+    def __init__(self, decode_text, decode_binary, finalize, encode,
+                 binary=False, max_size=DEFAULT_MAX_BODY_SIZE, protocols=()):
+        self.decode_text = decode_text
+        self.decode_binary = decode_binary
+        self.finalize = finalize
+        self.encode = encode
+        self.binary = binary
+        self.max_size = max_size
+        self.protocols = protocols
+
+    @classmethod
+    def from_spec(cls, spec, op, registry=None):
+        """ Create settings from `x-mdl-websocket` value
+
+        :return: :class:`WebSocketSettings` or None if operation
+                 is not websocket endpoint
+        """
+        if not spec:
+            return None
+        if not isinstance(spec, dict):
+            spec = {}
+
+        consumes = op.consumes[0] if op.consumes else DEFAULT_MEDIA_TYPE
+        decoder = get_decoder(registry, consumes)
+        if decoder is None:
+            raise ValueError('No decoder for websocket messages: %s' % (
+                consumes,))
+
+        produces = op.produces[0] if op.produces else DEFAULT_MEDIA_TYPE
+        encoder = get_encoder(registry, produces)
+        if encoder is None:
+            raise ValueError('No encoder for websocket messages: %s' % (
+                produces,))
+
+        # default JSON codec works with text frames directly
+        if decoder is decode_json:
+            decode_text = json.loads
+        else:
+            def decode_text(data):
+                return decoder(data.encode('utf-8'), 'utf-8')
+
+        def decode_binary(data):
+            return decoder(data, None)
+
+        binary = not (produces.startswith('text/') or
+                      produces.endswith('json'))
+        if encoder is encode_json:
+            encode = json.dumps
+        elif binary:
+            def encode(obj):
+                return encoder(obj, None)
+        else:
+            def encode(obj):
+                return encoder(obj, 'utf-8').decode('utf-8')
+
+        return cls(decode_text, decode_binary,
+                   _finalize(op.swagger_spec, spec.get('message')),
+                   encode, binary,
+                   int(spec.get('max-size', DEFAULT_MAX_BODY_SIZE)),
+                   tuple(spec.get('protocols', ())))
+
+
+def _finalize(swagger_spec, message_spec):
+    """ Build function that validates and unmarshals decoded message """
+    if not message_spec:
+        return None
+
+    message_spec = swagger_spec.deref(message_spec)
+    if swagger_spec.config['validate_requests']:
+        validate = get_validator(swagger_spec, message_spec)
+    else:
+        validate = None
+
+    unmarshal = partial(unmarshal_schema_object, swagger_spec, message_spec)
+
+    def finalize(message):
+        if validate is not None:
+            validate(message)
+        return unmarshal(message)
+
+    return finalize
+
+
+class Connection(object):
+    """ State of websocket connection
+
+    Handler of operation is called for each inbound message with
+    connection as `ctx.connection` and message as `ctx.message`,
+    result of handler that is not None is sent as reply. `state`
+    is available for handler data of connection.
+    """
+
+    __slots__ = ('ws', 'settings', 'state', 'received', 'sent',
+                 '_transport', '_high_water')
+
+    def __init__(self, ws, settings, transport=None,
+                 high_water=DEFAULT_HIGH_WATER):
+        self.ws = ws
+        self.settings = settings
+        self.state = None
+        self.received = 0
+        self.sent = 0
+        self._transport = transport
+        self._high_water = high_water
+
+    @classmethod
+    async def accept(cls, request, settings):
+        """ Complete websocket handshake of request """
+        if HAS_MAX_MSG_SIZE:
+            ws = web.WebSocketResponse(
+                protocols=settings.protocols, max_msg_size=settings.max_size)
+        else:
+            ws = web.WebSocketResponse(protocols=settings.protocols)
+        await ws.prepare(request)
+        return cls(ws, settings, request.transport)
+
+    @property
+    def closed(self):
+        return self.ws.closed
+
+    async def receive(self):
+        """ Wait for next message
+
+        Connection is closed if message is too large or invalid.
+
+        :return: unmarshalled message, None if connection is closed
+        """
+        ws = self.ws
+        settings = self.settings
+        msg = await ws.receive()
+
+        tp = msg.type
+        if tp == WSMsgType.TEXT:
+            decode = settings.decode_text
+        elif tp == WSMsgType.BINARY:
+            decode = settings.decode_binary
+        else:
+            return None
+
+        # message is checked after it is buffered with older aiohttp
+        data = msg.data
+        if len(data) > settings.max_size:
+            await self.close(WSCloseCode.MESSAGE_TOO_BIG,
+                             'Message is too large')
+            return None
+
+        try:
+            message = decode(data)
+            if settings.finalize is not None:
+                message = settings.finalize(message)
+        except ValidationError as exc:
+            await self.close(WSCloseCode.INVALID_TEXT, exc.message)
+            return None
+        except ValueError as exc:
+            await self.close(WSCloseCode.INVALID_TEXT, str(exc))
+            return None
+
+        self.received += 1
+        return message
+
+    async def send(self, obj):
+        """ Send message, str and bytes are sent as is, other objects
+        are encoded with codec of operation
+
+        Waits while transport buffer is over high watermark.
+        """
+        if isinstance(obj, str):
+            self.ws.send_str(obj)
+        elif isinstance(obj, (bytes, bytearray)):
+            self.ws.send_bytes(obj)
+        elif self.settings.binary:
+            self.ws.send_bytes(self.settings.encode(obj))
+        else:
+            self.ws.send_str(self.settings.encode(obj))
+        self.sent += 1
+
+        transport = self._transport
+        if (transport is not None and
+                transport.get_write_buffer_size() > self._high_water):
+            await self.ws.drain()
+
+    async def close(self, code=WSCloseCode.OK, message=''):
+        reason = message.encode('utf-8')[:MAX_REASON_SIZE]
+        await self.ws.close(code=code, message=reason)
+
+    async def serve(self, ctx, handler, errors=None):
+        """ Call handler for each message until connection is closed
+
+        Exceptions of handler are processed with `errors` handlers,
+        body of pre-rendered error response is sent as reply, status
+        code can not be sent after handshake. Connection is closed if
+        there is no handler for exception.
+        """
+        ctx.connection = self
+        while True:
+            message = await self.receive()
+            if message is None:
+                break
+
+            ctx.message = message
+            try:
+                reply = await handler(ctx)
+            except Exception as exc:
+                err = errors.lookup(type(exc)) if errors is not None else None
+                if err is None:
+                    await self.close(WSCloseCode.INTERNAL_ERROR,
+                                     'Internal error')
+                    # response is already sent, error is only reported
+                    asyncio.get_event_loop().call_exception_handler({
+                        'message': 'Unhandled error in websocket handler',
+                        'exception': exc})
+                    break
+
+                if err.response is not None:
+                    reply = err.response.body
+                    if not self.settings.binary:
+                        reply = reply.decode('utf-8', 'replace')
+                else:
+                    reply = err.handler(ctx, exc)
+                    if err.is_coroutine:
+                        reply = await reply
+
+            if reply is not None:
+                await self.send(reply)
+
+        ctx.message = None
+        return self.ws
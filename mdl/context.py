@@ -9,21 +9,23 @@ __all__ = ('Context',)
 class Context(object):
     implements(interfaces.IContext)
 
+    __slots__ = ('_stack', '__provides__')
+
     def __init__(self, markers=()):
-        self._contexts = {}
-        self._stack = [ContextItem()]
+        # stack is created on first use
+        self._stack = None
 
         if markers:
             directlyProvides(self, markers)
 
     def __del__(self):
-        if len(self._stack) > 1:
-            # something is wrong
-            pass
-
-        self._stack[0]._teardown()
+        if self._stack is not None:
+            self._stack[0]._teardown()
 
     def __enter__(self):
+        if self._stack is None:
+            self._stack = [ContextItem()]
+
         item = ContextItem()
         self._stack.append(item)
         return item
@@ -38,19 +40,21 @@ class Context(object):
         return False
 
     def teardown(self):
-        if len(self._stack) > 1:
-            # something is wrong
-            pass
-
-        self._stack[0]._teardown()
+        if self._stack is not None:
+            self._stack[0]._teardown()
 
     def register_teardown_callback(self, callback):
         """Register callable to be called when context exits"""
+        if self._stack is None:
+            self._stack = [ContextItem()]
+
         self._stack[-1].register_teardown_callback(callback)
 
 
 class ContextItem(object):
 
+    __slots__ = ('_teardown_callbacks',)
+
     def __init__(self):
         self._teardown_callbacks = []
 
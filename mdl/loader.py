@@ -13,7 +13,12 @@ ApplicationInfo = collections.namedtuple(
     'name base_path in_transform out_transform errors')
 
 OperationInfo = collections.namedtuple(
-    'OperationInfo', 'id path method transform errors')
+    'OperationInfo', 'id path method transform errors options')
+
+# extensions that are not passed to operation as options
+RESERVED = frozenset((
+    'x-mdl-name', 'x-mdl-package', 'x-mdl-middleware',
+    'x-mdl-handler', 'x-mdl-errors'))
 
 
 class Loader(object):
@@ -60,11 +65,20 @@ class Loader(object):
 
             spec.build()
 
+            # x-mdl-middleware is list of in transforms or
+            # dict with "in" and "out" lists
+            middleware = data.get('x-mdl-middleware')
+            if isinstance(middleware, dict):
+                in_transform = middleware.get('in')
+                out_transform = middleware.get('out')
+            else:
+                in_transform, out_transform = middleware, None
+
             app_info = ApplicationInfo(
                 data.get('x-mdl-name', ''),
                 data.get('basePath', '').rstrip('/'),
-                self._seq_of_strings(data.get('x-mdl-middleware')),
-                self._seq_of_strings(data.get('x-mdl-middleware')),
+                self._seq_of_strings(in_transform),
+                self._seq_of_strings(out_transform),
                 self._dict_from_list(data, 'x-mdl-errors'))
 
             self.create_app(spec, app_info, config)
@@ -78,7 +92,8 @@ class Loader(object):
                         op.path_name,
                         op.http_method,
                         self._seq_of_strings(op.op_spec.get('x-mdl-handler')),
-                        self._dict_from_list(op.op_spec, 'x-mdl-errors'))
+                        self._dict_from_list(op.op_spec, 'x-mdl-errors'),
+                        self._options(data, op.op_spec))
 
                     self.create_operation(op, app_info, op_info, config)
 
@@ -105,6 +120,16 @@ class Loader(object):
                 'dict or None is required for "%s" got %r' % (name, d))
         return d
 
+    def _options(self, *specs):
+        """Collect `x-mdl-*` extensions, `x-mdl-lazy-params` is
+        stored as `lazy_params`. Later specs override earlier."""
+        options = {}
+        for spec in specs:
+            for key, value in spec.items():
+                if key.startswith('x-mdl-') and key not in RESERVED:
+                    options[key[6:].replace('-', '_')] = value
+        return options
+
     def _seq_of_strings(self, s):
         if isinstance(s, string_types):
             return (s,)
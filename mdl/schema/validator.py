@@ -0,0 +1,314 @@
+""" Compiled schema validators """
+import json
+import re
+from functools import partial
+
+from bravado_core.validate import validate_schema_object
+from jsonschema import ValidationError
+
+__all__ = ('get_validator', 'compile_schema', 'UnsupportedSchema')
+
+
+# keywords that do not affect validation
+IGNORED = frozenset((
+    'title', 'description', 'default', 'example', 'readOnly',
+    'externalDocs', 'xml', 'name', 'in', 'collectionFormat',
+    'allowEmptyValue'))
+
+# formats that are not checked by validator
+UNCHECKED_FORMATS = frozenset((
+    'int32', 'int64', 'float', 'double', 'byte', 'binary', 'password'))
+
+TYPE_CHECKS = {
+    'integer': ('(not isinstance({v}, int) or {v}.__class__ is bool)'),
+    'number': ('(not isinstance({v}, (int, float)) or '
+               '{v}.__class__ is bool)'),
+    'string': 'not isinstance({v}, str)',
+    'boolean': '{v}.__class__ is not bool',
+    'array': 'not isinstance({v}, (list, tuple))',
+    'object': 'not isinstance({v}, dict)',
+    'null': '{v} is not None',
+}
+
+# keywords supported by compiler
+KEYWORDS = frozenset((
+    '$ref', 'type', 'format', 'enum', 'x-nullable', 'required',
+    'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum',
+    'minLength', 'maxLength', 'pattern',
+    'items', 'minItems', 'maxItems', 'uniqueItems',
+    'properties', 'additionalProperties', 'minProperties', 'maxProperties'))
+
+MISSING = object()
+
+
+def escape(value):
+    return repr(value).replace('%', '%%')
+
+
+class UnsupportedSchema(Exception):
+    """ Schema uses keyword that compiler does not support """
+
+
+class SchemaCompiler(object):
+    """ Generate python function that validates value against schema """
+
+    def __init__(self, deref=None):
+        self.deref = deref if deref is not None else (lambda s: s)
+        self.lines = []
+        self.consts = {}
+        self.counter = 0
+        self.refs = []
+
+    def const(self, value):
+        self.counter += 1
+        name = '_c%d' % self.counter
+        self.consts[name] = value
+        return name
+
+    def var(self):
+        self.counter += 1
+        return '_v%d' % self.counter
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def fail(self, indent, msg, *args):
+        if args:
+            self.emit(indent, 'raise ValidationError(%r %% (%s,))' % (
+                msg, ', '.join(args)))
+        else:
+            self.emit(indent, 'raise ValidationError(%r)' % msg)
+
+    def compile(self, schema):
+        self.emit(0, 'def validate(_v0):')
+        self.visit(schema, '_v0', 1)
+        self.emit(1, 'return None')
+
+        ns = {'ValidationError': ValidationError, '_missing': MISSING}
+        ns.update(self.consts)
+        exec('\n'.join(self.lines), ns)
+        return ns['validate']
+
+    def visit(self, schema, v, indent):
+        ref = schema.get('$ref') if isinstance(schema, dict) else None
+        if ref is not None:
+            if ref in self.refs:
+                # recursive schema
+                raise UnsupportedSchema(ref)
+            self.refs.append(ref)
+            self.visit(self.deref(schema), v, indent)
+            self.refs.pop()
+            return
+
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(schema)
+
+        for key in schema:
+            if (key not in IGNORED and key not in KEYWORDS and
+                    not (key.startswith('x-') and key != 'x-nullable')):
+                raise UnsupportedSchema(key)
+
+        fmt = schema.get('format')
+        if fmt is not None and fmt not in UNCHECKED_FORMATS:
+            raise UnsupportedSchema('format: %s' % fmt)
+
+        if schema.get('x-nullable'):
+            self.emit(indent, 'if %s is not None:' % v)
+            indent += 1
+
+        start = len(self.lines)
+
+        tp = self.deref(schema.get('type'))
+        if tp is not None:
+            types = tp if isinstance(tp, (list, tuple)) else (tp,)
+            checks = [TYPE_CHECKS[t].format(v=v)
+                      for t in types if t in TYPE_CHECKS]
+            if len(checks) == len(types):
+                self.emit(indent, 'if %s:' % ' and '.join(checks))
+                self.fail(indent+1, '%r is not of type ' +
+                          ', '.join(repr(t) for t in types), v)
+        else:
+            types = ()
+
+        if 'enum' in schema:
+            c = self.const(tuple(schema['enum']))
+            self.emit(indent, 'if %s not in %s:' % (v, c))
+            self.fail(indent+1, '%r is not one of ' +
+                      escape(list(schema['enum'])), v)
+
+        self.visit_number(schema, v, indent, types)
+        self.visit_string(schema, v, indent, types)
+        self.visit_array(schema, v, indent, types)
+        self.visit_object(schema, v, indent, types)
+
+        if len(self.lines) == start:
+            self.emit(indent, 'pass')
+
+    def guard(self, v, indent, types, tp, check):
+        """ apply keywords only to values of specific type """
+        if tp in types or (tp == 'number' and 'integer' in types):
+            if len(types) == 1:
+                return indent
+        self.emit(indent, 'if %s:' % check.format(v=v))
+        return indent + 1
+
+    def visit_number(self, schema, v, indent, types):
+        keys = [k for k in ('minimum', 'maximum') if k in schema]
+        if not keys:
+            return
+
+        indent = self.guard(
+            v, indent, types, 'number',
+            'isinstance({v}, (int, float)) and {v}.__class__ is not bool')
+
+        if 'minimum' in schema:
+            if schema.get('exclusiveMinimum'):
+                op, msg = '<=', 'less than or equal to'
+            else:
+                op, msg = '<', 'less than'
+            self.emit(indent, 'if %s %s %r:' % (v, op, schema['minimum']))
+            self.fail(indent+1, '%r is ' + msg + ' the minimum of ' +
+                      escape(schema['minimum']), v)
+
+        if 'maximum' in schema:
+            if schema.get('exclusiveMaximum'):
+                op, msg = '>=', 'greater than or equal to'
+            else:
+                op, msg = '>', 'greater than'
+            self.emit(indent, 'if %s %s %r:' % (v, op, schema['maximum']))
+            self.fail(indent+1, '%r is ' + msg + ' the maximum of ' +
+                      escape(schema['maximum']), v)
+
+    def visit_string(self, schema, v, indent, types):
+        keys = [k for k in ('minLength', 'maxLength', 'pattern')
+                if k in schema]
+        if not keys:
+            return
+
+        indent = self.guard(v, indent, types, 'string', 'isinstance({v}, str)')
+
+        if 'minLength' in schema:
+            self.emit(indent, 'if len(%s) < %d:' % (v, schema['minLength']))
+            self.fail(indent+1, '%r is too short', v)
+
+        if 'maxLength' in schema:
+            self.emit(indent, 'if len(%s) > %d:' % (v, schema['maxLength']))
+            self.fail(indent+1, '%r is too long', v)
+
+        if 'pattern' in schema:
+            c = self.const(re.compile(schema['pattern']))
+            self.emit(indent, 'if %s.search(%s) is None:' % (c, v))
+            self.fail(indent+1, '%r does not match ' +
+                      escape(schema['pattern']), v)
+
+    def visit_array(self, schema, v, indent, types):
+        items = schema.get('items')
+        if isinstance(items, (list, tuple)) or schema.get('uniqueItems'):
+            raise UnsupportedSchema('items')
+
+        keys = [k for k in ('minItems', 'maxItems') if k in schema]
+        if not keys and items is None:
+            return
+
+        indent = self.guard(
+            v, indent, types, 'array', 'isinstance({v}, (list, tuple))')
+
+        if 'minItems' in schema:
+            self.emit(indent, 'if len(%s) < %d:' % (v, schema['minItems']))
+            self.fail(indent+1, '%r is too short', v)
+
+        if 'maxItems' in schema:
+            self.emit(indent, 'if len(%s) > %d:' % (v, schema['maxItems']))
+            self.fail(indent+1, '%r is too long', v)
+
+        if items is not None:
+            item = self.var()
+            self.emit(indent, 'for %s in %s:' % (item, v))
+            self.visit(items, item, indent+1)
+
+    def visit_object(self, schema, v, indent, types):
+        required = schema.get('required')
+        if not isinstance(required, (list, tuple)):
+            # boolean "required" of parameter spec
+            required = ()
+
+        props = schema.get('properties') or {}
+        additional = schema.get('additionalProperties', True)
+        if not isinstance(additional, bool):
+            raise UnsupportedSchema('additionalProperties')
+
+        keys = [k for k in ('minProperties', 'maxProperties')
+                if k in schema]
+        if not keys and not required and not props and additional:
+            return
+
+        indent = self.guard(
+            v, indent, types, 'object', 'isinstance({v}, dict)')
+
+        if 'minProperties' in schema:
+            self.emit(indent, 'if len(%s) < %d:' % (
+                v, schema['minProperties']))
+            self.fail(indent+1, '%r does not have enough properties', v)
+
+        if 'maxProperties' in schema:
+            self.emit(indent, 'if len(%s) > %d:' % (
+                v, schema['maxProperties']))
+            self.fail(indent+1, '%r has too many properties', v)
+
+        for name in required:
+            self.emit(indent, 'if %r not in %s:' % (name, v))
+            self.fail(indent+1, '%r is a required property' % (name,))
+
+        if not additional:
+            c = self.const(frozenset(props))
+            key = self.var()
+            self.emit(indent, 'for %s in %s:' % (key, v))
+            self.emit(indent+1, 'if %s not in %s:' % (key, c))
+            self.fail(indent+2, 'Additional properties are not allowed '
+                      '(%r was unexpected)', key)
+
+        for name, prop in props.items():
+            item = self.var()
+            self.emit(indent, '%s = %s.get(%r, _missing)' % (
+                item, v, name))
+            self.emit(indent, 'if %s is not _missing:' % item)
+            self.visit(prop, item, indent+1)
+
+
+def compile_schema(schema, deref=None):
+    """Compile schema to python function.
+
+    :raises UnsupportedSchema: if schema uses keywords
+                               that compiler does not support
+    """
+    return SchemaCompiler(deref).compile(schema)
+
+
+def get_validator(swagger_spec, schema):
+    """Get validator for schema of swagger spec.
+
+    Validators are cached on swagger spec by schema content, schemas
+    with keywords that compiler does not support are validated
+    with jsonschema.
+
+    :type swagger_spec: :class:`bravado_core.spec.Spec`
+    :type schema: dict
+    :return: function that accepts value and raises
+             :class:`jsonschema.ValidationError`
+    """
+    # cache is released with spec
+    try:
+        validators = swagger_spec._mdl_validators
+    except AttributeError:
+        validators = swagger_spec._mdl_validators = {}
+
+    key = json.dumps(schema, sort_keys=True, default=repr)
+    validator = validators.get(key)
+    if validator is None:
+        try:
+            validator = compile_schema(schema, swagger_spec.deref)
+        except UnsupportedSchema:
+            validator = partial(validate_schema_object, swagger_spec, schema)
+        validators[key] = validator
+
+    return validator
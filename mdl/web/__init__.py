@@ -1,8 +1,10 @@
 """ web related code """
 
+from .codecs import *  # noqa
 from .context import *  # noqa
 from .response import *  # noqa
 
-__all__ = (context.__all__ +  # noqa
+__all__ = (codecs.__all__ +  # noqa
+           context.__all__ +  # noqa
            response.__all__  # noqa
 )
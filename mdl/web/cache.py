@@ -0,0 +1,239 @@
+""" Response caches """
+import asyncio
+import collections
+import time
+
+from . import interfaces
+from ..declarations import implements
+
+__all__ = ('LRUCache', 'TTLCache', 'ResponseCache', 'CachedResponse',
+           'SingleFlight', 'params_key')
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class LRUCache(object):
+    """ Least recently used cache limited by total size of values
+
+    `sizeof` returns size of value, default is `len`. Value larger
+    than `max_size` is not stored.
+    """
+
+    def __init__(self, max_size, sizeof=len):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sizeof = sizeof
+        self._items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def keys(self):
+        return list(self._items.keys())
+
+    def get(self, key, default=None):
+        try:
+            value = self._items[key][0]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        size = self._sizeof(value)
+        self.pop(key)
+        if size > self.max_size:
+            return
+
+        self._items[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            self._evict()
+
+    def _evict(self):
+        key, (value, size) = self._items.popitem(last=False)
+        self.size -= size
+        self.evictions += 1
+
+    def pop(self, key, default=None):
+        try:
+            value, size = self._items.pop(key)
+        except KeyError:
+            return default
+
+        self.size -= size
+        return value
+
+    def discard(self, predicate):
+        """ Remove items with keys for which `predicate(key)` is true """
+        for key in [key for key in self._items if predicate(key)]:
+            self.pop(key)
+
+    def clear(self):
+        self._items.clear()
+        self.size = 0
+
+
+def _entry_size(value):
+    return 1
+
+
+class TTLCache(LRUCache):
+    """ Least recently used cache limited by number of entries,
+    entries expire after `ttl` seconds """
+
+    def __init__(self, max_entries, ttl, timer=time.monotonic):
+        super(TTLCache, self).__init__(max_entries, _entry_size)
+        self.ttl = ttl
+        self.expirations = 0
+        self._timer = timer
+
+    def get(self, key, default=None):
+        item = self._items.get(key)
+        if item is not None:
+            expires, value = item[0]
+            if expires > self._timer():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+
+            self.pop(key)
+            self.expirations += 1
+
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        super(TTLCache, self).set(key, (self._timer() + self.ttl, value))
+
+    def pop(self, key, default=None):
+        item = super(TTLCache, self).pop(key)
+        if item is None:
+            return default
+        return item[1]
+
+
+class CachedResponse(object):
+    """ Rendered response: status, headers and body """
+
+    __slots__ = ('status', 'reason', 'headers', 'body')
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class ResponseCache(TTLCache):
+    """ Response cache of operation, defined with `x-mdl-cache`
+
+    Key is built from values of operation parameters and request
+    headers listed in `vary`, all parameters are used by default.
+    """
+    implements(interfaces.IResponseCache)
+
+    def __init__(self, fields, headers=(),
+                 max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        super(ResponseCache, self).__init__(max_entries, ttl)
+        self.fields = tuple(fields)
+        self.headers = tuple(headers)
+
+    @classmethod
+    def from_spec(cls, spec, params_cls):
+        """ Create cache from `x-mdl-cache` value::
+
+          x-mdl-cache:
+            ttl: 60
+            max-entries: 1000
+            vary:
+              params: [id]
+              headers: [Accept-Language]
+
+        :return: :class:`ResponseCache` or None if cache is disabled
+        """
+        if not spec:
+            return None
+        if spec is True:
+            spec = {}
+
+        vary = spec.get('vary', {})
+        if 'params' in vary:
+            fields = [params_cls.__mapping__[name] for name in vary['params']]
+        else:
+            fields = params_cls.__fields__
+
+        return cls(fields, vary.get('headers', ()),
+                   int(spec.get('max-entries', DEFAULT_MAX_ENTRIES)),
+                   float(spec.get('ttl', DEFAULT_TTL)))
+
+    def key(self, ctx):
+        params = ctx.params
+        key = tuple(_freeze(getattr(params, name)) for name in self.fields)
+        if self.headers:
+            headers = ctx.request.headers
+            key += tuple(headers.get(name) for name in self.headers)
+        return key
+
+
+class SingleFlight(object):
+    """ Coalesce concurrent calls with same key into single call
+
+    Call runs in separate task, so cancellation of first caller
+    does not cancel call for other callers.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._flights = {}
+
+    def __len__(self):
+        return len(self._flights)
+
+    async def do(self, key, func, *args):
+        """ Call `func(*args)` coroutine function, or wait for result
+        of call with same `key` that is in progress """
+        fut = self._flights.get(key)
+        if fut is None:
+            self.calls += 1
+            fut = self._flights[key] = asyncio.ensure_future(func(*args))
+            fut.add_done_callback(
+                lambda fut: self._flights.pop(key, None))
+        else:
+            self.shared += 1
+
+        return (await asyncio.shield(fut))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def params_key(params):
+    """ Hashable key for operation parameters """
+    if params is None:
+        return ()
+    return tuple((name, _freeze(value))
+                 for name, value in params.as_dict().items())
@@ -0,0 +1,121 @@
+""" Request body decoders and response body encoders """
+import json
+
+import venusian
+
+from . import interfaces
+from ..interfaces import CATEGORY
+
+__all__ = ('decoder', 'get_decoder', 'encoder', 'get_encoder')
+
+
+def decode_json(data, charset):
+    return json.loads(data.decode(charset or 'utf-8'))
+
+
+def decode_text(data, charset):
+    return data.decode(charset or 'utf-8')
+
+
+DECODERS = {
+    'application/json': decode_json,
+    'text/plain': decode_text,
+}
+
+
+def get_decoder(registry, media_type):
+    """ Find body decoder for media type
+
+    Decoders registered in registry override default decoders.
+    """
+    if registry is not None:
+        decoder = registry.queryUtility(
+            interfaces.IBodyDecoder, name=media_type)
+        if decoder is not None:
+            return decoder
+
+    return DECODERS.get(media_type)
+
+
+class decoder(object):
+    """ Register request body decoder for media type::
+
+        @mdl.web.decoder('application/json')
+        def decode(data, charset):
+            return ujson.loads(data)
+    """
+
+    def __init__(self, media_type):
+        self.media_type = media_type
+
+    def register(self, scanner, name, wrapped):
+        registry = scanner.config.registry
+
+        def register():
+            registry.registerUtility(
+                wrapped, interfaces.IBodyDecoder, name=self.media_type)
+
+        scanner.config.action(('body-decoder', self.media_type), register)
+
+    def __call__(self, wrapped):
+        venusian.attach(wrapped, self.register, category=CATEGORY)
+        return wrapped
+
+
+def encode_json(obj, charset):
+    return json.dumps(obj).encode(charset or 'utf-8')
+
+
+def encode_ndjson(obj, charset):
+    return (json.dumps(obj) + '\n').encode(charset or 'utf-8')
+
+
+def encode_text(obj, charset):
+    return str(obj).encode(charset or 'utf-8')
+
+
+ENCODERS = {
+    'application/json': encode_json,
+    'application/x-ndjson': encode_ndjson,
+    'text/plain': encode_text,
+}
+
+
+def get_encoder(registry, media_type):
+    """ Find body encoder for media type
+
+    Encoders registered in registry override default encoders.
+    """
+    if registry is not None:
+        encoder = registry.queryUtility(
+            interfaces.IBodyEncoder, name=media_type)
+        if encoder is not None:
+            return encoder
+
+    return ENCODERS.get(media_type)
+
+
+class encoder(object):
+    """ Register response body encoder for media type, encoder is
+    used for items of streamed response bodies::
+
+        @mdl.web.encoder('application/json')
+        def encode(obj, charset):
+            return ujson.dumps(obj).encode(charset or 'utf-8')
+    """
+
+    def __init__(self, media_type):
+        self.media_type = media_type
+
+    def register(self, scanner, name, wrapped):
+        registry = scanner.config.registry
+
+        def register():
+            registry.registerUtility(
+                wrapped, interfaces.IBodyEncoder, name=self.media_type)
+
+        scanner.config.action(('body-encoder', self.media_type), register)
+
+    def __call__(self, wrapped):
+        venusian.attach(wrapped, self.register, category=CATEGORY)
+        return wrapped
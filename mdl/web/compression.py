@@ -0,0 +1,125 @@
+""" Response compression """
+import functools
+import zlib
+
+from .response import ContentCoding
+
+__all__ = ('Compression', 'parse_accept_encoding', 'negotiate')
+
+DEFAULT_CODINGS = (ContentCoding.gzip, ContentCoding.deflate)
+DEFAULT_LEVEL = 6
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_OFFLOAD_SIZE = 1024 ** 2
+
+
+@functools.lru_cache(maxsize=128)
+def parse_accept_encoding(header):
+    """ Parse Accept-Encoding header
+
+    :return: tuple of (coding, q) pairs, coding is lower cased
+    """
+    result = []
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        result.append((coding, q))
+
+    return tuple(result)
+
+
+@functools.lru_cache(maxsize=256)
+def negotiate(header, codings=DEFAULT_CODINGS):
+    """ Select content coding for Accept-Encoding header
+
+    Coding with highest q value is selected, order of `codings`
+    is used for codings with equal q value.
+
+    :type codings: tuple of :class:`ContentCoding`
+    :rtype: :class:`ContentCoding` or None
+    """
+    if not header:
+        return None
+
+    accepted = dict(parse_accept_encoding(header))
+    default = accepted.get('*', 0.0)
+
+    selected = None
+    selected_q = 0.0
+    for coding in codings:
+        q = accepted.get(coding.value, default)
+        if q > selected_q:
+            selected, selected_q = coding, q
+
+    return selected
+
+
+class Compression(object):
+    """ Response compression settings of operation
+
+    Defined with `x-mdl-compression` extension, `true` enables
+    compression with default settings, mapping accepts keys:
+
+    * `coding` - coding or list of codings in order of preference
+    * `level` - compression level, 1-9
+    * `min-size` - bodies smaller than this are not compressed
+    * `offload-size` - bodies of this size and larger are compressed
+      in thread pool
+    """
+
+    __slots__ = ('codings', 'level', 'min_size', 'offload_size')
+
+    def __init__(self, codings=DEFAULT_CODINGS, level=DEFAULT_LEVEL,
+                 min_size=DEFAULT_MIN_SIZE, offload_size=DEFAULT_OFFLOAD_SIZE):
+        self.codings = tuple(codings)
+        self.level = level
+        self.min_size = min_size
+        self.offload_size = offload_size
+
+    @classmethod
+    def from_spec(cls, spec):
+        """ Create settings from `x-mdl-compression` value
+
+        :return: :class:`Compression` or None if compression is disabled
+        """
+        if not spec:
+            return None
+        if spec is True:
+            return cls()
+
+        codings = spec.get('coding', DEFAULT_CODINGS)
+        if isinstance(codings, (str, ContentCoding)):
+            codings = (codings,)
+
+        codings = [ContentCoding(c) for c in codings]
+        return cls(
+            tuple(c for c in codings if c is not ContentCoding.identity),
+            int(spec.get('level', DEFAULT_LEVEL)),
+            int(spec.get('min-size', DEFAULT_MIN_SIZE)),
+            int(spec.get('offload-size', DEFAULT_OFFLOAD_SIZE)))
+
+    def negotiate(self, accept_encoding):
+        """ Select coding for Accept-Encoding header value """
+        return negotiate(accept_encoding, self.codings)
+
+    def compressobj(self, coding):
+        if coding is ContentCoding.gzip:
+            wbits = 16 + zlib.MAX_WBITS
+        else:
+            wbits = -zlib.MAX_WBITS
+        return zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+
+    def compress(self, coding, data):
+        """ Compress complete body """
+        compressor = self.compressobj(coding)
+        return compressor.compress(data) + compressor.flush()
@@ -1,3 +1,6 @@
+import keyword
+import re
+
 from . import interfaces
 from .response import Response
 from ..context import Context
@@ -10,18 +13,49 @@ __all__ = ('WebContext',)
 class WebContext(Context):
     implements(interfaces.IWebContext)
 
-    def __init__(self, op, request, params, keep_alive=None, markers=()):
+    # `__dict__` keeps arbitrary attributes available for transforms,
+    # it is not allocated until first use
+    __slots__ = ('op', 'params', 'request', '_response', '_template',
+                 '_keep_alive', '_tcp_cork', '_tcp_nodelay', '__dict__')
+
+    def __init__(self, op, request, params,
+                 keep_alive=None, markers=(), template=None):
         super(WebContext, self).__init__(markers)
 
         self.op = op
         self.params = params
         self.request = request
-        self.response = Response()
+        self._response = None
+        self._template = template
 
         self._keep_alive = keep_alive
         self._tcp_cork = None
         self._tcp_nodelay = None
 
+    @property
+    def response(self):
+        response = self._response
+        if response is None:
+            response = self._response = Response(self._template)
+        return response
+
+    @response.setter
+    def response(self, value):
+        self._response = value
+
+    def reset(self):
+        """ Teardown context and drop request data before reuse """
+        self.teardown()
+        self._stack = None
+        self.op = self.params = self.request = self._response = None
+        self._template = None
+
+        try:
+            del self.__provides__
+        except AttributeError:
+            pass
+        self.__dict__.clear()
+
     @property
     def keep_alive(self):
         return self._keep_alive
@@ -45,50 +79,159 @@ class WebContext(Context):
 
 
 class Params(object):
+    """ Base class for generated operation parameters
+
+    Generated class has slot for each parameter and positional
+    `__init__`, arguments are ordered as `__fields__`,
+    body parameter is always last.
+    """
+
+    __slots__ = ()
+    __fields__ = ()
+    __mapping__ = {}
 
-    def __init__(self, **params):
-        mapping = self.__mapping__
-        self.__dict__.update(
-            ((mapping[name], value)
-             for name, value in params.items())
-        )
+    def validate_all(self):
+        """ Make sure all parameters are unmarshalled and valid """
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__fields__}
+
+    def __repr__(self):
+        return '%s(%s)' % (
+            self.__class__.__name__,
+            ', '.join('%s=%r' % item for item in self.as_dict().items()))
 
     @staticmethod
-    def generate_class(op):
-        """ Generate class for swagger operation """
-        slots = {'__oper__'}
+    def generate_class(op, lazy=False):
+        """ Generate class for swagger operation
 
+        Parameters of lazy class are unmarshalled on first access.
+        """
         mapping = {}
-        attrs = {'__oper__': op, '__mapping__': mapping}
-
+        names = {}
+        fields = []
+        body = None
         for name, element in op.params.items():
             if element.location == Location.header:
-                attr_name = 'HTTP_%s' % name.replace('-', '_')
+                attr_name = attribute_name('HTTP_%s' % name)
             else:
-                attr_name = name
+                attr_name = attribute_name(name)
+
+            if attr_name in names:
+                raise ValueError(
+                    'Parameters %r and %r of operation %s map to same '
+                    'attribute %r' % (names[attr_name], name,
+                                      op.operation_id, attr_name))
+            names[attr_name] = name
 
-            slots.add(attr_name)
-            attrs[attr_name] = ParamsProperty(attr_name)
             element.attr_name = attr_name
             mapping[name] = attr_name
+            if element.location == Location.body:
+                body = attr_name
+            else:
+                fields.append(attr_name)
+
+        if body is not None:
+            fields.append(body)
 
         name = 'Params_%s' % op.operation_id
-        cls = type(name, (Params,), attrs)
-        cls.__slots__ = tuple(slots)
+        attrs = {'__oper__': op,
+                 '__mapping__': mapping,
+                 '__fields__': tuple(fields)}
+
+        if lazy:
+            slots = tuple('_%s' % attr for attr in fields)
+            for attr, slot in zip(fields, slots):
+                if slot in names:
+                    raise ValueError(
+                        'Parameter %r of operation %s conflicts with '
+                        'lazy slot of parameter %r' % (
+                            names[slot], op.operation_id, names[attr]))
+            attrs['__slots__'] = slots
+            cls = type(name, (LazyParams,), attrs)
+            for attr, slot in zip(fields, slots):
+                setattr(cls, attr, ParamsProperty(attr, cls.__dict__[slot]))
+        else:
+            attrs['__slots__'] = tuple(fields)
+            attrs.update(generate_methods(name, fields))
+            cls = type(name, (Params,), attrs)
 
         return cls
 
 
+class LazyParams(Params):
+    """ Parameters are unmarshalled on first attribute access
+
+    `__resolvers__` maps attribute name to function that accepts
+    params object and returns unmarshalled value.
+    """
+
+    __slots__ = ('__request__', '__body__')
+    __resolvers__ = {}
+
+    def __init__(self, request, body=None):
+        self.__request__ = request
+        self.__body__ = body
+
+    def validate_all(self):
+        for name in self.__fields__:
+            getattr(self, name)
+
+
 class ParamsProperty(object):
+    """ Lazy parameter, resolved value is stored in slot """
+
+    __slots__ = ('name', 'slot')
 
-    def __init__(self, name):
+    def __init__(self, name, slot):
         self.name = name
+        self.slot = slot
 
     def __get__(self, ob, type):
+        if ob is None:
+            return self
         try:
-            return ob.__dict__[self.name]
-        except KeyError:
-            raise AttributeError
+            return self.slot.__get__(ob, type)
+        except AttributeError:
+            pass
+
+        value = ob.__resolvers__[self.name](ob)
+        self.slot.__set__(ob, value)
+        return value
 
     def __set__(self, ob, val):
-        raise AttributeError
+        raise AttributeError(self.name)
+
+
+def attribute_name(name):
+    """ Python attribute name for parameter name """
+    name = re.sub(r'\W', '_', name)
+    if not name or name[0].isdigit():
+        name = '_%s' % name
+    elif keyword.iskeyword(name):
+        name = '%s_' % name
+    return name
+
+
+def generate_methods(name, fields):
+    """ Generate `__init__`, `__repr__` and `as_dict` methods """
+    args = ['_%d' % idx for idx in range(len(fields))]
+
+    lines = ['def __init__(self%s):' % ''.join(', ' + a for a in args)]
+    lines.extend('    self.%s = %s' % item for item in zip(fields, args))
+    lines.append('    pass')
+
+    lines.append('def __repr__(self):')
+    lines.append('    return %r %% (%s)' % (
+        '%s(%s)' % (name, ', '.join('%s=%%r' % f for f in fields)),
+        ''.join('self.%s, ' % f for f in fields)))
+
+    lines.append('def as_dict(self):')
+    lines.append('    return {%s}' % ', '.join(
+        '%r: self.%s' % (f, f) for f in fields))
+
+    ns = {}
+    exec('\n'.join(lines), ns)
+    return {'__init__': ns['__init__'],
+            '__repr__': ns['__repr__'],
+            'as_dict': ns['as_dict']}
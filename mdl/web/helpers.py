@@ -1,12 +1,19 @@
 """Various helper functions"""
 
 import cgi
+import datetime
+from email.utils import parsedate_to_datetime
+
 from . import hdrs
 from ..interfaces import SENTINEL
 
+MAX_RANGES = 100
+
 
 class HeadersMixin:
 
+    __slots__ = ()
+
     _content_type = None
     _content_dict = None
     _stored_content_type = SENTINEL
@@ -44,3 +51,126 @@ class HeadersMixin:
             return None
         else:
             return int(l)
+
+
+def etag_match(header, etag):
+    """ Check If-None-Match header value with weak comparison """
+    if not header or not etag:
+        return False
+
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for value in header.split(','):
+        value = value.strip()
+        if value == '*':
+            return True
+        if value.startswith('W/'):
+            value = value[2:]
+        if value == etag:
+            return True
+    return False
+
+
+def parse_http_date(value):
+    """ Parse HTTP date, returns None for invalid value """
+    if not value:
+        return None
+    try:
+        value = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def not_modified(method, headers, etag, last_modified):
+    """ Check conditional request headers
+
+    :param etag: ETag of response
+    :param last_modified: Last-Modified header value of response
+    """
+    if method not in (hdrs.METH_GET, hdrs.METH_HEAD):
+        return False
+
+    if_none_match = headers.get(hdrs.IF_NONE_MATCH)
+    if if_none_match is not None:
+        return etag_match(if_none_match, etag)
+
+    if last_modified is not None:
+        since = parse_http_date(headers.get(hdrs.IF_MODIFIED_SINCE))
+        modified = parse_http_date(last_modified)
+        if since is not None and modified is not None:
+            return modified <= since
+
+    return False
+
+
+def if_range_match(header, etag, last_modified):
+    """ Check If-Range header value, entity tag is compared
+    with strong comparison, date must be equal to Last-Modified """
+    if header.startswith('"') or header.startswith('W/'):
+        return (etag is not None and not etag.startswith('W/') and
+                header == etag)
+
+    since = parse_http_date(header)
+    modified = parse_http_date(last_modified)
+    return since is not None and modified is not None and since == modified
+
+
+def parse_range(header, size, max_ranges=MAX_RANGES):
+    """ Parse Range header for body of `size` bytes
+
+    Overlapping and adjacent ranges are merged.
+
+    :return: list of (start, end) pairs, end is exclusive; empty list
+             if range is not satisfiable or None if header is invalid
+    """
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+
+        first, sep, last = spec.partition('-')
+        if not sep:
+            return None
+        try:
+            first = int(first) if first else None
+            last = int(last) if last else None
+        except ValueError:
+            return None
+
+        if first is None:
+            # suffix range
+            if last is None:
+                return None
+            if last > 0 and size > 0:
+                ranges.append((max(size - last, 0), size))
+        else:
+            if first < 0 or (last is not None and last < first):
+                return None
+            if first < size:
+                end = size if last is None else min(last + 1, size)
+                ranges.append((first, end))
+
+    if not ranges:
+        return ranges
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        prev_start, prev_end = merged[-1]
+        if start <= prev_end:
+            merged[-1] = (prev_start, max(prev_end, end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > max_ranges:
+        return None
+    return merged
@@ -38,11 +38,34 @@ class IStreamWriter(interface.Interface):
 
     params = interface.Attribute('Parameters', spec='IParameters')
     request = interface.Attribute('Request', spec='IRequest')
+    bytes_written = interface.Attribute(
+        'Number of bytes written to transport', spec='int')
+    flushes = interface.Attribute(
+        'Number of transport writes', spec='int')
 
-    def write(data):
-        """ write data to stream
+    def write(data, flush=False):
+        """ write data to stream, small writes are buffered until
+        next event loop iteration unless `flush` is true
 
         :type data: bytes | bytearray | memoryview
+        :type flush: bool
+        """
+
+    def flush():
+        """ write buffered data to transport
+
+        :rtype: None
+        """
+
+    def sendfile(fileobj, offset, count):
+        """ send `count` bytes of file starting at `offset` with
+        sendfile system call
+
+        :type fileobj: *
+        :type offset: int
+        :type count: int
+        :return: False if sendfile can not be used for response
+        :rtype: bool
         """
 
     def write_eof():
@@ -51,3 +74,72 @@ class IStreamWriter(interface.Interface):
 
         :rtype: None
         """
+
+
+class ISeekableStream(IStream):
+    """ stream of known size that can write byte ranges """
+
+    size = interface.Attribute('Size of stream in bytes', spec='int')
+
+    def write_range(stream, start, end):
+        """ write bytes from `start` to `end` (exclusive) to stream
+
+        :type stream: IStreamWriter
+        :type start: int
+        :type end: int
+        """
+
+
+class IBodyDecoder(interface.Interface):
+    """ Request body decoder, registered with media type as name """
+
+    def __call__(data, charset):
+        """ decode request body
+
+        :type data: bytes | bytearray
+        :type charset: None | str
+        """
+
+
+class IBodyEncoder(interface.Interface):
+    """ Response body encoder, registered with media type as name """
+
+    def __call__(obj, charset):
+        """ encode object
+
+        :type obj: *
+        :type charset: None | str
+        :rtype: bytes
+        """
+
+
+class IResponseCache(interface.Interface):
+    """ Response cache of operation, registered with
+    `<application name>.<operation id>` name """
+
+    hits = interface.Attribute('Number of cache hits', spec='int')
+    misses = interface.Attribute('Number of cache misses', spec='int')
+    evictions = interface.Attribute(
+        'Number of evicted entries', spec='int')
+
+
+class IEventHub(interface.Interface):
+    """ Server-sent events broadcast hub, registered with
+    `x-mdl-event-hub` name """
+
+    published = interface.Attribute('Number of published events', spec='int')
+    dropped = interface.Attribute(
+        'Number of frames dropped for slow subscribers', spec='int')
+    disconnected = interface.Attribute(
+        'Number of frames not delivered to disconnected subscribers',
+        spec='int')
+
+    def publish(data, event=None, id=None, retry=None):
+        """ send event to all subscribers
+
+        :type data: *
+        :type event: None | str
+        :type id: *
+        :type retry: None | int
+        :rtype: int
+        """
@@ -0,0 +1,323 @@
+""" Incremental JSON processing """
+import codecs
+import csv
+import io
+import json
+import re
+
+__all__ = ('JSONArrayParser', 'ItemSerializer', 'JSONArraySerializer',
+           'NDJSONSerializer', 'CSVSerializer', 'get_serializer')
+
+WHITESPACE = ' \t\n\r'
+NUMBER_START = '-0123456789'
+NUMBER_CHARS = '+-.eE0123456789'
+CONTAINER_CHARS = re.compile(r'[\[\]{}"]')
+STRING_CHARS = re.compile(r'["\\]')
+
+START, VALUE_OR_END, VALUE, SEPARATOR, DONE = range(5)
+
+
+class JSONArrayParser(object):
+    """ Parse top level JSON array from chunks of data
+
+    Items are returned as soon as they are complete, so only
+    unparsed part of current item is kept in memory::
+
+        parser = JSONArrayParser()
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                ...
+        for item in parser.close():
+            ...
+
+    End of object, array and string item is found by scanning each
+    chunk once, item is decoded when it is complete.
+
+    :raises ValueError: if data is not valid JSON array
+    """
+
+    def __init__(self, encoding='utf-8'):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._decode = json.JSONDecoder().raw_decode
+        self._buf = ''
+        self._state = START
+
+        # chunks of incomplete object, array or string item
+        # and state of scanner at the end of last chunk
+        self._pending = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self):
+        return self._state == DONE
+
+    def feed(self, data):
+        """ Feed chunk of data, returns list of complete items """
+        return self._parse(self._decoder.decode(data), False)
+
+    def close(self):
+        """ Finish parsing, returns list of remaining items """
+        items = self._parse(self._decoder.decode(b'', True), True)
+        if self._state != DONE:
+            raise ValueError('Incomplete JSON array')
+        return items
+
+    def _scan(self, text, pos):
+        """ Find end of item in text, scan starts at `pos` with
+        state of scanner after previous chunk
+
+        :return: position after end of item or -1
+        """
+        depth = self._depth
+        in_string = self._in_string
+        size = len(text)
+        if self._escape and pos < size:
+            # escaped character is first character of chunk
+            self._escape = False
+            pos += 1
+
+        while pos < size:
+            if in_string:
+                m = STRING_CHARS.search(text, pos)
+                if m is None:
+                    break
+                pos = m.end()
+                if m.group() == '\\':
+                    if pos == size:
+                        self._escape = True
+                    pos += 1
+                    continue
+
+                in_string = False
+                if not depth:
+                    return pos
+            else:
+                m = CONTAINER_CHARS.search(text, pos)
+                if m is None:
+                    break
+                pos = m.end()
+                char = m.group()
+                if char == '"':
+                    in_string = True
+                elif char in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+                    if not depth:
+                        return pos
+
+        self._depth = depth
+        self._in_string = in_string
+        return -1
+
+    def _parse(self, data, eof):
+        items = []
+        pending = self._pending
+        if pending is not None:
+            # continue scan of incomplete item
+            end = self._scan(data, 0)
+            if end < 0:
+                if eof:
+                    raise ValueError('Incomplete JSON value')
+                pending.append(data)
+                return items
+
+            self._pending = None
+            pending.append(data)
+            buf = ''.join(pending)
+            item, pos = self._decode(buf, 0)
+            items.append(item)
+            state = SEPARATOR
+        else:
+            buf = self._buf + data if self._buf else data
+            state = self._state
+            pos = 0
+
+        size = len(buf)
+        while True:
+            while pos < size and buf[pos] in WHITESPACE:
+                pos += 1
+            if pos == size:
+                break
+
+            char = buf[pos]
+            if state == START:
+                if char != '[':
+                    raise ValueError('JSON array is expected')
+                state = VALUE_OR_END
+                pos += 1
+            elif state == SEPARATOR or (state == VALUE_OR_END and
+                                        char == ']'):
+                if char == ']':
+                    state = DONE
+                elif char == ',':
+                    state = VALUE
+                else:
+                    raise ValueError(
+                        'Expecting "," or "]" at position %d' % pos)
+                pos += 1
+            elif state == DONE:
+                raise ValueError('Extra data after JSON array')
+            elif char in '[{"':
+                self._depth = 0
+                self._in_string = char == '"'
+                self._escape = False
+                end = self._scan(buf, pos + 1 if char == '"' else pos)
+                if end < 0:
+                    if eof:
+                        raise ValueError('Incomplete JSON value')
+                    self._pending = [buf[pos:]]
+                    pos = size
+                    break
+
+                item, pos = self._decode(buf, pos)
+                items.append(item)
+                state = SEPARATOR
+            else:
+                try:
+                    item, end = self._decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                    break
+
+                # number at the end of buffer may be incomplete
+                if (char in NUMBER_START and not eof and
+                        (end == size or buf[end] in NUMBER_CHARS)):
+                    break
+
+                items.append(item)
+                state = SEPARATOR
+                pos = end
+
+        self._buf = buf[pos:]
+        self._state = state
+        return items
+
+
+class ItemSerializer(object):
+    """ Serialize items of stream one by one
+
+    `write(buf, item, index)` appends encoded item to list `buf` and
+    returns number of appended bytes, `head` and `tail` enclose items.
+    Bytes and strings are written as is, other objects are encoded
+    with `encoder`.
+    """
+
+    head = b''
+    tail = b''
+
+    def __init__(self, encoder=None, charset='utf-8'):
+        self.encoder = encoder
+        self.charset = charset
+
+    def encode(self, item):
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            return item
+        if isinstance(item, str):
+            return item.encode(self.charset)
+        if self.encoder is None:
+            raise TypeError('Can not encode stream item %r' % (item,))
+        return self.encoder(item, self.charset)
+
+    def write(self, buf, item, index):
+        data = self.encode(item)
+        buf.append(data)
+        return len(data)
+
+
+def _encode_json(item, charset):
+    return json.dumps(item).encode(charset or 'utf-8')
+
+
+class JSONArraySerializer(ItemSerializer):
+    """ Serialize items as JSON array, bytes items are written as
+    encoded JSON values """
+
+    head = b'['
+    tail = b']'
+
+    def __init__(self, encoder=_encode_json, charset='utf-8'):
+        super(JSONArraySerializer, self).__init__(encoder, charset)
+
+    def write(self, buf, item, index):
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            data = item
+        else:
+            data = self.encoder(item, self.charset)
+        if index:
+            buf.append(b',')
+            buf.append(data)
+            return len(data) + 1
+
+        buf.append(data)
+        return len(data)
+
+
+class NDJSONSerializer(ItemSerializer):
+    """ Serialize items as newline delimited JSON, bytes items are
+    written as encoded JSON values """
+
+    def __init__(self, encoder=_encode_json, charset='utf-8'):
+        super(NDJSONSerializer, self).__init__(encoder, charset)
+
+    def write(self, buf, item, index):
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            data = item
+        else:
+            data = self.encoder(item, self.charset)
+        buf.append(data)
+        buf.append(b'\n')
+        return len(data) + 1
+
+
+class CSVSerializer(ItemSerializer):
+    """ Serialize items as CSV rows
+
+    Items are mappings or sequences, for mappings `fields` defaults to
+    keys of first item, header row is written with field names.
+    """
+
+    def __init__(self, fields=None, charset='utf-8', header=True):
+        super(CSVSerializer, self).__init__(None, charset)
+        self.fields = fields
+        self.header = header
+        self._out = io.StringIO()
+        self._writer = csv.writer(self._out)
+
+    def write(self, buf, item, index):
+        writer = self._writer
+        if isinstance(item, dict):
+            if self.fields is None:
+                self.fields = list(item)
+            if index == 0 and self.header:
+                writer.writerow(self.fields)
+            writer.writerow([item.get(name) for name in self.fields])
+        else:
+            if index == 0 and self.header and self.fields is not None:
+                writer.writerow(self.fields)
+            writer.writerow(item)
+
+        out = self._out
+        data = out.getvalue().encode(self.charset)
+        out.seek(0)
+        out.truncate()
+        buf.append(data)
+        return len(data)
+
+
+def get_serializer(media_type, encoder=None, charset='utf-8'):
+    """ Serializer for items of response with media type
+
+    :param encoder: body encoder of `application/json` for JSON
+                    serializers, of `media_type` for other types
+    """
+    if media_type == 'application/json':
+        return JSONArraySerializer(encoder or _encode_json, charset)
+    elif media_type == 'application/x-ndjson':
+        return NDJSONSerializer(encoder or _encode_json, charset)
+    elif media_type == 'text/csv':
+        return CSVSerializer(charset=charset)
+    return ItemSerializer(encoder, charset)
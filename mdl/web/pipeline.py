@@ -0,0 +1,100 @@
+""" Request transform pipeline """
+import asyncio
+import functools
+import inspect
+
+__all__ = ('compile_pipeline',)
+
+
+def _unwrap(func):
+    """ Callable and callables wrapped by it with `functools.partial`
+    or decorators that use `functools.wraps` """
+    while func is not None:
+        yield func
+        if isinstance(func, functools.partial):
+            func = func.func
+        else:
+            func = getattr(func, '__wrapped__', None)
+
+
+def is_coroutine(func):
+    """ Callable is coroutine function, partial object or decorated
+    function that wraps coroutine function """
+    for func in _unwrap(func):
+        if (asyncio.iscoroutinefunction(func) or
+                asyncio.iscoroutinefunction(getattr(func, '__call__', None))):
+            return True
+    return False
+
+
+def is_function(func):
+    """ Callable is regular function that does not return awaitable """
+    for func in _unwrap(func):
+        pass
+    return inspect.isroutine(func) and not is_coroutine(func)
+
+
+def compile_pipeline(itransform, transforms, otransform, prepare=None):
+    """ Compile transforms into single coroutine function
+
+    Pipeline is `in transforms -> prepare -> route transforms ->
+    handler -> out transforms`:
+
+    * in and route transforms are called as `transform(ctx)`, result
+      other than None is used as response body and skips following
+      transforms and handler
+    * `prepare` is called as `prepare(ctx)`, result other than None
+      is returned as complete response body, e.g. cached response
+    * handler, last of route transforms, is called as `handler(ctx)`
+    * out transforms are called as `transform(ctx, body)` and return
+      new body
+
+    Transforms can be coroutine functions or regular functions,
+    result of other callables is awaited if it is awaitable.
+
+    :return: coroutine function that accepts context and returns body
+    """
+    if not transforms:
+        raise ValueError('Handler is required')
+
+    ns = {'_isawaitable': inspect.isawaitable}
+    lines = ['async def pipeline(ctx):']
+
+    def call(indent, name, func, *args):
+        ns[name] = func
+        call = '%s(%s)' % (name, ', '.join(args))
+        if is_coroutine(func):
+            lines.append('%sbody = await %s' % (indent, call))
+            return
+
+        lines.append('%sbody = %s' % (indent, call))
+        if not is_function(func):
+            # callable can not be classified, result is checked
+            lines.append('%sif _isawaitable(body):' % indent)
+            lines.append('%s    body = await body' % indent)
+
+    indent = '    '
+    for idx, func in enumerate(itransform):
+        call(indent, '_i%d' % idx, func, 'ctx')
+        lines.append('%sif body is None:' % indent)
+        indent += '    '
+
+    if prepare is not None:
+        call(indent, '_p', prepare, 'ctx')
+        lines.append('%sif body is not None:' % indent)
+        lines.append('%s    return body' % indent)
+
+    for idx, func in enumerate(transforms[:-1]):
+        call(indent, '_t%d' % idx, func, 'ctx')
+        lines.append('%sif body is None:' % indent)
+        indent += '    '
+
+    call(indent, '_h', transforms[-1], 'ctx')
+
+    for idx, func in enumerate(otransform):
+        call('    ', '_o%d' % idx, func, 'ctx', 'body')
+
+    lines.append('    return body')
+
+    exec('\n'.join(lines), ns)
+    return ns['pipeline']
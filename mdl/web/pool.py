@@ -0,0 +1,37 @@
+""" Object pool """
+
+__all__ = ('Pool',)
+
+
+class Pool(object):
+    """ Free list of reusable objects
+
+    Objects are re-initialized with `__init__` on `acquire()`,
+    `release()` calls `reset()` of object that should drop
+    references to request data. Object must not be used after
+    release.
+    """
+
+    __slots__ = ('factory', 'size', '_free')
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self._free = []
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self, *args, **kwargs):
+        free = self._free
+        if free:
+            ob = free.pop()
+            ob.__init__(*args, **kwargs)
+            return ob
+
+        return self.factory(*args, **kwargs)
+
+    def release(self, ob):
+        if len(self._free) < self.size:
+            ob.reset()
+            self._free.append(ob)
@@ -5,11 +5,12 @@ import math
 import time
 from email.utils import parsedate
 from http.cookies import SimpleCookie
-from multidict import CIMultiDict
+from multidict import CIMultiDict, CIMultiDictProxy
 
 from . import hdrs, helpers
+from ..interfaces import SENTINEL
 
-__all__ = ('Response', 'ContentCoding')
+__all__ = ('Response', 'ContentCoding', 'HeaderTemplate')
 
 RESPONSES = http.server.BaseHTTPRequestHandler.responses
 
@@ -24,16 +25,53 @@ class ContentCoding(enum.Enum):
     identity = 'identity'
 
 
+class HeaderTemplate(object):
+    """ Precomputed response headers of operation
+
+    `binary` headers are used for bytes body, `text` headers have
+    charset in content type and are used for str body.
+    """
+
+    __slots__ = ('charset', 'binary', 'text')
+
+    def __init__(self, content_type, headers=(), charset='utf-8'):
+        binary = CIMultiDict(headers)
+        text = binary.copy()
+        if content_type is not None:
+            binary[hdrs.CONTENT_TYPE] = content_type
+            text[hdrs.CONTENT_TYPE] = '{0}; charset={1}'.format(
+                content_type, charset)
+
+        self.charset = charset
+        self.binary = CIMultiDictProxy(binary)
+        self.text = CIMultiDictProxy(text)
+
+
 class Response(helpers.HeadersMixin):
+    """ Response of web handler
+
+    Headers are copied from `template` on first access.
+    """
+
+    __slots__ = ('_chunked', '_chunk_size', '_content_coding',
+                 '_cookies', '_headers', '_template', '_status', '_reason',
+                 '_content_type', '_content_dict', '_stored_content_type')
 
-    def __init__(self):
+    def __init__(self, template=None):
         self._chunked = False
         self._chunk_size = None
         self._content_coding = None
-        self._cookies = SimpleCookie()
-        self._headers = CIMultiDict()
+        self._content_type = None
+        self._content_dict = None
+        self._stored_content_type = SENTINEL
 
-        self.set_status(200)
+        # headers and cookies are created on first use
+        self._cookies = None
+        self._headers = None
+        self._template = template
+
+        self._status = 200
+        self._reason = 'OK'
 
     @property
     def chunked(self):
@@ -83,7 +121,20 @@ class Response(helpers.HeadersMixin):
 
     @property
     def headers(self):
-        return self._headers
+        headers = self._headers
+        if headers is None:
+            if self._template is not None:
+                headers = self._headers = self._template.binary.copy()
+            else:
+                headers = self._headers = CIMultiDict()
+        return headers
+
+    @property
+    def cookies(self):
+        cookies = self._cookies
+        if cookies is None:
+            cookies = self._cookies = SimpleCookie()
+        return cookies
 
     @property
     def content_length(self):
@@ -135,6 +186,21 @@ class Response(helpers.HeadersMixin):
             ctype = self._content_type
         self.headers[CONTENT_TYPE] = ctype
 
+    @property
+    def etag(self):
+        """The value of ETag HTTP header, or None."""
+        return self.headers.get(hdrs.ETAG)
+
+    @etag.setter
+    def etag(self, value):
+        if value is None:
+            self.headers.pop(hdrs.ETAG, None)
+        else:
+            value = str(value)
+            if not (value.startswith('"') or value.startswith('W/"')):
+                value = '"{0}"'.format(value)
+            self.headers[hdrs.ETAG] = value
+
     @property
     def last_modified(self, _LAST_MODIFIED=hdrs.LAST_MODIFIED):
         """The value of Last-Modified HTTP header, or None.
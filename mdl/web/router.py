@@ -0,0 +1,257 @@
+""" Route table """
+import re
+from urllib.parse import unquote
+
+__all__ = ('Router', 'segment_matcher')
+
+METH_ANY = '*'
+
+PARAM = re.compile(r'\{([^{}]+)\}')
+
+# matchers with lower priority are tried first
+PRIORITY_ENUM = 0
+PRIORITY_INTEGER = 1
+PRIORITY_NUMBER = 2
+PRIORITY_PATTERN = 3
+PRIORITY_STRING = 4
+
+
+def _is_integer(value):
+    if value[:1] == '-':
+        value = value[1:]
+    return value.isdigit()
+
+
+def _is_number(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_string(value):
+    return bool(value)
+
+
+def segment_matcher(spec):
+    """ Matcher for path parameter with swagger parameter spec
+
+    :type spec: dict
+    :return: tuple of priority, key and function that accepts
+             path segment and returns True if segment matches
+    """
+    if spec is None:
+        spec = {}
+
+    tp = spec.get('type', 'string')
+    if 'enum' in spec:
+        values = frozenset(str(v).lower() if isinstance(v, bool) else str(v)
+                           for v in spec['enum'])
+        return (PRIORITY_ENUM, ('enum', tuple(sorted(values))),
+                values.__contains__)
+    elif tp == 'boolean':
+        values = frozenset(('true', 'false'))
+        return (PRIORITY_ENUM, ('enum', ('false', 'true')),
+                values.__contains__)
+    elif tp == 'integer':
+        return PRIORITY_INTEGER, ('integer',), _is_integer
+    elif tp == 'number':
+        return PRIORITY_NUMBER, ('number',), _is_number
+    elif 'pattern' in spec:
+        pattern = re.compile(spec['pattern'])
+
+        def match(value):
+            return pattern.search(value) is not None
+
+        return PRIORITY_PATTERN, ('pattern', spec['pattern']), match
+
+    return PRIORITY_STRING, ('string',), _is_string
+
+
+class Node(object):
+    """ Node of path tree, node per path segment """
+
+    __slots__ = ('static', 'params', 'routes')
+
+    def __init__(self):
+        # segment -> Node
+        self.static = {}
+        # list of (priority, key, name, match, Node)
+        self.params = []
+        # method -> route
+        self.routes = None
+
+    def static_child(self, segment):
+        node = self.static.get(segment)
+        if node is None:
+            node = self.static[segment] = Node()
+        return node
+
+    def param_child(self, name, matcher):
+        priority, key, match = matcher
+        for item in self.params:
+            if item[1] == key and item[2] == name:
+                return item[4]
+
+        node = Node()
+        self.params.append((priority, key, name, match, node))
+        self.params.sort(key=lambda item: (item[0], item[2]))
+        return node
+
+
+class Router(object):
+    """ Route table for swagger style path templates
+
+    Static paths are resolved with single dict lookup, templated paths
+    with tree of path segments. Template segment is matched by type of
+    path parameter, so `/items/{id}` with integer `id` and
+    `/items/{name}` with string `name` can coexist. Routes of
+    applications with same base path share same branch of tree.
+    """
+
+    def __init__(self):
+        self._static = {}
+        self._root = Node()
+        self._routes = []
+
+    def __len__(self):
+        return len(self._routes)
+
+    def __iter__(self):
+        return iter(self._routes)
+
+    def add(self, method, path, route, matchers=None):
+        """ Register route
+
+        :param path: path template, i.e. `/items/{id}/`
+        :param matchers: dict of parameter name -> `segment_matcher()`
+        """
+        if matchers is None:
+            matchers = {}
+
+        if not PARAM.search(path):
+            routes = self._static.setdefault(path, {})
+        else:
+            node = self._root
+            for segment in path.split('/'):
+                names = PARAM.findall(segment)
+                if not names:
+                    node = node.static_child(segment)
+                elif PARAM.fullmatch(segment):
+                    name = names[0]
+                    matcher = matchers.get(name)
+                    if matcher is None:
+                        matcher = segment_matcher(None)
+                    node = node.param_child(name, matcher)
+                else:
+                    node = node.param_child(
+                        segment, self._segment_regex(segment, matchers))
+
+            if node.routes is None:
+                node.routes = {}
+            routes = node.routes
+
+        if method in routes:
+            raise ValueError(
+                'Route for %s %s is registered already' % (method, path))
+
+        routes[method] = route
+        self._routes.append((method, path, route))
+
+    def _segment_regex(self, segment, matchers):
+        """ matcher for segment with static parts, i.e. `{id}.json` """
+        parts = []
+        pos = 0
+        for m in PARAM.finditer(segment):
+            parts.append(re.escape(segment[pos:m.start()]))
+            parts.append('(?P<%s>.+?)' % m.group(1))
+            pos = m.end()
+        parts.append(re.escape(segment[pos:]))
+        regex = re.compile(''.join(parts))
+
+        def match(value):
+            m = regex.fullmatch(value)
+            if m is None:
+                return False
+
+            for name, val in m.groupdict().items():
+                matcher = matchers.get(name)
+                if matcher is not None and not matcher[2](val):
+                    return False
+            return m.groupdict()
+
+        return PRIORITY_PATTERN, ('regex', segment), match
+
+    def resolve(self, method, path):
+        """ Find route for request
+
+        Route that handles request method is searched in all branches
+        that match path.
+
+        :return: tuple of route, match dict and allowed methods;
+                 route is None if method is not allowed, all items are
+                 None if path is not found
+        """
+        allowed = []
+        routes = self._static.get(path)
+        if routes is not None:
+            route = routes.get(method)
+            if route is None:
+                route = routes.get(METH_ANY)
+            if route is not None:
+                return route, {}, None
+            allowed.extend(routes)
+
+        match = {}
+        routes = self._match(
+            self._root, path.split('/'), 0, match, method, allowed)
+        if routes is None:
+            if not allowed:
+                return None, None, None
+            methods = []
+            for name in allowed:
+                if name not in methods:
+                    methods.append(name)
+            return None, None, tuple(methods)
+
+        route = routes.get(method)
+        if route is None:
+            route = routes[METH_ANY]
+        return route, match, None
+
+    def _match(self, node, segments, idx, match, method, allowed):
+        if idx == len(segments):
+            routes = node.routes
+            if routes is None:
+                return None
+            if method in routes or METH_ANY in routes:
+                return routes
+            allowed.extend(routes)
+            return None
+
+        segment = segments[idx]
+        child = node.static.get(segment)
+        if child is not None:
+            routes = self._match(
+                child, segments, idx + 1, match, method, allowed)
+            if routes is not None:
+                return routes
+
+        if node.params:
+            value = unquote(segment)
+            for priority, key, name, matcher, child in node.params:
+                result = matcher(value)
+                if not result:
+                    continue
+
+                routes = self._match(
+                    child, segments, idx + 1, match, method, allowed)
+                if routes is not None:
+                    if result is True:
+                        match[name] = value
+                    else:
+                        match.update(result)
+                    return routes
+
+        return None
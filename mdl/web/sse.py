@@ -0,0 +1,228 @@
+""" Server-sent events """
+import asyncio
+import collections
+import json
+
+from . import interfaces
+from ..declarations import implements
+
+__all__ = ('EventHub', 'Channel', 'encode_event', 'DROP', 'DISCONNECT')
+
+DEFAULT_MAX_QUEUE = 100
+
+# slow consumer policies
+DROP = 'drop'
+DISCONNECT = 'disconnect'
+
+
+def encode_event(data, event=None, id=None, retry=None):
+    """ Encode event frame of text/event-stream
+
+    `data` that is not string is encoded as JSON.
+    """
+    if not isinstance(data, str):
+        data = json.dumps(data)
+
+    lines = []
+    if id is not None:
+        lines.append('id: {0}'.format(id))
+    if event is not None:
+        lines.append('event: {0}'.format(event))
+    if retry is not None:
+        lines.append('retry: {0:d}'.format(retry))
+    for line in data.splitlines() or ('',):
+        lines.append('data: ' + line)
+    lines.append('\n')
+    return '\n'.join(lines).encode('utf-8')
+
+
+class Channel(object):
+    """ Queue of encoded event frames of single subscriber
+
+    While consumer is idle it can set `sink`, frames are passed to
+    sink directly without waking consumer. Sink returns False if it
+    can not accept more frames, consumer is woken up and frames are
+    queued until consumer sets sink again.
+
+    When queue is full, new frame is dropped with `drop` policy,
+    channel is closed with `disconnect` policy.
+    """
+
+    __slots__ = ('max_queue', 'policy', 'hub', 'sink', 'closed', 'dropped',
+                 '_queue', '_waiter')
+
+    def __init__(self, max_queue=DEFAULT_MAX_QUEUE, policy=DROP):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.hub = None
+        self.sink = None
+        self.closed = False
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._waiter = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def send(self, data, event=None, id=None, retry=None):
+        """ Send event to this subscriber """
+        return self.put(encode_event(data, event, id, retry))
+
+    def put(self, frame):
+        """ Put encoded frame to queue
+
+        :return: False if frame is dropped or channel is closed
+        """
+        if self.closed:
+            return False
+
+        queue = self._queue
+        sink = self.sink
+        if sink is not None and not queue:
+            if not sink(frame):
+                # sink is full, consumer has to wait for it
+                self.sink = None
+                self._wakeup()
+            return True
+
+        if len(queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                self.close()
+            else:
+                self.dropped += 1
+            return False
+
+        queue.append(frame)
+        self._wakeup()
+        return True
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def get(self, timeout=None):
+        """ Wait for frames
+
+        :return: list of queued frames, empty list if `timeout`
+                 expired or sink is full, None if channel is closed
+        """
+        if not self._queue and not self.closed:
+            loop = asyncio.get_event_loop()
+            waiter = self._waiter = loop.create_future()
+            handle = None
+            if timeout is not None:
+                handle = loop.call_later(
+                    timeout, _set_result, waiter, None)
+            try:
+                await waiter
+            finally:
+                if handle is not None:
+                    handle.cancel()
+                self._waiter = None
+
+        if self._queue:
+            frames = list(self._queue)
+            self._queue.clear()
+            return frames
+        elif self.closed:
+            return None
+        return []
+
+    def close(self):
+        """ Close channel, waiting consumer gets remaining frames
+        and then None """
+        if self.closed:
+            return
+
+        self.closed = True
+        self.sink = None
+        if self.hub is not None:
+            self.hub.unsubscribe(self)
+        self._wakeup()
+
+
+def _set_result(fut, result):
+    if not fut.done():
+        fut.set_result(result)
+
+
+class EventHub(object):
+    """ Broadcast events to subscribed channels
+
+    Event is encoded once for all subscribers. Hub is registered as
+    utility with name from `x-mdl-event-hub`, it must be used from
+    event loop thread.
+    """
+    implements(interfaces.IEventHub)
+
+    def __init__(self, max_queue=DEFAULT_MAX_QUEUE, policy=DROP):
+        if policy not in (DROP, DISCONNECT):
+            raise ValueError('Unknown slow consumer policy: %r' % policy)
+
+        self.max_queue = max_queue
+        self.policy = policy
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+        self._channels = set()
+
+    @classmethod
+    def from_spec(cls, spec):
+        """ Create hub from `x-mdl-event-hub` mapping value::
+
+          x-mdl-event-hub:
+            name: prices
+            max-queue: 100
+            policy: drop
+            heartbeat: 15
+
+        `heartbeat` is interval of keep-alive comments of event
+        streams of operation.
+        """
+        return cls(int(spec.get('max-queue', DEFAULT_MAX_QUEUE)),
+                   spec.get('policy', DROP))
+
+    def __len__(self):
+        return len(self._channels)
+
+    def channel(self):
+        """ Create subscribed channel """
+        channel = Channel(self.max_queue, self.policy)
+        self.subscribe(channel)
+        return channel
+
+    def subscribe(self, channel):
+        channel.hub = self
+        self._channels.add(channel)
+
+    def unsubscribe(self, channel):
+        self._channels.discard(channel)
+        channel.hub = None
+
+    def publish(self, data, event=None, id=None, retry=None):
+        """ Send event to all subscribers
+
+        :return: number of subscribers that received event
+        """
+        return self.publish_frame(encode_event(data, event, id, retry))
+
+    def publish_frame(self, frame):
+        """ Send encoded event frame to all subscribers """
+        self.published += 1
+        delivered = 0
+        for channel in list(self._channels):
+            if channel.put(frame):
+                delivered += 1
+            elif channel.closed:
+                self.disconnected += 1
+            else:
+                self.dropped += 1
+        return delivered
+
+    def close(self):
+        """ Close all channels """
+        for channel in list(self._channels):
+            channel.close()
@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class Content(object):
+    """ Request payload received in chunks """
+
+    def __init__(self, chunks=()):
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    async def readany(self):
+        self.reads += 1
+        if self.chunks:
+            return self.chunks.pop(0)
+        return b''
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class BodyStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _makeOne(self, chunks, max_size=1024):
+        from mdl._aiohttp.body import BodyStream
+
+        self.content = Content(chunks)
+        return BodyStream(self.content, max_size, 'text/plain', 'utf-8')
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_readchunk(self):
+        stream = self._makeOne([b'abc', b'de'])
+        self.assertEqual(self._run(stream.readchunk()), b'abc')
+        self.assertEqual(stream.size, 3)
+
+        # next chunk is not read until it is requested
+        self.assertEqual(self.content.reads, 1)
+        self.assertEqual(self._run(stream.readchunk()), b'de')
+        self.assertEqual(self._run(stream.readchunk()), b'')
+        self.assertEqual(stream.size, 5)
+
+    def test_iterate(self):
+        async def read(stream):
+            chunks = []
+            async for chunk in stream:
+                chunks.append(chunk)
+            return chunks
+
+        self.assertEqual(
+            self._run(read(self._makeOne([b'abc', b'de']))), [b'abc', b'de'])
+
+    def test_read(self):
+        stream = self._makeOne([b'abc', b'de'])
+        self.assertEqual(self._run(stream.read()), b'abcde')
+
+    def test_max_size(self):
+        stream = self._makeOne([b'abc', b'de', b'f'], 4)
+        self.assertEqual(self._run(stream.readchunk()), b'abc')
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge,
+            self._run, stream.readchunk())
+        self.assertEqual(self.content.chunks, [b'f'])
+
+    def test_spool(self):
+        import mmap
+
+        stream = self._makeOne([b'abc'] * 1000, 4096)
+        data = self._run(stream.spool())
+        self.assertIsInstance(data, mmap.mmap)
+        self.assertEqual(data[:], b'abc' * 1000)
+        self.assertEqual(stream.size, 3000)
+        data.close()
+
+    def test_spool_empty(self):
+        self.assertEqual(self._run(self._makeOne([]).spool()), b'')
+
+    def test_spool_max_size(self):
+        stream = self._makeOne([b'abc'] * 10, 20)
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge, self._run, stream.spool())
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class BodyItemsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _makeOne(self, chunks, finalize=None, max_size=1024):
+        from mdl._aiohttp.body import BodyItems, BodyStream
+
+        self.content = Content(chunks)
+        return BodyItems(
+            BodyStream(self.content, max_size, 'application/json'),
+            finalize or (lambda item: item))
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_items(self):
+        items = self._makeOne([b'[{"a": ', b'1}, 2', b', 3]'])
+        self.assertEqual(self._run(items.__anext__()), {'a': 1})
+
+        # items are parsed while body is received
+        self.assertEqual(self.content.chunks, [b', 3]'])
+        self.assertEqual(self._run(items.read()), [2, 3])
+
+    def test_finalize(self):
+        items = self._makeOne([b'[1, 2]'], lambda item: item * 10)
+        self.assertEqual(self._run(items.read()), [10, 20])
+
+    def test_empty(self):
+        self.assertEqual(self._run(self._makeOne([b'[]']).read()), [])
+
+    def test_invalid(self):
+        for chunks in ([b'{"a": 1}'], [b'[1, 2']):
+            items = self._makeOne(chunks)
+            self.assertRaises(
+                aiohttp.web.HTTPBadRequest, self._run, items.read())
+
+    def test_max_size(self):
+        items = self._makeOne([b'[1, ', b'2, 3]'], max_size=5)
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge, self._run, items.read())
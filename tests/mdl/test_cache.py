@@ -0,0 +1,225 @@
+import unittest
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def _makeOne(self, max_size=10):
+        from mdl.web.cache import LRUCache
+        return LRUCache(max_size)
+
+    def test_get_set(self):
+        cache = self._makeOne()
+        cache.set('a', b'123')
+        self.assertEqual(cache.get('a'), b'123')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.size, 3)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache.set('a', b'12')
+        self.assertEqual(cache.size, 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_evict_by_size(self):
+        cache = self._makeOne()
+        cache.set('a', b'1234')
+        cache.set('b', b'1234')
+        cache.get('a')
+        cache.set('c', b'1234')
+
+        self.assertEqual(cache.keys(), ['a', 'c'])
+        self.assertEqual(cache.size, 8)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_too_large(self):
+        cache = self._makeOne()
+        cache.set('a', b'1')
+        cache.set('b', b'x' * 11)
+        self.assertEqual(cache.keys(), ['a'])
+
+    def test_discard(self):
+        cache = self._makeOne()
+        cache.set(('r1', 1), b'1')
+        cache.set(('r1', 2), b'2')
+        cache.set(('r2', 1), b'3')
+
+        cache.discard(lambda key: key[0] == 'r1')
+        self.assertEqual(cache.keys(), [('r2', 1)])
+        self.assertEqual(cache.size, 1)
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    def test_params_key(self):
+        from mdl.web.cache import params_key
+
+        class Params(object):
+            def as_dict(self):
+                return {'id': 1, 'tags': ['a'], 'filter': {'b': 1, 'a': [2]}}
+
+        self.assertEqual(params_key(None), ())
+        key = params_key(Params())
+        self.assertEqual(
+            key, (('id', 1), ('tags', ('a',)),
+                  ('filter', (('a', (2,)), ('b', 1)))))
+        hash(key)
+
+
+class TTLCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+
+    def _makeOne(self, max_entries=2, ttl=10):
+        from mdl.web.cache import TTLCache
+        return TTLCache(max_entries, ttl, timer=lambda: self.now)
+
+    def test_ttl(self):
+        cache = self._makeOne()
+        cache.set('a', 1)
+        self.now = 9.0
+        self.assertEqual(cache.get('a'), 1)
+
+        self.now = 10.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(
+            (cache.hits, cache.misses, cache.expirations), (1, 1, 1))
+
+    def test_max_entries(self):
+        cache = self._makeOne()
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.keys(), ['a', 'c'])
+        self.assertEqual(cache.pop('c'), 3)
+        self.assertEqual(cache.evictions, 1)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    class Params(object):
+        __fields__ = ('id', 'HTTP_X_Token', 'tags')
+        __mapping__ = {'id': 'id', 'X-Token': 'HTTP_X_Token', 'tags': 'tags'}
+
+        def __init__(self, id, token, tags):
+            self.id = id
+            self.HTTP_X_Token = token
+            self.tags = tags
+
+    def _ctx(self, params, headers=None):
+        from types import SimpleNamespace
+        return SimpleNamespace(
+            params=params, request=SimpleNamespace(headers=headers or {}))
+
+    def test_from_spec(self):
+        from mdl.web.cache import ResponseCache
+
+        self.assertIsNone(ResponseCache.from_spec(None, self.Params))
+
+        cache = ResponseCache.from_spec(True, self.Params)
+        self.assertEqual(cache.fields, self.Params.__fields__)
+        self.assertEqual((cache.ttl, cache.max_size), (60, 1000))
+
+        cache = ResponseCache.from_spec(
+            {'ttl': 5, 'max-entries': 10,
+             'vary': {'params': ['X-Token'], 'headers': ['Accept']}},
+            self.Params)
+        self.assertEqual(cache.fields, ('HTTP_X_Token',))
+        self.assertEqual(cache.headers, ('Accept',))
+        self.assertEqual((cache.ttl, cache.max_size), (5, 10))
+
+    def test_key(self):
+        from mdl.web.cache import ResponseCache
+
+        cache = ResponseCache(('id', 'tags'), ('Accept',))
+        key = cache.key(self._ctx(
+            self.Params(1, 't', ['a']), {'Accept': 'text/plain'}))
+        self.assertEqual(key, (1, ('a',), 'text/plain'))
+        self.assertNotEqual(
+            key, cache.key(self._ctx(self.Params(1, 't', ['a']))))
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_slow_handler(self):
+        import asyncio
+        from mdl.web.cache import SingleFlight
+
+        calls = []
+
+        async def handler(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return 'result-%s' % value
+
+        flight = SingleFlight()
+
+        async def run():
+            # first caller starts call, others wait for its result
+            leader = self.loop.create_task(flight.do('key', handler, 0))
+            await asyncio.sleep(0)
+            return await asyncio.gather(
+                *[leader] +
+                [flight.do('key', handler, idx) for idx in range(1, 10)] +
+                [flight.do('other', handler, 'other')])
+
+        results = self.loop.run_until_complete(run())
+
+        self.assertEqual(calls, [0, 'other'])
+        self.assertEqual(results, ['result-0'] * 10 + ['result-other'])
+        self.assertEqual((flight.calls, flight.shared), (2, 9))
+        self.assertEqual(len(flight), 0)
+
+        # completed call is not reused
+        self.loop.run_until_complete(flight.do('key', handler, 'next'))
+        self.assertEqual(calls, [0, 'other', 'next'])
+
+    def test_error(self):
+        import asyncio
+        from mdl.web.cache import SingleFlight
+
+        async def handler():
+            await asyncio.sleep(0.01)
+            raise ValueError()
+
+        flight = SingleFlight()
+
+        async def run():
+            return await asyncio.gather(
+                flight.do('key', handler), flight.do('key', handler),
+                return_exceptions=True)
+
+        results = self.loop.run_until_complete(run())
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIsInstance(results[1], ValueError)
+
+    def test_cancelled_caller(self):
+        import asyncio
+        from mdl.web.cache import SingleFlight
+
+        calls = []
+
+        async def handler():
+            await asyncio.sleep(0.02)
+            calls.append(1)
+            return 'result'
+
+        flight = SingleFlight()
+
+        async def run():
+            first = asyncio.ensure_future(flight.do('key', handler))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(flight.do('key', handler))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(self.loop.run_until_complete(run()), 'result')
+        self.assertEqual(calls, [1])
@@ -0,0 +1,58 @@
+import unittest
+
+
+class EncoderTestCase(unittest.TestCase):
+
+    def test_default_encoders(self):
+        from mdl.web.codecs import get_encoder
+
+        self.assertEqual(
+            get_encoder(None, 'application/json')({'a': 1}, None),
+            b'{"a": 1}')
+        self.assertEqual(
+            get_encoder(None, 'application/x-ndjson')([1], 'utf-8'),
+            b'[1]\n')
+        self.assertEqual(get_encoder(None, 'text/plain')(1, None), b'1')
+        self.assertIsNone(get_encoder(None, 'application/unknown'))
+
+    def test_registry(self):
+        from zope.interface.registry import Components
+        from mdl.web.codecs import get_encoder
+        from mdl.web.interfaces import IBodyEncoder
+
+        def encode(obj, charset):
+            return b'encoded'
+
+        registry = Components()
+        registry.registerUtility(
+            encode, IBodyEncoder, name='application/json')
+        self.assertIs(get_encoder(registry, 'application/json'), encode)
+        self.assertIsNotNone(get_encoder(registry, 'text/plain'))
+
+
+class DecoderTestCase(unittest.TestCase):
+
+    def test_default_decoders(self):
+        from mdl.web.codecs import get_decoder
+
+        self.assertEqual(
+            get_decoder(None, 'application/json')(b'{"a": 1}', None),
+            {'a': 1})
+        self.assertEqual(
+            get_decoder(None, 'text/plain')(
+                'тест'.encode('cp1251'), 'cp1251'), 'тест')
+        self.assertIsNone(get_decoder(None, 'application/unknown'))
+
+    def test_registry(self):
+        from zope.interface.registry import Components
+        from mdl.web.codecs import decode_json, get_decoder
+        from mdl.web.interfaces import IBodyDecoder
+
+        def decode(data, charset):
+            return 'decoded'
+
+        registry = Components()
+        registry.registerUtility(
+            decode, IBodyDecoder, name='application/x-custom')
+        self.assertIs(get_decoder(registry, 'application/x-custom'), decode)
+        self.assertIs(get_decoder(registry, 'application/json'), decode_json)
@@ -0,0 +1,63 @@
+import unittest
+import zlib
+
+
+class CompressionTestCase(unittest.TestCase):
+
+    def test_parse_accept_encoding(self):
+        from mdl.web.compression import parse_accept_encoding
+
+        self.assertEqual(
+            parse_accept_encoding('gzip, Deflate;q=0.5, br;q=x, ,*;q=0'),
+            (('gzip', 1.0), ('deflate', 0.5), ('br', 0.0), ('*', 0.0)))
+
+    def test_negotiate(self):
+        from mdl.web.compression import negotiate
+        from mdl.web.response import ContentCoding
+
+        self.assertIsNone(negotiate(None))
+        self.assertIsNone(negotiate(''))
+        self.assertIsNone(negotiate('br'))
+        self.assertIsNone(negotiate('gzip;q=0, deflate;q=0'))
+        self.assertIs(negotiate('deflate, gzip'), ContentCoding.gzip)
+        self.assertIs(negotiate('gzip;q=0.5, deflate'), ContentCoding.deflate)
+        self.assertIs(negotiate('*'), ContentCoding.gzip)
+        self.assertIs(negotiate('gzip;q=0, *'), ContentCoding.deflate)
+        self.assertIs(
+            negotiate('gzip, deflate', (ContentCoding.deflate,)),
+            ContentCoding.deflate)
+
+    def test_from_spec(self):
+        from mdl.web.compression import Compression
+        from mdl.web.response import ContentCoding
+
+        self.assertIsNone(Compression.from_spec(None))
+        self.assertIsNone(Compression.from_spec(False))
+        self.assertEqual(Compression.from_spec(True).level, 6)
+
+        compression = Compression.from_spec(
+            {'coding': 'deflate', 'level': 1,
+             'min-size': 10, 'offload-size': 100})
+        self.assertEqual(compression.codings, (ContentCoding.deflate,))
+        self.assertEqual(compression.level, 1)
+        self.assertEqual(compression.min_size, 10)
+        self.assertEqual(compression.offload_size, 100)
+
+        compression = Compression.from_spec(
+            {'coding': ['identity', 'gzip']})
+        self.assertEqual(compression.codings, (ContentCoding.gzip,))
+
+    def test_compress(self):
+        from mdl.web.compression import Compression
+        from mdl.web.response import ContentCoding
+
+        data = b'data' * 100
+        compression = Compression()
+        self.assertEqual(
+            zlib.decompress(
+                compression.compress(ContentCoding.gzip, data),
+                16 + zlib.MAX_WBITS), data)
+        self.assertEqual(
+            zlib.decompress(
+                compression.compress(ContentCoding.deflate, data),
+                -zlib.MAX_WBITS), data)
@@ -0,0 +1,95 @@
+import unittest
+
+
+def make_op(params, operation_id='op'):
+    """ Operation with `(name, location)` parameters """
+    from types import SimpleNamespace
+
+    return SimpleNamespace(
+        operation_id=operation_id,
+        params={name: SimpleNamespace(name=name, location=location)
+                for name, location in params})
+
+
+class AttributeNameTestCase(unittest.TestCase):
+
+    def _callFUT(self, name):
+        from mdl.web.context import attribute_name
+        return attribute_name(name)
+
+    def test_identifier(self):
+        self.assertEqual(self._callFUT('name'), 'name')
+        self.assertEqual(self._callFUT('X-Request-Id'), 'X_Request_Id')
+
+    def test_digit(self):
+        self.assertEqual(self._callFUT('1abc'), '_1abc')
+        self.assertTrue(self._callFUT('1abc').isidentifier())
+
+    def test_keyword(self):
+        self.assertEqual(self._callFUT('class'), 'class_')
+
+
+class GenerateClassTestCase(unittest.TestCase):
+
+    def _makeOne(self, params, lazy=False):
+        from mdl.web.context import Params
+        return Params.generate_class(make_op(params), lazy=lazy)
+
+    def test_fields(self):
+        cls = self._makeOne([
+            ('body', 'body'), ('1st', 'query'),
+            ('class', 'query'), ('X-Token', 'header')])
+        self.assertEqual(cls.__fields__[-1], 'body')
+        self.assertEqual(
+            sorted(cls.__fields__[:-1]), ['HTTP_X_Token', '_1st', 'class_'])
+        self.assertEqual(cls.__mapping__['1st'], '_1st')
+
+        params = cls(*range(4))
+        self.assertEqual(params.as_dict(), dict(zip(cls.__fields__, range(4))))
+        self.assertIn('%s=0' % cls.__fields__[0], repr(params))
+
+    def test_same_attribute(self):
+        self.assertRaises(ValueError, self._makeOne, [
+            ('a-b', 'query'), ('a_b', 'query')])
+
+    def test_lazy_slot_conflict(self):
+        params = [('x', 'query'), ('_x', 'query')]
+        self.assertRaises(ValueError, self._makeOne, params, True)
+        self.assertEqual(len(self._makeOne(params).__fields__), 2)
+
+
+class LazyParamsTestCase(unittest.TestCase):
+
+    def _makeOne(self, resolvers):
+        from mdl.web.context import LazyParams, Params
+
+        cls = Params.generate_class(
+            make_op([('a', 'query'), ('b-c', 'query')]), lazy=True)
+        self.assertTrue(issubclass(cls, LazyParams))
+        cls.__resolvers__ = resolvers
+        return cls('request')
+
+    def test_resolve_once(self):
+        calls = []
+
+        def resolve(params):
+            calls.append(params.__request__)
+            return 'value'
+
+        params = self._makeOne({'a': resolve, 'b_c': lambda params: 2})
+        self.assertEqual(params.a, 'value')
+        self.assertEqual(params.a, 'value')
+        self.assertEqual(calls, ['request'])
+        self.assertEqual(params.as_dict(), {'a': 'value', 'b_c': 2})
+
+    def test_validate_all(self):
+        def invalid(params):
+            raise ValueError('invalid')
+
+        params = self._makeOne({'a': lambda params: 1, 'b_c': invalid})
+        self.assertRaises(ValueError, params.validate_all)
+
+    def test_read_only(self):
+        params = self._makeOne({'a': lambda params: 1})
+        with self.assertRaises(AttributeError):
+            params.a = 2
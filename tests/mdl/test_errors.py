@@ -0,0 +1,120 @@
+import unittest
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class BaseError(Exception):
+    pass
+
+
+class ChildError(BaseError):
+    pass
+
+
+class OtherError(Exception):
+    pass
+
+
+def handler(ctx, exc):
+    return 'handled'
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ErrorsTestCase(unittest.TestCase):
+
+    def _makeOne(self, errors, parent=None):
+        from mdl._aiohttp.directives import Error, Errors
+        return Errors(
+            [Error(exc, handler) for exc, handler in errors], parent)
+
+    def test_exact(self):
+        errors = self._makeOne([(BaseError, handler)])
+        self.assertIs(errors.lookup(BaseError).exc, BaseError)
+
+    def test_mro(self):
+        errors = self._makeOne([(BaseError, handler), (Exception, 500)])
+        self.assertIs(errors.lookup(ChildError).exc, BaseError)
+        self.assertIs(errors.lookup(OtherError).exc, Exception)
+
+    def test_most_specific(self):
+        errors = self._makeOne([(BaseError, 500), (ChildError, handler)])
+        self.assertIs(errors.lookup(ChildError).exc, ChildError)
+        self.assertIs(errors.lookup(BaseError).exc, BaseError)
+
+    def test_route_over_app(self):
+        app = self._makeOne([(BaseError, 500), (OtherError, 502)])
+        route = self._makeOne([(ChildError, handler)], app)
+
+        self.assertIs(route.lookup(ChildError).handler, handler)
+        self.assertEqual(route.lookup(BaseError).response.status, 500)
+        self.assertEqual(route.lookup(OtherError).response.status, 502)
+
+    def test_route_generic_handler_wins(self):
+        app = self._makeOne([(ChildError, 500)])
+        route = self._makeOne([(Exception, handler)], app)
+        self.assertIs(route.lookup(ChildError).exc, Exception)
+
+    def test_not_found_cached(self):
+        errors = self._makeOne([(BaseError, handler)])
+        self.assertIsNone(errors.lookup(OtherError))
+        self.assertIn(OtherError, errors._cache)
+
+        errors._handlers[OtherError] = object()
+        self.assertIsNone(errors.lookup(OtherError))
+
+    def test_process(self):
+        errors = self._makeOne([(BaseError, handler), (OtherError, 500)])
+        self.assertEqual(errors.process(None, ChildError()), 'handled')
+        self.assertRaises(RuntimeError, errors.process, None, OtherError())
+        self.assertRaises(RuntimeError, errors.process, None, ValueError())
+
+    def test_coroutine_handler(self):
+        from mdl._aiohttp.directives import Error
+
+        async def coro(ctx, exc):
+            pass
+
+        self.assertTrue(Error(BaseError, coro).is_coroutine)
+        self.assertFalse(Error(BaseError, handler).is_coroutine)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ErrorResponseTestCase(unittest.TestCase):
+
+    def _makeOne(self, spec):
+        from mdl._aiohttp.response import ErrorResponse
+        return ErrorResponse.from_spec(spec)
+
+    def _content_type(self, resp):
+        [value] = resp.headers.values()
+        return value
+
+    def test_status(self):
+        resp = self._makeOne(404)
+        self.assertEqual(resp.status, 404)
+        self.assertEqual(resp.body, b'404: Not Found')
+        self.assertEqual(self._content_type(resp), 'text/plain; charset=utf-8')
+
+    def test_default_status(self):
+        self.assertEqual(self._makeOne({}).status, 500)
+
+    def test_text_body(self):
+        resp = self._makeOne(
+            {'status': '409', 'body': 'conflict', 'content-type': 'text/x'})
+        self.assertEqual(resp.status, 409)
+        self.assertEqual(resp.body, b'conflict')
+        self.assertEqual(self._content_type(resp), 'text/x; charset=utf-8')
+
+    def test_json_body(self):
+        resp = self._makeOne({'status': 400, 'body': {'error': 'invalid'}})
+        self.assertEqual(resp.body, b'{"error": "invalid"}')
+        self.assertEqual(
+            self._content_type(resp), 'application/json; charset=utf-8')
+
+    def test_bytes_body(self):
+        resp = self._makeOne({'status': 500, 'body': b'\x00'})
+        self.assertEqual(resp.body, b'\x00')
+        self.assertEqual(self._content_type(resp), 'application/octet-stream')
@@ -0,0 +1,142 @@
+import json
+import unittest
+
+
+class JSONArrayParserTestCase(unittest.TestCase):
+
+    def _parse(self, chunks):
+        from mdl.web.jsonstream import JSONArrayParser
+
+        parser = JSONArrayParser()
+        items = []
+        for chunk in chunks:
+            items.extend(parser.feed(chunk))
+        items.extend(parser.close())
+        return items
+
+    def _split(self, data, size):
+        return [data[i:i+size] for i in range(0, len(data), size)]
+
+    def test_empty(self):
+        self.assertEqual(self._parse([b'[]']), [])
+        self.assertEqual(self._parse([b' [ ', b' ] ']), [])
+
+    def test_items(self):
+        value = [1, -20.5, 'str', {'a': [1, {'b': None}]},
+                 [], True, False, None, 'quoted ] , [ "',
+                 'escaped \\" \\\\', {'s': '}\\\\'},
+                 'фыв', 123456789, 1.5e-10]
+        data = json.dumps(value).encode('utf-8')
+
+        for size in (1, 2, 3, 7, len(data)):
+            self.assertEqual(self._parse(self._split(data, size)), value)
+
+    def test_incremental(self):
+        from mdl.web.jsonstream import JSONArrayParser
+
+        parser = JSONArrayParser()
+        self.assertEqual(parser.feed(b'[{"a": 1}, 12'), [{'a': 1}])
+        self.assertEqual(parser.feed(b'3, "b'), [123])
+        self.assertEqual(parser.feed(b'"]'), ['b'])
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.close(), [])
+
+    def test_large_item(self):
+        from mdl.web.jsonstream import JSONArrayParser
+
+        item = {'data': ['x' * 100] * 1000, 'text': '"]}' * 1000}
+        data = json.dumps([item, 1]).encode('utf-8')
+
+        parser = JSONArrayParser()
+        decode = parser._decode
+        calls = []
+
+        def counted(buf, pos):
+            calls.append(pos)
+            return decode(buf, pos)
+
+        # incomplete item is scanned, it is decoded once
+        parser._decode = counted
+        items = []
+        for chunk in self._split(data, 100):
+            items.extend(parser.feed(chunk))
+        items.extend(parser.close())
+
+        self.assertEqual(items, [item, 1])
+        self.assertEqual(len(calls), 2)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, self._parse, [b'{}'])
+        self.assertRaises(ValueError, self._parse, [b'[1 2]'])
+        self.assertRaises(ValueError, self._parse, [b'[1,'])
+        self.assertRaises(ValueError, self._parse, [b'[1] 2'])
+        self.assertRaises(ValueError, self._parse, [b'[1, {"a": ]'])
+        self.assertRaises(ValueError, self._parse, [b'[{"a": 1', b'}'])
+        self.assertRaises(ValueError, self._parse, [b'["a', b'b'])
+
+
+class SerializerTestCase(unittest.TestCase):
+
+    def _serialize(self, serializer, items):
+        buf = [serializer.head]
+        size = len(serializer.head)
+        for index, item in enumerate(items):
+            size += serializer.write(buf, item, index)
+        buf.append(serializer.tail)
+        data = b''.join(buf)
+        self.assertEqual(size + len(serializer.tail), len(data))
+        return data
+
+    def test_json_array(self):
+        from mdl.web.jsonstream import JSONArraySerializer
+
+        items = [{'a': 1}, 'b', None, [1, 2]]
+        data = self._serialize(JSONArraySerializer(), items)
+        self.assertEqual(json.loads(data.decode('utf-8')), items)
+        self.assertEqual(self._serialize(JSONArraySerializer(), []), b'[]')
+
+    def test_json_array_encoded(self):
+        from mdl.web.jsonstream import JSONArraySerializer
+
+        data = self._serialize(JSONArraySerializer(), [b'{"a":1}', 2])
+        self.assertEqual(data, b'[{"a":1},2]')
+
+    def test_ndjson(self):
+        from mdl.web.jsonstream import NDJSONSerializer
+
+        data = self._serialize(NDJSONSerializer(), [{'a': 1}, 'b'])
+        self.assertEqual(data, b'{"a": 1}\n"b"\n')
+
+    def test_csv(self):
+        from mdl.web.jsonstream import CSVSerializer
+
+        data = self._serialize(
+            CSVSerializer(), [{'a': 1, 'b': 'x,y'}, {'a': 2}])
+        self.assertEqual(data, b'a,b\r\n1,"x,y"\r\n2,\r\n')
+
+        data = self._serialize(CSVSerializer(['a', 'b']), [(1, 2)])
+        self.assertEqual(data, b'a,b\r\n1,2\r\n')
+
+    def test_items(self):
+        from mdl.web.jsonstream import ItemSerializer
+
+        data = self._serialize(
+            ItemSerializer(lambda obj, charset: b'<obj>'), [b'a', 'b', 1])
+        self.assertEqual(data, b'ab<obj>')
+        self.assertRaises(
+            TypeError, self._serialize, ItemSerializer(), [1])
+
+    def test_get_serializer(self):
+        from mdl.web import jsonstream
+
+        self.assertIsInstance(
+            jsonstream.get_serializer('application/json'),
+            jsonstream.JSONArraySerializer)
+        self.assertIsInstance(
+            jsonstream.get_serializer('application/x-ndjson'),
+            jsonstream.NDJSONSerializer)
+        self.assertIsInstance(
+            jsonstream.get_serializer('text/csv'), jsonstream.CSVSerializer)
+        self.assertIs(
+            jsonstream.get_serializer('text/plain').__class__,
+            jsonstream.ItemSerializer)
@@ -0,0 +1,401 @@
+import asyncio
+import json
+import unittest
+
+from jsonschema import ValidationError
+from multidict import CIMultiDict, MultiDict
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'test', 'version': '1'},
+    'paths': {
+        '/items/{id}': {
+            'get': {
+                'operationId': 'item',
+                'parameters': [
+                    {'name': 'id', 'in': 'path', 'type': 'integer',
+                     'required': True},
+                    {'name': 'q', 'in': 'query', 'type': 'string',
+                     'required': True},
+                    {'name': 'limit', 'in': 'query', 'type': 'integer',
+                     'default': 10},
+                    {'name': 'tags', 'in': 'query', 'type': 'array',
+                     'items': {'type': 'string'},
+                     'collectionFormat': 'csv'},
+                    {'name': 'X-Token', 'in': 'header', 'type': 'string'},
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/items': {
+            'post': {
+                'operationId': 'create',
+                'consumes': ['application/json', 'text/plain'],
+                'parameters': [
+                    {'name': 'body', 'in': 'body', 'required': True,
+                     'schema': {
+                         'type': 'object',
+                         'required': ['name'],
+                         'properties': {'name': {'type': 'string'}},
+                     }},
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/items/upload': {
+            'post': {
+                'operationId': 'upload',
+                'consumes': ['text/plain'],
+                'parameters': [
+                    {'name': 'body', 'in': 'body', 'required': True,
+                     'schema': {'type': 'string', 'format': 'stream'}},
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/items/bulk': {
+            'post': {
+                'operationId': 'bulk',
+                'parameters': [
+                    {'name': 'body', 'in': 'body', 'required': True,
+                     'schema': {'type': 'array', 'format': 'stream',
+                                'items': {'type': 'integer'}}},
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+    },
+}
+
+
+def get_op(name, spec=SPEC):
+    from bravado_core.spec import Spec
+
+    spec = Spec.from_dict(spec, config={'use_models': False})
+    return getattr(spec.resources['items'], name)
+
+
+class Content(object):
+    """ Request payload received in chunks """
+
+    def __init__(self, chunks=()):
+        self.chunks = list(chunks)
+
+    async def readany(self):
+        if self.chunks:
+            return self.chunks.pop(0)
+        return b''
+
+
+class Request(object):
+    """ Request with attributes used by unmarshal plan and by
+    bravado_core `IncomingRequest` """
+
+    def __init__(self, match_info=None, query=None, headers=None,
+                 body=None, content_length=None, chunked=False):
+        self.match_info = self.path = match_info or {}
+        self.query = MultiDict(query or {})
+        self.headers = CIMultiDict(headers or {})
+        self.content_type = self.headers.get(
+            'Content-Type', 'application/octet-stream').split(';')[0]
+        self.charset = None
+        self.body = body
+        self.content_length = content_length
+        if body is not None:
+            if chunked:
+                chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+            else:
+                self.content_length = len(body)
+                chunks = [body]
+            self.content = Content(chunks)
+        else:
+            self.content = Content()
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class UnmarshalPlanTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _makeOne(self, name):
+        from mdl._aiohttp.params import compile_plan
+        from mdl.web.context import Params
+
+        cls = Params.generate_class(get_op(name))
+        compile_plan(cls)
+        return cls
+
+    def _unmarshal(self, cls, request):
+        from mdl._aiohttp.params import unmarshal_request
+        return self.loop.run_until_complete(unmarshal_request(cls, request))
+
+    def _assertSameAsBravado(self, cls, request):
+        from bravado_core.param import unmarshal_param
+
+        params = self._unmarshal(cls, request)
+        for name, param in cls.__oper__.params.items():
+            self.assertEqual(
+                getattr(params, cls.__mapping__[name]),
+                unmarshal_param(param, request), name)
+        return params
+
+    def test_compiled_once(self):
+        from unittest import mock
+
+        cls = self._makeOne('item')
+        plan = cls.__plan__
+        self.assertEqual([name for name, step in plan.params],
+                         list(cls.__oper__.params))
+        self.assertIsNone(plan.body)
+
+        # request does not compile steps again
+        with mock.patch('mdl._aiohttp.params.compile_param',
+                        side_effect=AssertionError):
+            for idx in range(2):
+                params = self._unmarshal(
+                    cls, Request({'id': str(idx)}, {'q': 'a'}))
+                self.assertEqual(params.id, idx)
+        self.assertIs(cls.__plan__, plan)
+
+    def test_locations(self):
+        params = self._assertSameAsBravado(self._makeOne('item'), Request(
+            {'id': '5'}, {'q': 'text', 'limit': '3', 'tags': 'a,b'},
+            {'X-Token': 'secret'}))
+        self.assertEqual(params.id, 5)
+        self.assertEqual(params.limit, 3)
+        self.assertEqual(params.tags, ['a', 'b'])
+        self.assertEqual(params.HTTP_X_Token, 'secret')
+
+    def test_defaults(self):
+        params = self._assertSameAsBravado(
+            self._makeOne('item'), Request({'id': '5'}, {'q': 'text'}))
+        self.assertEqual(params.limit, 10)
+        self.assertIsNone(params.tags)
+        self.assertIsNone(params.HTTP_X_Token)
+
+    def test_invalid(self):
+        from bravado_core.param import unmarshal_param
+
+        cls = self._makeOne('item')
+        invalid = [
+            (Request({'id': 'x'}, {'q': 'a'}), 'id'),
+            (Request({'id': '5'}, {'q': 'a', 'limit': 'ten'}), 'limit'),
+        ]
+        for request, name in invalid:
+            self.assertRaises(ValidationError, self._unmarshal, cls, request)
+            self.assertRaises(
+                ValidationError, unmarshal_param,
+                cls.__oper__.params[name], request)
+
+    def test_missing_required(self):
+        from bravado_core.param import unmarshal_param
+
+        cls = self._makeOne('item')
+        request = Request({'id': '5'})
+        self.assertRaises(ValidationError, self._unmarshal, cls, request)
+        self.assertRaises(
+            ValidationError, unmarshal_param,
+            cls.__oper__.params['q'], request)
+
+    def test_body(self):
+        cls = self._makeOne('create')
+        self.assertEqual(cls.__plan__.body[0], 'body')
+
+        params = self._assertSameAsBravado(cls, Request(
+            headers={'Content-Type': 'application/json'},
+            body=b'{"name": "test"}'))
+        self.assertEqual(params.body, {'name': 'test'})
+
+        self.assertRaises(ValidationError, self._unmarshal, cls, Request(
+            headers={'Content-Type': 'application/json'}, body=b'{}'))
+        self.assertRaises(ValidationError, self._unmarshal, cls, Request(
+            headers={'Content-Type': 'application/json'}))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ReadBodyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _callFUT(self, request, max_size):
+        from mdl._aiohttp.params import read_body
+        return self.loop.run_until_complete(read_body(request, max_size))
+
+    def test_content_length(self):
+        self.assertEqual(self._callFUT(Request(body=b'0123456789'), 10),
+                         b'0123456789')
+
+    def test_chunked(self):
+        self.assertEqual(
+            self._callFUT(Request(body=b'0123456789', chunked=True), 10),
+            b'0123456789')
+
+    def test_content_length_too_large(self):
+        request = Request(body=b'0123456789')
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge,
+            self._callFUT, request, 9)
+
+        # body is not read
+        self.assertEqual(request.content.chunks, [b'0123456789'])
+
+    def test_chunked_too_large(self):
+        request = Request(body=b'0123456789', chunked=True)
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge,
+            self._callFUT, request, 8)
+
+        # reading stops at chunk over limit
+        self.assertEqual(request.content.chunks, [b'9'])
+
+    def test_incomplete(self):
+        self.assertRaises(
+            aiohttp.web.HTTPBadRequest, self._callFUT,
+            Request(body=b'012', content_length=10, chunked=True), 10)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ContentTypeTestCase(unittest.TestCase):
+
+    def _makeOne(self, registry=None, consumes=None):
+        from mdl._aiohttp.params import _content_type
+
+        param = get_op('create').params['body']
+        if consumes is not None:
+            param.op.consumes = consumes
+        return _content_type(param, registry)
+
+    def test_consumes(self):
+        from mdl.web.codecs import decode_json, decode_text
+
+        content_type = self._makeOne()
+        self.assertEqual(
+            content_type(Request(headers={'Content-Type': 'text/plain'})),
+            ('text/plain', decode_text))
+        self.assertEqual(
+            content_type(Request(headers={
+                'Content-Type': 'application/json; charset=utf-8'})),
+            ('application/json', decode_json))
+
+        # first consumed media type is default
+        self.assertEqual(content_type(Request()),
+                         ('application/json', decode_json))
+
+    def test_unsupported(self):
+        content_type = self._makeOne()
+        self.assertRaises(
+            aiohttp.web.HTTPUnsupportedMediaType, content_type,
+            Request(headers={'Content-Type': 'application/xml'}))
+
+    def test_any(self):
+        from mdl.web.codecs import decode_text
+
+        content_type = self._makeOne(consumes=['*/*'])
+        self.assertEqual(
+            content_type(Request(headers={'Content-Type': 'text/plain'})),
+            ('text/plain', decode_text))
+        self.assertEqual(
+            content_type(Request(headers={'Content-Type': 'image/png'})),
+            ('image/png', None))
+
+    def test_registry(self):
+        from zope.interface.registry import Components
+        from mdl.web.interfaces import IBodyDecoder
+
+        def decode(data, charset):
+            pass
+
+        registry = Components()
+        registry.registerUtility(decode, IBodyDecoder, name='text/plain')
+        content_type = self._makeOne(registry)
+        self.assertEqual(
+            content_type(Request(headers={'Content-Type': 'text/plain'})),
+            ('text/plain', decode))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class CompileStreamBodyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _read(self, name, request, max_body_size=1024, spool_body=False):
+        from mdl._aiohttp.params import compile_body
+
+        read, decode = compile_body(
+            get_op(name).params['body'], None, max_body_size, spool_body)
+        return decode(self.loop.run_until_complete(read(request)))
+
+    def test_stream(self):
+        from mdl._aiohttp.body import BodyStream
+
+        request = Request(
+            headers={'Content-Type': 'text/plain'}, body=b'0123456789',
+            chunked=True)
+        stream = self._read('upload', request)
+        self.assertIsInstance(stream, BodyStream)
+        self.assertEqual(stream.content_type, 'text/plain')
+
+        # body is read by handler
+        self.assertEqual(len(request.content.chunks), 4)
+        self.assertEqual(
+            self.loop.run_until_complete(stream.read()), b'0123456789')
+
+    def test_spool(self):
+        import mmap
+
+        data = self._read('upload', Request(
+            headers={'Content-Type': 'text/plain'}, body=b'0123456789',
+            chunked=True), spool_body=True)
+        self.assertIsInstance(data, mmap.mmap)
+        self.assertEqual(data[:], b'0123456789')
+        data.close()
+
+    def test_max_size(self):
+        request = Request(
+            headers={'Content-Type': 'text/plain'}, body=b'0123456789')
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge,
+            self._read, 'upload', request, 9)
+
+        stream = self._read('upload', Request(
+            headers={'Content-Type': 'text/plain'}, body=b'0123456789',
+            chunked=True), 9)
+        self.assertRaises(
+            aiohttp.web.HTTPRequestEntityTooLarge,
+            self.loop.run_until_complete, stream.read())
+
+    def test_unsupported_media_type(self):
+        self.assertRaises(
+            aiohttp.web.HTTPUnsupportedMediaType, self._read, 'upload',
+            Request(headers={'Content-Type': 'application/json'}))
+
+    def test_items(self):
+        from mdl._aiohttp.body import BodyItems
+        from mdl._aiohttp.params import RequestValidationError
+
+        items = self._read('bulk', Request(
+            headers={'Content-Type': 'application/json'}, body=b'[1, 2, 3]',
+            chunked=True))
+        self.assertIsInstance(items, BodyItems)
+        self.assertEqual(
+            self.loop.run_until_complete(items.read()), [1, 2, 3])
+
+        items = self._read('bulk', Request(
+            headers={'Content-Type': 'application/json'}, body=b'[1, "a"]'))
+        self.assertRaises(
+            RequestValidationError,
+            self.loop.run_until_complete, items.read())
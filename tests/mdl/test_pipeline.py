@@ -0,0 +1,196 @@
+import asyncio
+import unittest
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _run(self, itransform, transforms, otransform, ctx):
+        from mdl.web.pipeline import compile_pipeline
+        pipeline = compile_pipeline(itransform, transforms, otransform)
+        return self.loop.run_until_complete(pipeline(ctx))
+
+    def test_handler(self):
+        async def handler(ctx):
+            return ctx + 1
+
+        self.assertEqual(self._run((), (handler,), (), 1), 2)
+
+    def test_required_handler(self):
+        from mdl.web.pipeline import compile_pipeline
+        self.assertRaises(ValueError, compile_pipeline, (), (), ())
+
+    def test_order(self):
+        calls = []
+
+        def itransform(ctx):
+            calls.append('in')
+
+        async def handler(ctx):
+            calls.append('handler')
+            return 'body'
+
+        def transform(ctx):
+            calls.append('transform')
+
+        async def otransform(ctx, body):
+            calls.append('out')
+            return body + '-o'
+
+        self.assertEqual(
+            self._run((itransform,), (transform, handler), (otransform,), 1),
+            'body-o')
+        self.assertEqual(calls, ['in', 'transform', 'handler', 'out'])
+
+    def test_route_transform_result(self):
+        calls = []
+
+        def itransform(ctx):
+            calls.append('in')
+
+        def transform1(ctx):
+            calls.append('t1')
+            return 'cached'
+
+        def transform2(ctx):
+            calls.append('t2')
+
+        async def handler(ctx):
+            calls.append('handler')
+
+        self.assertEqual(
+            self._run((itransform,), (transform1, transform2, handler),
+                      (), 1),
+            'cached')
+        self.assertEqual(calls, ['in', 't1'])
+
+    def test_in_transform_result(self):
+        calls = []
+
+        async def itransform1(ctx):
+            return 'denied'
+
+        def itransform2(ctx):
+            calls.append('in2')
+
+        async def handler(ctx):
+            calls.append('handler')
+
+        def otransform(ctx, body):
+            return body.upper()
+
+        self.assertEqual(
+            self._run((itransform1, itransform2), (handler,),
+                      (otransform,), 1),
+            'DENIED')
+        self.assertEqual(calls, [])
+
+    def test_prepare(self):
+        from mdl.web.pipeline import compile_pipeline
+
+        calls = []
+
+        def itransform(ctx):
+            calls.append('in')
+            if ctx == 'denied':
+                return ctx
+
+        async def prepare(ctx):
+            calls.append('prepare')
+            if ctx == 'cached':
+                return 'cached body'
+
+        async def handler(ctx):
+            calls.append('handler')
+            return ctx
+
+        def otransform(ctx, body):
+            calls.append('out')
+            return body.upper()
+
+        pipeline = compile_pipeline(
+            (itransform,), (handler,), (otransform,), prepare)
+        run = self.loop.run_until_complete
+
+        # prepared body is complete, out transforms are not called
+        self.assertEqual(run(pipeline('cached')), 'cached body')
+        self.assertEqual(calls, ['in', 'prepare'])
+
+        del calls[:]
+        self.assertEqual(run(pipeline('denied')), 'DENIED')
+        self.assertEqual(calls, ['in', 'out'])
+
+        del calls[:]
+        self.assertEqual(run(pipeline('body')), 'BODY')
+        self.assertEqual(calls, ['in', 'prepare', 'handler', 'out'])
+
+    def test_callable_object(self):
+        class Handler(object):
+            async def __call__(self, ctx):
+                return ctx * 2
+
+        self.assertEqual(self._run((), (Handler(),), (), 2), 4)
+
+    def test_partial(self):
+        from functools import partial
+
+        async def handler(factor, ctx):
+            return ctx * factor
+
+        def transform(calls, ctx):
+            calls.append(ctx)
+
+        calls = []
+        self.assertEqual(
+            self._run((), (partial(transform, calls), partial(handler, 3)),
+                      (), 2), 6)
+        self.assertEqual(calls, [2])
+
+    def test_decorated(self):
+        from functools import wraps
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(ctx):
+                return func(ctx + 1)
+            return wrapper
+
+        @decorator
+        async def handler(ctx):
+            return ctx * 2
+
+        self.assertEqual(self._run((), (handler,), (), 1), 4)
+
+    def test_unclassified_callable(self):
+        async def double(ctx):
+            return ctx * 2
+
+        class Handler(object):
+            def __call__(self, ctx):
+                return double(ctx)
+
+        class Transform(object):
+            def __call__(self, ctx):
+                return None
+
+        self.assertEqual(
+            self._run((), (Transform(), Handler()), (), 2), 4)
+
+    def test_is_coroutine(self):
+        from functools import partial
+        from mdl.web.pipeline import is_coroutine, is_function
+
+        async def handler(ctx):
+            pass
+
+        def func(ctx):
+            pass
+
+        self.assertTrue(is_coroutine(partial(handler)))
+        self.assertFalse(is_coroutine(func))
+        self.assertTrue(is_function(partial(func)))
+        self.assertFalse(is_function(partial(handler)))
+        self.assertFalse(is_function(object()))
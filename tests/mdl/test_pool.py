@@ -0,0 +1,101 @@
+import unittest
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class PoolTestCase(unittest.TestCase):
+
+    def _makeOne(self, size=2):
+        from mdl.web.context import WebContext
+        from mdl.web.pool import Pool
+        return Pool(WebContext, size)
+
+    def test_acquire(self):
+        pool = self._makeOne()
+        ctx = pool.acquire('op', 'request', 'params', keep_alive=True)
+        self.assertEqual(ctx.op, 'op')
+        self.assertEqual(ctx.request, 'request')
+        self.assertTrue(ctx.keep_alive)
+        self.assertEqual(len(pool), 0)
+
+    def test_reuse(self):
+        pool = self._makeOne()
+        ctx = pool.acquire('op', 'request', 'params')
+        ctx.user = 'user'
+        ctx.response.set_status(404)
+
+        calls = []
+        ctx.register_teardown_callback(calls.append)
+
+        pool.release(ctx)
+        self.assertEqual(calls, [None])
+        self.assertEqual(len(pool), 1)
+        self.assertIsNone(ctx.request)
+
+        ctx2 = pool.acquire('op2', 'request2', 'params2')
+        self.assertIs(ctx, ctx2)
+        self.assertEqual(ctx2.op, 'op2')
+        self.assertFalse(hasattr(ctx2, 'user'))
+        self.assertEqual(ctx2.response.status, 200)
+
+    def test_markers(self):
+        from mdl.interface import Interface
+
+        class IMarker(Interface):
+            pass
+
+        pool = self._makeOne()
+        ctx = pool.acquire('op', 'request', 'params', markers=(IMarker,))
+        self.assertTrue(IMarker.providedBy(ctx))
+
+        pool.release(ctx)
+        ctx = pool.acquire('op', 'request', 'params')
+        self.assertFalse(IMarker.providedBy(ctx))
+
+    def test_size(self):
+        pool = self._makeOne(1)
+        pool.release(pool.acquire('op', 'request', 'params'))
+        pool.release(pool.acquire('op', 'request', 'params'))
+        pool.release(self._makeOne().acquire('op', 'request', 'params'))
+        self.assertEqual(len(pool), 1)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class RendererPoolTestCase(unittest.TestCase):
+
+    def _makeOne(self):
+        from types import SimpleNamespace
+        from mdl.web.context import WebContext
+        from mdl.web.pool import Pool
+        from mdl._aiohttp.response import ResponseRenderer
+
+        pool = Pool(ResponseRenderer, 2)
+        ctx = WebContext('op', 'request', None, keep_alive=True)
+        renderer = pool.acquire(ctx, b'body')
+        renderer.resp_impl = SimpleNamespace(
+            body_length=4, output_length=120)
+        return pool, renderer
+
+    def test_lengths_after_release(self):
+        pool, renderer = self._makeOne()
+        renderer.keep_alive = True
+        pool.release(renderer)
+
+        # server writes access log after renderer is released
+        self.assertIsNone(renderer.resp_impl)
+        self.assertEqual(renderer.body_length, 4)
+        self.assertEqual(renderer.output_length, 120)
+        self.assertEqual(renderer.status, 200)
+        self.assertTrue(renderer.keep_alive)
+
+    def test_lengths_reset_on_reuse(self):
+        from mdl.web.context import WebContext
+
+        pool, renderer = self._makeOne()
+        pool.release(renderer)
+        ctx = WebContext('op', 'request', None)
+        self.assertIs(pool.acquire(ctx, b''), renderer)
+        self.assertEqual(renderer.body_length, 0)
@@ -0,0 +1,148 @@
+import unittest
+
+from multidict import CIMultiDict
+
+
+class ResponseTestCase(unittest.TestCase):
+
+    def test_lazy_headers(self):
+        from mdl.web.response import Response
+
+        response = Response()
+        self.assertIsNone(response._headers)
+        self.assertIsNone(response._cookies)
+        self.assertIsNone(response.content_type)
+
+        response.content_type = 'text/plain'
+        response.charset = 'utf-8'
+        self.assertEqual(
+            response.headers['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.reason, 'OK')
+
+        response.cookies['name'] = 'value'
+        self.assertEqual(response.cookies['name'].value, 'value')
+
+    def test_template(self):
+        from mdl.web.response import HeaderTemplate, Response
+
+        template = HeaderTemplate(
+            'application/json', [('Server', 'mdl'), ('X-Static', '1')])
+        self.assertEqual(
+            template.binary['Content-Type'], 'application/json')
+        self.assertEqual(
+            template.text['Content-Type'], 'application/json; charset=utf-8')
+        self.assertNotIn('Content-Type', HeaderTemplate(None).binary)
+
+        response = Response(template)
+        self.assertIsNone(response._headers)
+        self.assertEqual(response.content_type, 'application/json')
+
+        response.headers['X-Static'] = '2'
+        self.assertEqual(response.headers['Server'], 'mdl')
+        self.assertEqual(template.binary['X-Static'], '1')
+
+    def test_etag(self):
+        from mdl.web.response import Response
+
+        response = Response()
+        self.assertIsNone(response.etag)
+
+        response.etag = 'abc'
+        self.assertEqual(response.etag, '"abc"')
+        response.etag = 'W/"abc"'
+        self.assertEqual(response.etag, 'W/"abc"')
+        response.etag = None
+        self.assertIsNone(response.etag)
+
+
+class ConditionalTestCase(unittest.TestCase):
+
+    def test_etag_match(self):
+        from mdl.web.helpers import etag_match
+
+        self.assertTrue(etag_match('"a"', '"a"'))
+        self.assertTrue(etag_match('"b", W/"a"', '"a"'))
+        self.assertTrue(etag_match('"a"', 'W/"a"'))
+        self.assertTrue(etag_match('*', '"a"'))
+        self.assertFalse(etag_match('"b"', '"a"'))
+        self.assertFalse(etag_match('"a"', None))
+        self.assertFalse(etag_match('', '"a"'))
+
+    def test_not_modified_etag(self):
+        from mdl.web.helpers import not_modified
+
+        headers = CIMultiDict([
+            ('If-None-Match', '"a"'),
+            ('If-Modified-Since', 'Sun, 18 Oct 2026 10:00:00 GMT')])
+        self.assertTrue(not_modified('GET', headers, '"a"', None))
+        self.assertTrue(not_modified('HEAD', headers, '"a"', None))
+        self.assertFalse(not_modified('POST', headers, '"a"', None))
+
+        # If-None-Match takes precedence over If-Modified-Since
+        self.assertFalse(not_modified(
+            'GET', headers, '"b"', 'Sun, 18 Oct 2026 09:00:00 GMT'))
+
+    def test_not_modified_date(self):
+        from mdl.web.helpers import not_modified
+
+        headers = CIMultiDict(
+            [('If-Modified-Since', 'Sun, 18 Oct 2026 10:00:00 GMT')])
+        self.assertTrue(not_modified(
+            'GET', headers, None, 'Sun, 18 Oct 2026 10:00:00 GMT'))
+        self.assertFalse(not_modified(
+            'GET', headers, None, 'Sun, 18 Oct 2026 10:00:01 GMT'))
+        self.assertFalse(not_modified('GET', headers, None, None))
+        self.assertFalse(not_modified(
+            'GET', CIMultiDict([('If-Modified-Since', 'invalid')]), None,
+            'Sun, 18 Oct 2026 10:00:00 GMT'))
+
+
+class RangeTestCase(unittest.TestCase):
+
+    def test_parse_range(self):
+        from mdl.web.helpers import parse_range
+
+        self.assertEqual(parse_range('bytes=0-9', 100), [(0, 10)])
+        self.assertEqual(parse_range('bytes=90-', 100), [(90, 100)])
+        self.assertEqual(parse_range('bytes=-10', 100), [(90, 100)])
+        self.assertEqual(parse_range('bytes=-200', 100), [(0, 100)])
+        self.assertEqual(parse_range('bytes=90-200', 100), [(90, 100)])
+        self.assertEqual(
+            parse_range('bytes=20-29, 0-9', 100), [(0, 10), (20, 30)])
+
+    def test_parse_range_merge(self):
+        from mdl.web.helpers import parse_range
+
+        self.assertEqual(
+            parse_range('bytes=0-9,5-14,15-19', 100), [(0, 20)])
+
+    def test_parse_range_unsatisfiable(self):
+        from mdl.web.helpers import parse_range
+
+        self.assertEqual(parse_range('bytes=100-', 100), [])
+        self.assertEqual(parse_range('bytes=-0', 100), [])
+        self.assertEqual(parse_range('bytes=0-', 0), [])
+
+    def test_parse_range_invalid(self):
+        from mdl.web.helpers import parse_range
+
+        self.assertIsNone(parse_range('items=0-9', 100))
+        self.assertIsNone(parse_range('bytes=9-0', 100))
+        self.assertIsNone(parse_range('bytes=a-b', 100))
+        self.assertIsNone(parse_range('bytes=10', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertIsNone(parse_range('bytes=0-0,2-2,4-4', 100, 2))
+
+    def test_if_range(self):
+        from mdl.web.helpers import if_range_match
+
+        date = 'Sun, 18 Oct 2026 10:00:00 GMT'
+        self.assertTrue(if_range_match('"a"', '"a"', None))
+        self.assertFalse(if_range_match('"a"', '"b"', None))
+        self.assertFalse(if_range_match('W/"a"', 'W/"a"', None))
+        self.assertFalse(if_range_match('"a"', 'W/"a"', None))
+        self.assertTrue(if_range_match(date, None, date))
+        self.assertFalse(if_range_match(date, None, None))
+        self.assertFalse(if_range_match(
+            date, None, 'Sun, 18 Oct 2026 09:00:00 GMT'))
@@ -0,0 +1,468 @@
+import unittest
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'test', 'version': '1'},
+    'produces': ['text/plain'],
+    'paths': {
+        '/items/{id}': {
+            'get': {
+                'operationId': 'item',
+                'parameters': [
+                    {'name': 'id', 'in': 'path', 'type': 'integer',
+                     'required': True},
+                ],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/items': {
+            'get': {
+                'operationId': 'items',
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+    },
+}
+
+
+class Transport(object):
+    """ Transport of response, collects written data """
+
+    def __init__(self):
+        self.chunks = []
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def get_write_buffer_limits(self):
+        return (16 * 1024, 64 * 1024)
+
+    def drain(self):
+        return ()
+
+    @property
+    def body(self):
+        return b''.join(self.chunks)
+
+
+class ResponseImpl(object):
+    """ Replaces aiohttp response message, writes body to transport """
+
+    SERVER_SOFTWARE = 'test'
+
+    def __init__(self, transport, status, version, close, reason=None):
+        self.transport = transport
+        self.status = status
+        self.headers = None
+        self.length = None
+        self.chunked = False
+        self.body_length = self.output_length = 0
+
+    def send_headers(self):
+        pass
+
+    def write(self, data):
+        self.body_length += len(data)
+        self.output_length += len(data)
+        self.transport.chunks.append(bytes(data))
+        return ()
+
+    def write_eof(self):
+        return ()
+
+
+class TimeService(object):
+
+    def strtime(self):
+        return 'Thu, 01 Jan 1970 00:00:00 GMT'
+
+
+class Request(object):
+
+    time_service = TimeService()
+
+    def __init__(self, headers=None):
+        from multidict import CIMultiDict
+        from aiohttp.protocol import HttpVersion11
+
+        self.method = 'GET'
+        self.version = HttpVersion11
+        self.headers = CIMultiDict(headers or {})
+        self.keep_alive = True
+        self.transport = self._writer = Transport()
+
+    def _prepare_hook(self, response):
+        return ()
+
+
+class RouteTestCase(unittest.TestCase):
+    """ Route call and response rendering without server """
+
+    def setUp(self):
+        import asyncio
+        from unittest import mock
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+        patcher = mock.patch(
+            'mdl._aiohttp.response.ResponseImpl', ResponseImpl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _ctx(self, route, *params):
+        from mdl.web.context import WebContext
+        return WebContext(route.op, Request(), route.params_cls(*params),
+                          template=route.header_template)
+
+    async def _render(self, route, ctx):
+        import types
+        from mdl._aiohttp.response import ResponseRenderer
+
+        body = await route(ctx)
+        renderer = ResponseRenderer(ctx, body, None, route)
+        await types.coroutine(renderer.prepare)(ctx.request)
+        await types.coroutine(renderer.write_eof)()
+        return renderer.status, ctx.request.transport.body
+
+    def render(self, route, *params):
+        return self.loop.run_until_complete(
+            self._render(route, self._ctx(route, *params)))
+
+
+def make_route(name, handler, **options):
+    from bravado_core.spec import Spec
+    from zope.interface.registry import Components
+    from mdl._aiohttp.directives import Route
+
+    spec = Spec.from_dict(SPEC, config={'use_models': False})
+    op = getattr(spec.resources['items'], name)
+    route = Route(Components(), name, op.path_name, (handler,),
+                  op=op, method='GET', **options)
+    route.init_pipeline()
+    return route
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class RegisterRouteTestCase(unittest.TestCase):
+
+    def _makeOne(self):
+        from mdl._aiohttp.directives import Errors, RuntimeApplication
+        return RuntimeApplication(
+            None, 'app', '', (), (), Errors(()))
+
+    def test_precompressed_max_size(self):
+        async def handler(ctx):
+            pass
+
+        app = self._makeOne()
+        max_size = app.precompressed.max_size
+        small = make_route('item', handler, precompressed={'max-size': 10})
+        large = make_route('items', handler, precompressed={'max-size': 100})
+        app.register_route(small)
+        app.register_route(large)
+
+        # routes share application cache, its size is not changed
+        self.assertIs(small.precompressed, app.precompressed)
+        self.assertIs(large.precompressed, app.precompressed)
+        self.assertEqual(app.precompressed.max_size, max_size)
+        self.assertEqual(small.precompressed_max_size, 10)
+        self.assertEqual(large.precompressed_max_size, 100)
+
+    def test_init_runtime(self):
+        import asyncio
+        from types import SimpleNamespace
+        from unittest import mock
+        from mdl._aiohttp.directives import Errors, RuntimeApplication
+        from mdl._aiohttp.web import WebApplication
+
+        async def handler(ctx):
+            pass
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        root = WebApplication(loop=loop)
+        self.addCleanup(root.date_header.stop)
+
+        app = RuntimeApplication(None, 'v1', '/v1/', (), (), Errors(()))
+        route = make_route('item', handler)
+        app.register_route(route)
+
+        with mock.patch.object(root, 'add_subapp') as add_subapp:
+            sub = app.init_runtime(root, loop=loop)
+        self.addCleanup(sub.date_header.stop)
+
+        # application is mounted for signals and aiohttp routes,
+        # its routes are resolved by root route table
+        add_subapp.assert_called_once_with('/v1', sub)
+        match_info = loop.run_until_complete(root._resolve(SimpleNamespace(
+            method='GET', rel_url=SimpleNamespace(raw_path='/v1/items/1'))))
+        self.assertIs(match_info.mdl_route, route)
+        self.assertEqual(match_info.apps, (sub,))
+        self.assertEqual(match_info, {'id': '1'})
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class PrecompressedTestCase(RouteTestCase):
+
+    def test_max_size(self):
+        from mdl._aiohttp.response import PrecompressedCache
+
+        async def handler(ctx):
+            return 'x' * ctx.params.id
+
+        route = make_route('item', handler, precompressed={'max-size': 10})
+        route.precompressed = cache = PrecompressedCache(1024 ** 2)
+        route.precompressed_max_size = 10
+        route.init_pipeline()
+
+        self.assertEqual(self.render(route, 5), (200, b'x' * 5))
+        self.assertEqual(self.render(route, 50), (200, b'x' * 50))
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.get(route.cache_key(self._ctx(route, 5))))
+
+    def test_in_transform(self):
+        from mdl._aiohttp.response import PrecompressedCache
+
+        denied = []
+
+        def itransform(ctx):
+            if denied:
+                return 'denied'
+
+        async def handler(ctx):
+            return 'item %d' % ctx.params.id
+
+        route = make_route('item', handler, precompressed=True)
+        route.precompressed = PrecompressedCache(1024 ** 2)
+        route.init_pipeline((itransform,))
+
+        self.assertEqual(self.render(route, 1), (200, b'item 1'))
+
+        # in transforms are called before precompressed body is used
+        denied.append(True)
+        self.assertEqual(self.render(route, 1), (200, b'denied'))
+
+    def test_offload(self):
+        from unittest import mock
+        from mdl._aiohttp.response import PrecompressedBody
+        from mdl._aiohttp.response import PrecompressedCache
+        from mdl.web.compression import Compression
+
+        async def handler(ctx):
+            return 'x' * ctx.params.id
+
+        route = make_route('item', handler, precompressed=True)
+        route.precompressed = cache = PrecompressedCache(1024 ** 2)
+        route.compression = Compression(offload_size=100)
+        route.init_pipeline()
+
+        with mock.patch.object(self.loop, 'run_in_executor',
+                               wraps=self.loop.run_in_executor) as run:
+            self.assertEqual(self.render(route, 10), (200, b'x' * 10))
+            self.assertFalse(run.called)
+
+            # large body is compressed in executor
+            self.assertEqual(self.render(route, 1000), (200, b'x' * 1000))
+            run.assert_called_once_with(
+                None, PrecompressedBody, b'x' * 1000,
+                'text/plain; charset=utf-8',
+                route.compression)
+        self.assertEqual(len(cache), 2)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ResponseCacheTestCase(RouteTestCase):
+
+    def test_expires_on_hits(self):
+        from mdl.web.cache import ResponseCache
+
+        calls = []
+
+        async def handler(ctx):
+            calls.append(ctx.params.id)
+            return 'item %d' % ctx.params.id
+
+        route = make_route('item', handler)
+        route.cache = ResponseCache.from_spec({'ttl': 10}, route.params_cls)
+        now = [0]
+        route.cache._timer = lambda: now[0]
+        route.init_pipeline()
+
+        for idx in range(5):
+            self.assertEqual(self.render(route, 1), (200, b'item 1'))
+            now[0] += 4
+
+        # entry stored at 0 expires at 10 although it is hit at 4 and 8
+        self.assertEqual(calls, [1, 1])
+
+    def test_in_transform(self):
+        from mdl.web.cache import ResponseCache
+
+        denied = []
+
+        def itransform(ctx):
+            if denied:
+                return 'denied'
+
+        async def handler(ctx):
+            return 'item %d' % ctx.params.id
+
+        route = make_route('item', handler)
+        route.cache = ResponseCache.from_spec({'ttl': 10}, route.params_cls)
+        route.init_pipeline((itransform,))
+
+        self.assertEqual(self.render(route, 1), (200, b'item 1'))
+
+        # in transforms are called before cached response is used
+        denied.append(True)
+        self.assertEqual(self.render(route, 1), (200, b'denied'))
+
+    def test_cookies(self):
+        from mdl.web.cache import ResponseCache
+
+        async def handler(ctx):
+            ctx.response.headers.add('Set-Cookie', 'sid=secret')
+            return 'item %d' % ctx.params.id
+
+        route = make_route('item', handler)
+        route.cache = ResponseCache.from_spec({'ttl': 10}, route.params_cls)
+        route.init_pipeline()
+
+        self.render(route, 1)
+        cached = route.cache.get(route.cache.key(self._ctx(route, 1)))
+        self.assertNotIn('Set-Cookie', cached.headers)
+        self.assertEqual(cached.body, b'item 1')
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class VersionTestCase(RouteTestCase):
+
+    def _render_conditional(self, route, etag):
+        from mdl.web.context import WebContext
+
+        ctx = WebContext(route.op, Request({'If-None-Match': etag}),
+                         route.params_cls(1), template=route.header_template)
+        return self.loop.run_until_complete(self._render(route, ctx))
+
+    def test_not_modified(self):
+        calls = []
+
+        async def handler(ctx):
+            calls.append(ctx.params.id)
+            return 'item %d' % ctx.params.id
+
+        route = make_route('item', handler)
+        route.version = lambda ctx: 'v1'
+        route.init_pipeline()
+
+        self.assertEqual(self._render_conditional(route, '"v1"'), (304, b''))
+        self.assertEqual(calls, [])
+        self.assertEqual(
+            self._render_conditional(route, '"v0"'), (200, b'item 1'))
+        self.assertEqual(calls, [1])
+
+    def test_in_transform(self):
+        def itransform(ctx):
+            return 'denied'
+
+        async def handler(ctx):
+            pass
+
+        route = make_route('item', handler)
+        route.version = lambda ctx: 'v1'
+        route.init_pipeline((itransform,))
+
+        # in transforms are called before resource version is checked
+        self.assertEqual(
+            self._render_conditional(route, '"v1"'), (200, b'denied'))
+
+
+class AsyncItems(object):
+
+    def __init__(self, items):
+        self.items = iter(items)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class CoalesceTestCase(RouteTestCase):
+
+    def _call(self, items):
+        import asyncio
+
+        calls = []
+
+        async def handler(ctx):
+            calls.append(ctx.params.id)
+            await asyncio.sleep(0)
+            return items(ctx.params.id)
+
+        async def call():
+            return (await asyncio.gather(
+                route(self._ctx(route, 3)), route(self._ctx(route, 3))))
+
+        route = make_route('item', handler, coalesce=True)
+        bodies = self.loop.run_until_complete(call())
+        self.assertEqual(calls, [3])
+        self.assertEqual(route.coalesce.shared, 1)
+        return bodies
+
+    def test_generator(self):
+        bodies = self._call(lambda count: (idx for idx in range(count)))
+        self.assertEqual(bodies, [(0, 1, 2), (0, 1, 2)])
+
+    def test_async_iterator(self):
+        bodies = self._call(lambda count: AsyncItems(range(count)))
+        self.assertEqual(bodies, [(0, 1, 2), (0, 1, 2)])
+
+    def test_complete_body(self):
+        bodies = self._call(lambda count: 'x' * count)
+        self.assertEqual(bodies, ['xxx', 'xxx'])
+
+    def test_in_transform(self):
+        import asyncio
+
+        calls = []
+
+        def itransform(ctx):
+            calls.append('in')
+            if getattr(ctx, 'denied', False):
+                return 'denied'
+
+        async def handler(ctx):
+            calls.append('handler')
+            await asyncio.sleep(0)
+            return 'item %d' % ctx.params.id
+
+        route = make_route('item', handler, coalesce=True)
+        route.init_pipeline((itransform,))
+        denied = self._ctx(route, 3)
+        denied.denied = True
+
+        async def call():
+            return (await asyncio.gather(
+                route(self._ctx(route, 3)), route(denied),
+                route(self._ctx(route, 3))))
+
+        # in transforms are called for each request before shared call
+        bodies = self.loop.run_until_complete(call())
+        self.assertEqual(bodies, ['item 3', 'denied', 'item 3'])
+        self.assertEqual(calls, ['in', 'in', 'in', 'handler'])
+        self.assertEqual(route.coalesce.shared, 1)
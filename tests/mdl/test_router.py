@@ -0,0 +1,142 @@
+import unittest
+
+
+class RouterTestCase(unittest.TestCase):
+
+    def _makeOne(self):
+        from mdl.web.router import Router
+        return Router()
+
+    def _matcher(self, **spec):
+        from mdl.web.router import segment_matcher
+        return segment_matcher(spec)
+
+    def test_static(self):
+        router = self._makeOne()
+        router.add('GET', '/items', 'list')
+        router.add('POST', '/items', 'create')
+
+        self.assertEqual(router.resolve('GET', '/items'), ('list', {}, None))
+        self.assertEqual(
+            router.resolve('POST', '/items'), ('create', {}, None))
+        self.assertEqual(router.resolve('GET', '/items/'), (None,) * 3)
+
+    def test_method_not_allowed(self):
+        router = self._makeOne()
+        router.add('GET', '/items', 'list')
+        router.add('GET', '/items/{id}', 'get')
+
+        self.assertEqual(
+            router.resolve('DELETE', '/items'), (None, None, ('GET',)))
+        self.assertEqual(
+            router.resolve('DELETE', '/items/1'), (None, None, ('GET',)))
+
+    def test_method_in_other_branch(self):
+        router = self._makeOne()
+        router.add('GET', '/items/{id}', 'get')
+        router.add('POST', '/items/new', 'create')
+        router.add('PUT', '/items/{id}/tags/{tag}', 'tag')
+        router.add('DELETE', '/items/{id}/tags/all', 'clear')
+
+        self.assertEqual(
+            router.resolve('GET', '/items/new'), ('get', {'id': 'new'}, None))
+        self.assertEqual(
+            router.resolve('POST', '/items/new'), ('create', {}, None))
+        self.assertEqual(
+            router.resolve('PUT', '/items/1/tags/all'),
+            ('tag', {'id': '1', 'tag': 'all'}, None))
+        self.assertEqual(
+            router.resolve('PATCH', '/items/new'),
+            (None, None, ('POST', 'GET')))
+        self.assertEqual(
+            router.resolve('GET', '/items/1/tags/all'),
+            (None, None, ('DELETE', 'PUT')))
+
+    def test_any_method(self):
+        router = self._makeOne()
+        router.add('*', '/items', 'any')
+        router.add('GET', '/items', 'list')
+
+        self.assertEqual(router.resolve('GET', '/items')[0], 'list')
+        self.assertEqual(router.resolve('PUT', '/items')[0], 'any')
+
+    def test_duplicate(self):
+        router = self._makeOne()
+        router.add('GET', '/items/{id}', 'get')
+        self.assertRaises(ValueError, router.add, 'GET', '/items/{id}', 'x')
+
+    def test_params(self):
+        router = self._makeOne()
+        router.add('GET', '/items/{id}/tags/{tag}', 'tag')
+
+        self.assertEqual(
+            router.resolve('GET', '/items/10/tags/a%20b'),
+            ('tag', {'id': '10', 'tag': 'a b'}, None))
+        self.assertEqual(router.resolve('GET', '/items/10/tags/'), (None,) * 3)
+
+    def test_static_before_param(self):
+        router = self._makeOne()
+        router.add('GET', '/items/{id}', 'get')
+        router.add('GET', '/items/search', 'search')
+
+        self.assertEqual(router.resolve('GET', '/items/search')[0], 'search')
+        self.assertEqual(router.resolve('GET', '/items/other')[0], 'get')
+
+    def test_typed_params(self):
+        router = self._makeOne()
+        router.add('GET', '/items/{name}', 'by-name')
+        router.add('GET', '/items/{id}', 'by-id',
+                   {'id': self._matcher(type='integer')})
+        router.add('GET', '/items/{state}', 'by-state',
+                   {'state': self._matcher(type='string',
+                                           enum=['new', 'done'])})
+
+        self.assertEqual(
+            router.resolve('GET', '/items/10'), ('by-id', {'id': '10'}, None))
+        self.assertEqual(
+            router.resolve('GET', '/items/-1')[0], 'by-id')
+        self.assertEqual(
+            router.resolve('GET', '/items/new'),
+            ('by-state', {'state': 'new'}, None))
+        self.assertEqual(
+            router.resolve('GET', '/items/ten'),
+            ('by-name', {'name': 'ten'}, None))
+
+    def test_backtracking(self):
+        router = self._makeOne()
+        router.add('GET', '/items/{id}/info', 'info',
+                   {'id': self._matcher(type='integer')})
+        router.add('GET', '/items/{name}/tags', 'tags')
+
+        self.assertEqual(
+            router.resolve('GET', '/items/1/tags'),
+            ('tags', {'name': '1'}, None))
+        self.assertEqual(
+            router.resolve('GET', '/items/1/info'),
+            ('info', {'id': '1'}, None))
+
+    def test_partial_segment(self):
+        router = self._makeOne()
+        router.add('GET', '/files/{name}.{ext}', 'file',
+                   {'ext': self._matcher(enum=['json', 'xml'])})
+
+        self.assertEqual(
+            router.resolve('GET', '/files/data.json'),
+            ('file', {'name': 'data', 'ext': 'json'}, None))
+        self.assertEqual(router.resolve('GET', '/files/data.csv'), (None,) * 3)
+
+    def test_matchers(self):
+        match = self._matcher(type='number')[2]
+        self.assertTrue(match('1.5'))
+        self.assertFalse(match('x'))
+
+        match = self._matcher(type='boolean')[2]
+        self.assertTrue(match('true'))
+        self.assertFalse(match('1'))
+
+        match = self._matcher(type='string', pattern='^[a-z]+$')[2]
+        self.assertTrue(match('abc'))
+        self.assertFalse(match('a1'))
+
+        match = self._matcher()[2]
+        self.assertFalse(match(''))
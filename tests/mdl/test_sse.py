@@ -0,0 +1,127 @@
+import unittest
+
+
+class EncodeEventTestCase(unittest.TestCase):
+
+    def test_encode(self):
+        from mdl.web.sse import encode_event
+
+        self.assertEqual(encode_event('text'), b'data: text\n\n')
+        self.assertEqual(encode_event(''), b'data: \n\n')
+        self.assertEqual(
+            encode_event({'a': 1}, event='update', id=5, retry=1000),
+            b'id: 5\nevent: update\nretry: 1000\ndata: {"a": 1}\n\n')
+        self.assertEqual(
+            encode_event('line1\nline2'), b'data: line1\ndata: line2\n\n')
+
+
+class EventHubTestCase(unittest.TestCase):
+
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_publish(self):
+        from mdl.web.sse import EventHub
+
+        hub = EventHub()
+        channels = [hub.channel() for idx in range(3)]
+        self.assertEqual(len(hub), 3)
+        self.assertEqual(hub.publish('event'), 3)
+
+        frames = self.loop.run_until_complete(channels[0].get())
+        self.assertEqual(frames, [b'data: event\n\n'])
+
+        # frame is encoded once
+        self.assertIs(channels[1]._queue[0], channels[2]._queue[0])
+
+    def test_get_wait(self):
+        from mdl.web.sse import EventHub
+
+        hub = EventHub()
+        channel = hub.channel()
+
+        async def run():
+            self.loop.call_soon(hub.publish, 'event')
+            return await channel.get()
+
+        self.assertEqual(
+            self.loop.run_until_complete(run()), [b'data: event\n\n'])
+
+    def test_sink(self):
+        from mdl.web.sse import EventHub
+
+        hub = EventHub()
+        channel = hub.channel()
+        written = []
+
+        def sink(frame):
+            written.append(frame)
+            return len(written) < 2
+
+        channel.sink = sink
+        hub.publish('1')
+        hub.publish('2')
+        # sink is full, next frames are queued
+        hub.publish('3')
+
+        self.assertEqual(written, [b'data: 1\n\n', b'data: 2\n\n'])
+        self.assertIsNone(channel.sink)
+        self.assertEqual(
+            self.loop.run_until_complete(channel.get()), [b'data: 3\n\n'])
+
+    def test_get_timeout(self):
+        from mdl.web.sse import Channel
+
+        channel = Channel()
+        self.assertEqual(
+            self.loop.run_until_complete(channel.get(0.01)), [])
+
+    def test_close(self):
+        from mdl.web.sse import EventHub
+
+        hub = EventHub()
+        channel = hub.channel()
+        hub.publish('event')
+        channel.close()
+        self.assertEqual(len(hub), 0)
+        self.assertFalse(channel.put(b'frame'))
+
+        # remaining frames are returned before close
+        self.assertEqual(
+            self.loop.run_until_complete(channel.get()),
+            [b'data: event\n\n'])
+        self.assertIsNone(self.loop.run_until_complete(channel.get()))
+
+    def test_drop_policy(self):
+        from mdl.web.sse import EventHub
+
+        hub = EventHub(max_queue=2)
+        channel = hub.channel()
+        for idx in range(4):
+            hub.publish(str(idx))
+
+        self.assertEqual((hub.dropped, channel.dropped), (2, 2))
+        self.assertEqual(len(channel), 2)
+        self.assertFalse(channel.closed)
+
+    def test_disconnect_policy(self):
+        from mdl.web.sse import DISCONNECT, EventHub
+
+        hub = EventHub(max_queue=2, policy=DISCONNECT)
+        slow = hub.channel()
+        fast = hub.channel()
+        for idx in range(3):
+            hub.publish(str(idx))
+            fast._queue.clear()
+
+        self.assertTrue(slow.closed)
+        self.assertEqual(len(hub), 1)
+        self.assertEqual(hub.disconnected, 1)
+        self.assertEqual(hub.publish('next'), 1)
+
+    def test_unknown_policy(self):
+        from mdl.web.sse import EventHub
+
+        self.assertRaises(ValueError, EventHub, policy='unknown')
@@ -0,0 +1,294 @@
+import unittest
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class Transport(object):
+    """ Transport with write buffer that is not sent until drain """
+
+    def __init__(self, high_water=64):
+        self.limits = (0, high_water)
+        self.buffer = []
+        self.drained = 0
+
+    def get_write_buffer_limits(self):
+        return self.limits
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        self.limits = (low, high)
+
+    def get_write_buffer_size(self):
+        return sum(len(data) for data in self.buffer)
+
+    def drain(self):
+        self.drained += 1
+        self.buffer = []
+        yield from ()
+
+
+class Response(object):
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+        self.transport.buffer.append(data)
+        return ()
+
+    def write_eof(self):
+        return ()
+
+
+class StreamTestCase(unittest.TestCase):
+    """ Stream writer of response with fake transport """
+
+    def setUp(self):
+        import asyncio
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _makeOne(self, settings=None, high_water=64):
+        from mdl._aiohttp.stream import StreamWriter
+
+        self.transport = Transport(high_water)
+        self.response = Response(self.transport)
+        return StreamWriter(
+            None, None, self.response, loop=self.loop, settings=settings)
+
+    def _settings(self, **spec):
+        from mdl._aiohttp.stream import StreamSettings
+        return StreamSettings.from_spec(spec)
+
+    def _run_once(self):
+        import asyncio
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class StreamWriterTestCase(StreamTestCase):
+
+    def test_coalesce(self):
+        writer = self._makeOne(self._settings(**{'buffer-size': 16}))
+        self.assertEqual(writer.write(b'abc'), ())
+        self.assertEqual(writer.write(bytearray(b'def')), ())
+        self.assertEqual(self.response.writes, [])
+        self.assertEqual(writer.buffered, 6)
+
+        # buffer is full
+        writer.write(b'0123456789')
+        self.assertEqual(self.response.writes, [b'abcdef0123456789'])
+        self.assertEqual(writer.buffered, 0)
+
+    def test_large_write(self):
+        writer = self._makeOne(self._settings(**{'buffer-size': 4}))
+        writer.write(b'ab')
+        writer.write(b'0123456789')
+        self.assertEqual(self.response.writes, [b'ab', b'0123456789'])
+
+    def test_flush_next_iteration(self):
+        writer = self._makeOne()
+        writer.write(b'abc')
+        writer.write(b'def')
+        self.assertEqual(self.response.writes, [])
+
+        self._run_once()
+        self.assertEqual(self.response.writes, [b'abcdef'])
+
+        # explicit flush cancels scheduled flush
+        writer.write(b'ghi', flush=True)
+        self.assertEqual(self.response.writes, [b'abcdef', b'ghi'])
+        self.assertIsNone(writer._flush_handle)
+
+    def test_high_water(self):
+        writer = self._makeOne(self._settings(**{'buffer-size': 8}), 16)
+        self.assertEqual(writer.write(b'x' * 10), ())
+        self.assertFalse(writer.paused)
+
+        drain = writer.write(b'y' * 10)
+        self.assertTrue(writer.paused)
+        self.assertNotEqual(drain, ())
+        self.loop.run_until_complete(drain)
+        self.assertEqual(self.transport.drained, 1)
+        self.assertFalse(writer.paused)
+
+    def test_high_water_settings(self):
+        self._makeOne(self._settings(**{'high-water': 1024}))
+        self.assertEqual(self.transport.limits[1], 1024)
+
+    def test_counters(self):
+        writer = self._makeOne(self._settings(**{'buffer-size': 8}), 16)
+        writer.write(b'ab')
+        writer.write(b'cd')
+        writer.flush()
+        self.loop.run_until_complete(writer.write(b'0123456789' * 2))
+
+        self.assertEqual(writer.writes, 3)
+        self.assertEqual(writer.flushes, 2)
+        self.assertEqual(writer.drains, 1)
+        self.assertEqual(writer.bytes_written, 24)
+
+    def test_write_eof(self):
+        writer = self._makeOne()
+        writer.write(b'abc')
+        self.loop.run_until_complete(writer.write_eof())
+        self.assertEqual(self.response.writes, [b'abc'])
+        self.assertRaises(RuntimeError, writer.write, b'def')
+
+
+class Serializer(object):
+
+    head = b'['
+    tail = b']'
+
+    def write(self, buf, item, index):
+        data = b'%s%d' % (b',' if index else b'', item)
+        buf.append(data)
+        return len(data)
+
+
+class QueueItems(object):
+    """ Async iterator of items put to queue, None ends iteration """
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self.queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ItemStreamTestCase(StreamTestCase):
+
+    def test_async_items(self):
+        import asyncio
+        import types
+        from mdl._aiohttp.stream import ItemStream
+
+        writer = self._makeOne()
+
+        async def produce():
+            # queue is bound to running loop
+            queue = asyncio.Queue()
+            stream = ItemStream(QueueItems(queue), Serializer())
+            task = self.loop.create_task(types.coroutine(stream)(writer))
+            queue.put_nowait(1)
+            queue.put_nowait(2)
+            for idx in range(3):
+                await asyncio.sleep(0)
+
+            # items are flushed while iterator waits for next item
+            self.assertEqual(self.response.writes, [b'[1,2'])
+            queue.put_nowait(None)
+            await task
+            return stream
+
+        stream = self.loop.run_until_complete(produce())
+        self.assertEqual(self.response.writes, [b'[1,2', b']'])
+        self.assertEqual(stream.count, 2)
+
+
+class SocketTransport(Transport):
+
+    def get_extra_info(self, name, default=None):
+        return object() if name == 'socket' else default
+
+
+class FileResponse(Response):
+
+    def write(self, data):
+        # memory mapped chunks are released after write
+        return super(FileResponse, self).write(bytes(data))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class FileBodyTestCase(StreamTestCase):
+
+    def setUp(self):
+        import os
+        import tempfile
+        from unittest import mock
+
+        super(FileBodyTestCase, self).setUp()
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        self.addCleanup(os.unlink, self.path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'0123456789' * 10)
+
+        self.sent = []
+        patcher = mock.patch.object(self.loop, 'sendfile', self._sendfile)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _sendfile(self, transport, fileobj, offset, count):
+        self.assertIs(transport, self.transport)
+        self.sent.append((offset, count))
+
+    def _makeOne(self, sendfile=True):
+        from mdl._aiohttp.stream import FileBody, StreamWriter
+
+        self.transport = SocketTransport()
+        self.response = FileResponse(self.transport)
+        self.writer = StreamWriter(
+            None, None, self.response, sendfile, loop=self.loop)
+        return FileBody(self.path, chunk_size=16)
+
+    def _write(self, stream):
+        import types
+        self.loop.run_until_complete(types.coroutine(stream)(self.writer))
+        self.loop.run_until_complete(self.writer.write_eof())
+        return b''.join(self.response.writes)
+
+    def test_sendfile(self):
+        body = self._makeOne()
+        self.assertEqual(body.size, 100)
+        self.assertEqual(body.content_type, 'text/plain')
+        self.assertEqual(self._write(body), b'')
+        self.assertEqual(self.sent, [(0, 100)])
+        self.assertEqual(self.writer.bytes_written, 100)
+
+    def test_no_loop_sendfile(self):
+        from unittest import mock
+
+        # event loop of python < 3.7 does not support sendfile
+        with mock.patch.object(self.loop, 'sendfile', None):
+            body = self._makeOne()
+            self.assertEqual(self._write(body), b'0123456789' * 10)
+        self.assertEqual(self.sent, [])
+
+    def test_compressed(self):
+        body = self._makeOne(sendfile=False)
+        self.assertEqual(self._write(body), b'0123456789' * 10)
+        self.assertEqual(self.sent, [])
+
+    def test_range(self):
+        from mdl._aiohttp.stream import RangeStream
+
+        body = self._makeOne()
+        self._write(RangeStream(body, [(5, 25)]))
+        self.assertEqual(self.sent, [(5, 20)])
+
+        body = self._makeOne(sendfile=False)
+        self.assertEqual(
+            self._write(RangeStream(body, [(5, 25)])),
+            b'56789012345678901234')
+
+    def test_multiple_ranges(self):
+        from mdl._aiohttp.stream import RangeStream
+
+        body = self._makeOne(sendfile=False)
+        self.assertEqual(
+            self._write(RangeStream(
+                body, [(0, 2), (98, 100)], [b'<a>', b'<b>'], b'<end>')),
+            b'<a>01<b>89<end>')
@@ -0,0 +1,154 @@
+import unittest
+
+from jsonschema import ValidationError
+
+
+class CompileSchemaTestCase(unittest.TestCase):
+
+    def _compile(self, schema, deref=None):
+        from mdl.schema.validator import compile_schema
+        return compile_schema(schema, deref)
+
+    def test_type(self):
+        validate = self._compile({'type': 'integer'})
+        validate(10)
+        self.assertRaises(ValidationError, validate, '10')
+        self.assertRaises(ValidationError, validate, True)
+        self.assertRaises(ValidationError, validate, 1.5)
+
+        validate = self._compile({'type': 'number'})
+        validate(10)
+        validate(1.5)
+        self.assertRaises(ValidationError, validate, False)
+
+    def test_nullable(self):
+        validate = self._compile({'type': 'string', 'x-nullable': True})
+        validate(None)
+        validate('test')
+        self.assertRaises(ValidationError, validate, 1)
+
+    def test_enum(self):
+        validate = self._compile({'type': 'string', 'enum': ['a', '%s']})
+        validate('a')
+        with self.assertRaises(ValidationError) as ctx:
+            validate('b')
+        self.assertEqual(
+            ctx.exception.message, "'b' is not one of ['a', '%s']")
+
+    def test_number_limits(self):
+        validate = self._compile(
+            {'type': 'integer', 'minimum': 1, 'maximum': 10,
+             'exclusiveMaximum': True})
+        validate(1)
+        validate(9)
+        self.assertRaises(ValidationError, validate, 0)
+        self.assertRaises(ValidationError, validate, 10)
+
+    def test_string(self):
+        validate = self._compile(
+            {'type': 'string', 'minLength': 2, 'maxLength': 4,
+             'pattern': '^a'})
+        validate('ab')
+        self.assertRaises(ValidationError, validate, 'a')
+        self.assertRaises(ValidationError, validate, 'abcde')
+        self.assertRaises(ValidationError, validate, 'ba')
+
+    def test_untyped_keywords(self):
+        validate = self._compile({'minLength': 2, 'minimum': 5})
+        validate('ab')
+        validate(5)
+        validate([])
+        self.assertRaises(ValidationError, validate, 'a')
+        self.assertRaises(ValidationError, validate, 4)
+
+    def test_object(self):
+        validate = self._compile({
+            'type': 'object',
+            'required': ['name'],
+            'properties': {
+                'name': {'type': 'string'},
+                'tags': {'type': 'array', 'items': {'type': 'string'},
+                         'maxItems': 2},
+                'any': {},
+            },
+            'additionalProperties': False,
+        })
+        validate({'name': 'test', 'tags': ['a'], 'any': 1})
+        self.assertRaises(ValidationError, validate, {})
+        self.assertRaises(ValidationError, validate, {'name': 1})
+        self.assertRaises(
+            ValidationError, validate, {'name': 'a', 'tags': [1]})
+        self.assertRaises(
+            ValidationError, validate, {'name': 'a', 'tags': ['1'] * 3})
+        self.assertRaises(
+            ValidationError, validate, {'name': 'a', 'other': 1})
+
+    def test_param_spec(self):
+        validate = self._compile(
+            {'name': 'id', 'in': 'query', 'required': True,
+             'type': 'integer'})
+        validate(1)
+        self.assertRaises(ValidationError, validate, None)
+
+    def test_ref(self):
+        defs = {'#/definitions/Name': {'type': 'string'}}
+
+        def deref(schema):
+            if isinstance(schema, dict) and '$ref' in schema:
+                return defs[schema['$ref']]
+            return schema
+
+        validate = self._compile(
+            {'type': 'array', 'items': {'$ref': '#/definitions/Name'}},
+            deref)
+        validate(['a'])
+        self.assertRaises(ValidationError, validate, [1])
+
+    def test_unsupported(self):
+        from mdl.schema.validator import UnsupportedSchema
+
+        self.assertRaises(
+            UnsupportedSchema, self._compile, {'allOf': [{}]})
+        self.assertRaises(
+            UnsupportedSchema, self._compile,
+            {'type': 'string', 'format': 'date-time'})
+        self.assertRaises(
+            UnsupportedSchema, self._compile,
+            {'type': 'object', 'additionalProperties': {'type': 'string'}})
+
+
+class GetValidatorTestCase(unittest.TestCase):
+
+    def _makeSpec(self):
+        from bravado_core.spec import Spec
+        return Spec.from_dict({
+            'swagger': '2.0',
+            'info': {'title': 'test', 'version': '1'},
+            'paths': {},
+        })
+
+    def _callFUT(self, swagger_spec, schema):
+        from mdl.schema.validator import get_validator
+        return get_validator(swagger_spec, schema)
+
+    def test_cached_per_spec(self):
+        spec1 = self._makeSpec()
+        spec2 = self._makeSpec()
+        validate = self._callFUT(spec1, {'type': 'integer'})
+        self.assertIs(self._callFUT(spec1, {'type': 'integer'}), validate)
+        self.assertIsNot(self._callFUT(spec2, {'type': 'integer'}), validate)
+
+        validate(1)
+        self.assertRaises(ValidationError, validate, 'a')
+
+    def test_released_with_spec(self):
+        import gc
+        import weakref
+
+        spec = self._makeSpec()
+        # jsonschema validator references spec
+        self._callFUT(spec, {'oneOf': [{'type': 'integer'}]})
+        ref = weakref.ref(spec)
+        del spec
+        gc.collect()
+        self.assertIsNone(ref())
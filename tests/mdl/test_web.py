@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+def request(method, path):
+    return SimpleNamespace(
+        method=method, rel_url=SimpleNamespace(raw_path=path))
+
+
+async def handler(ctx):
+    return 'body'
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class MiddlewaresTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.calls = []
+
+    def _makeOne(self, *tags):
+        from mdl._aiohttp.web import WebApplication
+
+        app = WebApplication(
+            loop=self.loop, middlewares=[self._factory(tag) for tag in tags])
+        self.addCleanup(app.date_header.stop)
+        return app
+
+    def _factory(self, tag):
+        async def factory(app, handler):
+            self.calls.append(tag)
+
+            async def middleware(ctx):
+                return '%s-%s' % (tag, await handler(ctx))
+            return middleware
+        return factory
+
+    def _resolve(self, app, method, path):
+        return self.loop.run_until_complete(
+            app._resolve(request(method, path)))
+
+    def test_composed_on_startup(self):
+        root = self._makeOne('outer', 'inner')
+        sub = self._makeOne('sub')
+        root.add_mdl_route('GET', '/a', handler)
+        root.add_mdl_route('GET', '/v1/b', handler, sub)
+
+        self.loop.run_until_complete(root.startup())
+        self.assertEqual(
+            sorted(self.calls), ['inner', 'inner', 'outer', 'outer', 'sub'])
+
+        # sub application middlewares are applied after root middlewares
+        for path, body in (('/a', 'outer-inner-body'),
+                           ('/v1/b', 'outer-inner-sub-body')):
+            match_info = self._resolve(root, 'GET', path)
+            self.assertIs(match_info.mdl_route, handler)
+            self.assertEqual(
+                self.loop.run_until_complete(match_info.chain(None)), body)
+
+        # requests do not call factories
+        del self.calls[:]
+        self._resolve(root, 'GET', '/a')
+        self.assertEqual(self.calls, [])
+
+    def test_method_not_allowed(self):
+        app = self._makeOne('mw')
+        app.add_mdl_route('GET', '/a', handler)
+        self.loop.run_until_complete(app.startup())
+
+        match_info = self._resolve(app, 'POST', '/a')
+        self.assertIsNone(match_info.mdl_route)
+        self.assertIsNone(match_info.chain)
+
+    def test_aiohttp_middlewares(self):
+        from aiohttp import web
+
+        app = self._makeOne('mw')
+        base = web.Application(loop=self.loop)
+        self.assertIs(type(app.middlewares), type(base.middlewares))
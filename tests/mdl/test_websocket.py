@@ -0,0 +1,273 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+SPEC = {
+    'swagger': '2.0',
+    'info': {'title': 'test', 'version': '1'},
+    'definitions': {
+        'Message': {
+            'type': 'object',
+            'required': ['op'],
+            'properties': {
+                'op': {'type': 'string', 'enum': ['add', 'fail']},
+                'n': {'type': 'integer'},
+            },
+        },
+    },
+    'paths': {
+        '/ws': {
+            'get': {
+                'operationId': 'json',
+                'tags': ['ws'],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/ws/text': {
+            'get': {
+                'operationId': 'text',
+                'tags': ['ws'],
+                'consumes': ['text/plain'],
+                'produces': ['text/plain'],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/ws/custom': {
+            'get': {
+                'operationId': 'custom',
+                'tags': ['ws'],
+                'consumes': ['application/x-custom'],
+                'produces': ['application/x-custom'],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+        '/ws/unknown': {
+            'get': {
+                'operationId': 'unknown',
+                'tags': ['ws'],
+                'produces': ['application/x-custom'],
+                'responses': {'200': {'description': 'ok'}},
+            },
+        },
+    },
+}
+
+
+def get_op(name):
+    from bravado_core.spec import Spec
+
+    spec = Spec.from_dict(SPEC, config={'use_models': False})
+    return getattr(spec.resources['ws'], name)
+
+
+def settings(name, spec=True, registry=None):
+    from mdl._aiohttp.websocket import WebSocketSettings
+    return WebSocketSettings.from_spec(spec, get_op(name), registry)
+
+
+class WebSocket(object):
+    """ Websocket response with inbound messages """
+
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.sent = []
+        self.closed = False
+        self.close_code = None
+
+    async def receive(self):
+        if self.closed or not self.messages:
+            self.closed = True
+            return SimpleNamespace(type=aiohttp.WSMsgType.CLOSED, data=None)
+        return self.messages.pop(0)
+
+    def send_str(self, data):
+        self.sent.append(data)
+
+    def send_bytes(self, data):
+        self.sent.append(bytes(data))
+
+    async def close(self, code=1000, message=b''):
+        self.closed = True
+        self.close_code = (code, message)
+
+
+def text(data):
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    return SimpleNamespace(type=aiohttp.WSMsgType.TEXT, data=data)
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class WebSocketSettingsTestCase(unittest.TestCase):
+
+    def test_not_websocket(self):
+        self.assertIsNone(settings('json', None))
+        self.assertIsNone(settings('json', False))
+
+    def test_json(self):
+        from mdl._aiohttp.params import DEFAULT_MAX_BODY_SIZE
+
+        ws = settings('json')
+        self.assertIs(ws.decode_text, json.loads)
+        self.assertIs(ws.encode, json.dumps)
+        self.assertEqual(ws.decode_binary(b'{"a": 1}'), {'a': 1})
+        self.assertFalse(ws.binary)
+        self.assertIsNone(ws.finalize)
+        self.assertEqual(ws.max_size, DEFAULT_MAX_BODY_SIZE)
+        self.assertEqual(ws.protocols, ())
+
+    def test_options(self):
+        from jsonschema import ValidationError
+
+        ws = settings('json', {'message': {'$ref': '#/definitions/Message'},
+                               'max-size': 10, 'protocols': ['v1']})
+        self.assertEqual(ws.max_size, 10)
+        self.assertEqual(ws.protocols, ('v1',))
+        self.assertEqual(
+            ws.finalize({'op': 'add'}), {'op': 'add', 'n': None})
+        self.assertRaises(ValidationError, ws.finalize, {'op': 'x'})
+
+    def test_text(self):
+        ws = settings('text')
+        self.assertEqual(ws.decode_text('тест'), 'тест')
+        self.assertEqual(ws.encode('тест'), 'тест')
+        self.assertFalse(ws.binary)
+
+    def test_registry(self):
+        from zope.interface.registry import Components
+        from mdl.web.interfaces import IBodyDecoder, IBodyEncoder
+
+        def decode(data, charset):
+            return ('decoded', data, charset)
+
+        def encode(obj, charset):
+            return repr(obj).encode('ascii')
+
+        registry = Components()
+        registry.registerUtility(
+            decode, IBodyDecoder, name='application/x-custom')
+        registry.registerUtility(
+            encode, IBodyEncoder, name='application/x-custom')
+
+        # codecs of custom media types work with binary frames
+        ws = settings('custom', registry=registry)
+        self.assertTrue(ws.binary)
+        self.assertEqual(
+            ws.decode_binary(b'abc'), ('decoded', b'abc', None))
+        self.assertEqual(
+            ws.decode_text('abc'), ('decoded', b'abc', 'utf-8'))
+        self.assertEqual(ws.encode(1), b'1')
+
+    def test_missing_decoder(self):
+        self.assertRaises(ValueError, settings, 'custom')
+
+    def test_missing_encoder(self):
+        self.assertRaises(ValueError, settings, 'unknown')
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class ConnectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def _makeOne(self, messages, spec=None):
+        from mdl._aiohttp.websocket import Connection
+
+        if spec is None:
+            spec = {'message': {'$ref': '#/definitions/Message'}}
+        self.ws = WebSocket(messages)
+        return Connection(self.ws, settings('json', spec))
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_receive(self):
+        conn = self._makeOne([
+            text({'op': 'add', 'n': 1}),
+            SimpleNamespace(type=aiohttp.WSMsgType.BINARY,
+                            data=b'{"op": "fail"}')])
+        self.assertEqual(self._run(conn.receive()), {'op': 'add', 'n': 1})
+        self.assertEqual(
+            self._run(conn.receive()), {'op': 'fail', 'n': None})
+        self.assertEqual(conn.received, 2)
+
+        self.assertIsNone(self._run(conn.receive()))
+        self.assertIsNone(self.ws.close_code)
+
+    def test_too_big(self):
+        conn = self._makeOne([text({'op': 'add', 'n': 12345})],
+                             {'max-size': 10})
+        self.assertIsNone(self._run(conn.receive()))
+        self.assertEqual(
+            self.ws.close_code,
+            (aiohttp.WSCloseCode.MESSAGE_TOO_BIG, b'Message is too large'))
+        self.assertEqual(conn.received, 0)
+
+    def test_invalid_message(self):
+        for data in ('{bad', {'op': 'x'}):
+            conn = self._makeOne([text(data)])
+            self.assertIsNone(self._run(conn.receive()))
+            self.assertEqual(
+                self.ws.close_code[0], aiohttp.WSCloseCode.INVALID_TEXT)
+            self.assertTrue(self.ws.close_code[1])
+
+    def test_serve(self):
+        from mdl._aiohttp.directives import Error, Errors
+
+        class Conflict(Exception):
+            pass
+
+        async def handler(ctx):
+            if ctx.message['op'] == 'fail':
+                raise Conflict()
+            if ctx.message.get('n') == 0:
+                raise ZeroDivisionError()
+            ctx.connection.state = (ctx.connection.state or 0) + \
+                ctx.message['n']
+            return {'total': ctx.connection.state}
+
+        async def handle_zero(ctx, exc):
+            return 'zero'
+
+        errors = Errors([
+            Error(Conflict, {'status': 409, 'body': {'error': 'conflict'}}),
+            Error(ZeroDivisionError, handle_zero)])
+        conn = self._makeOne([
+            text({'op': 'add', 'n': 1}), text({'op': 'fail'}),
+            text({'op': 'add', 'n': 0}), text({'op': 'add', 'n': 2})])
+
+        self.assertIs(
+            self._run(conn.serve(SimpleNamespace(), handler, errors)),
+            self.ws)
+        self.assertEqual(
+            self.ws.sent,
+            ['{"total": 1}', '{"error": "conflict"}', 'zero',
+             '{"total": 3}'])
+        self.assertIsNone(self.ws.close_code)
+
+    def test_serve_unhandled(self):
+        from mdl._aiohttp.directives import Errors
+
+        async def handler(ctx):
+            raise KeyError('op')
+
+        reported = []
+        self.loop.set_exception_handler(
+            lambda loop, context: reported.append(context['exception']))
+
+        conn = self._makeOne([text({'op': 'add'}), text({'op': 'add'})])
+        self._run(conn.serve(SimpleNamespace(), handler, Errors(())))
+        self.assertEqual(
+            self.ws.close_code,
+            (aiohttp.WSCloseCode.INTERNAL_ERROR, b'Internal error'))
+        self.assertEqual(len(reported), 1)
+        self.assertIsInstance(reported[0], KeyError)
+        self.assertEqual(conn.received, 1)